@@ -1,20 +1,67 @@
 import sys
 import os
 import re
-from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QTabWidget, QDialog, QRadioButton, QFileDialog
-from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtCore import Qt
-import water_file_combine  # Assuming this module is present for processing water-related data
-import electricity_file_combine
-from forecasting_model import water_linear_regression
-from forecasting_model import Water_Random_Forest
-from forecasting_model import electricity_linear_regression
-from forecasting_model import electricity_random_forest
-import weather_forecast
+import importlib
+import threading
+import traceback
+from collections import OrderedDict
+from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, QTabWidget, QDialog, QRadioButton, QFileDialog, QProgressBar
+from PyQt5.QtGui import QFont, QPixmap, QImage
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 current_path = os.path.abspath(__file__)
 current_path = os.path.dirname(current_path)
 
+
+class LazyModule:
+    # Stands in for a module until one of its attributes is used; the module is imported then (once)
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+# pandas, numpy, scikit-learn, requests and the models are not needed for the start dialog.
+# They are imported on first use, or earlier by preload_modules while the start dialog is shown
+HEAVY_MODULES = [
+    'water_file_combine',  # Assuming this module is present for processing water-related data
+    'electricity_file_combine',
+    'combine_store',
+    'forecasting_model.water_linear_regression',
+    'forecasting_model.Water_Random_Forest',
+    'forecasting_model.scheduler',
+    'forecasting_model.plots',
+    'weather_forecast'
+]
+
+water_file_combine = LazyModule('water_file_combine')
+electricity_file_combine = LazyModule('electricity_file_combine')
+combine_store = LazyModule('combine_store')
+water_linear_regression = LazyModule('forecasting_model.water_linear_regression')
+Water_Random_Forest = LazyModule('forecasting_model.Water_Random_Forest')
+scheduler = LazyModule('forecasting_model.scheduler')
+plots = LazyModule('forecasting_model.plots')
+weather_forecast = LazyModule('weather_forecast')
+
+
+def preload_modules():
+    # Import the heavy modules on a background thread so they are usually ready when the main window needs them
+    def load():
+        for name in HEAVY_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # Still raised again where the module is first used
+                print(f"Preloading {name} failed:", file=sys.stderr)
+                traceback.print_exc()
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
+
+# Charts whose pixmap is kept in memory, the most recently viewed ones
+MAX_SHOWN_CHARTS = 8
+
 class StartDialog(QDialog):
     def __init__(self):
         super().__init__()
@@ -51,6 +98,80 @@ class StartDialog(QDialog):
             return "Create a New Module"
         return None
 
+class TrainingWorker(QThread):
+    # Runs one "Process Data" pass off the UI thread. Qt delivers the signals to the window's thread,
+    # so year tabs can be added as each year finishes training
+    progress = pyqtSignal(int, int)   # fits done, total fits
+    year_done = pyqtSignal(str)       # a year whose models are all trained and whose predictions are stored
+    succeeded = pyqtSignal(object)    # scheduler.process_all summaries
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, tab_name, parent=None):
+        super().__init__(parent)
+        self.tab_name = tab_name
+
+    def run(self):
+        try:
+            if self.tab_name == "Electricity":
+                summaries = self.process_electricity()
+            else:
+                summaries = self.process_hydro()
+        except scheduler.Cancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(str(error))
+        else:
+            self.succeeded.emit(summaries)
+
+    def train(self, utility, file_paths):
+        # Every (model, year) fit runs in one process pool; the pool stops starting new fits once
+        # the Cancel button asked this thread to stop
+        summaries = scheduler.process_all(utility, file_paths,
+                                          on_year=lambda year, metrics: self.year_done.emit(str(year)),
+                                          on_progress=self.progress.emit,
+                                          should_stop=self.isInterruptionRequested)
+        # Nothing is rendered here: each chart is drawn when its tab is first viewed
+        return summaries
+
+    def process_electricity(self):
+        # Year partitions come from the store manifests, "All" is a virtual view over them.
+        # Every imported meter is processed, and the shared Combine store for the years no meter covers.
+        file_paths = electricity_file_combine.combined_file_paths()
+
+        # Usage and cost share one multi-output forest per year; each gets its own Lasso from one path search.
+        # The joint forest also stores the predictions the charts are drawn from
+        return self.train('Electricity', file_paths)
+
+    def process_hydro(self):
+        module_path = os.path.abspath(__file__)
+        current_dir = os.path.dirname(module_path)
+        folder_path = os.path.join(current_dir, 'Water', 'Combine')
+        # Year partitions come from the store manifest
+        file_paths = combine_store.partition_paths(folder_path, water_file_combine.COMBINED_PREFIX)
+
+        # Linear and forest fits of every year
+        summaries = self.train('Hydro', file_paths)
+        wlr_results, wlr_good_year = summaries['linear']
+        #print("Results:", wlr_results)
+        #print("Good Year:", wlr_good_year)
+
+        wrf_results, wrf_good_year = summaries['random_forest']
+        #print("Results:", wrf_results)
+        #print("Good Year:", wrf_good_year)
+
+        if self.isInterruptionRequested():
+            raise scheduler.Cancelled()
+        # The weather forecast is a blocking HTTP call, also kept off the UI thread
+        prediction_temperature, prediction_precipitation = weather_forecast.get_weather_forecast()
+
+        prediction_precipitation = 0.0  # Example precipitation
+        predicted_water_use_wlr = water_linear_regression.predict_water_use(prediction_temperature, prediction_precipitation, file_paths, wlr_good_year)
+        predicted_water_use_wrf = Water_Random_Forest.predict_water_use(prediction_temperature, prediction_precipitation, file_paths, wrf_good_year)
+        print("Predicted Water Use linear:", predicted_water_use_wlr)
+        print("Predicted Water Use forest:", predicted_water_use_wrf)
+        return summaries
+
 class MyWindow(QWidget):
     def __init__(self, module_option, reopen_start_dialog):
         super().__init__()
@@ -58,6 +179,11 @@ class MyWindow(QWidget):
         self.showMaximized()
         self.module_option = module_option
         self.reopen_start_dialog = reopen_start_dialog
+        # tab_name -> running TrainingWorker, and the Process/Cancel buttons and progress bar of each tab
+        self.workers = {}
+        self.controls = {}
+        # plot tab -> plot kind of the charts currently holding a pixmap, least recently viewed first
+        self.shown_charts = OrderedDict()
         self.initUI()
 
     def initUI(self):
@@ -78,28 +204,6 @@ class MyWindow(QWidget):
         main_layout.addWidget(self.back_button)
         self.setLayout(main_layout)
         
-    def load_png_to_tab(self, tab, image_path):
-        # Create a QLabel to hold the image
-        image_label = QLabel(tab)
-        # Load the image into a QPixmap
-        pixmap = QPixmap(image_path)
-        # Set the QPixmap onto the QLabel
-        image_label.setPixmap(pixmap)
-        # Optionally, adjust the label's size to fit the image:
-        image_label.resize(pixmap.width(), pixmap.height())
-        # Center the image
-        image_label.setAlignment(Qt.AlignCenter)
-        
-        # Create a layout for the tab if it doesn't already have one
-        if tab.layout() is None:
-            layout = QVBoxLayout(tab)
-            tab.setLayout(layout)
-        else:
-            layout = tab.layout()
-
-        # Add the image label to the tab's layout
-        layout.addWidget(image_label)
-
     def clearLayout(self, layout):
         if layout is not None:
             while layout.count():
@@ -110,7 +214,7 @@ class MyWindow(QWidget):
                 else:
                     self.clearLayout(item.layout())
     
-    def setupHydroTabs(self, directory_path, year_tabs_layout):
+    def setupHydroTabs(self, kind, year_tabs_layout, years=None):
         if self.hydro_tab.layout() is None:
             hydro_layout = QVBoxLayout(self.hydro_tab)
             self.hydro_tab.setLayout(hydro_layout)
@@ -119,39 +223,10 @@ class MyWindow(QWidget):
 
         hydro_sub_tabs = QTabWidget(self.hydro_tab)  # Make sure the year tabs are part of the hydro_tab layout
         hydro_layout.addWidget(hydro_sub_tabs)  # Add the year tabs widget to the hydro tab's layout
-
-        try:
-            for filename in os.listdir(directory_path):
-                if re.search(r"\b\d{4}\b", filename):  # Check if the filename indicates a year
-                    year_tab = QWidget()  # This will be the container for the "Annual" tab and any other subtabs
-                    hydro_sub_sub_tabs = QTabWidget(year_tab)  # Subtabs widget created inside the year tab
-                    year_tabs_layout.addWidget(hydro_sub_tabs)
-                    # Create and add the "Annual" tab with an image
-                    annual_tab = QWidget()
-                    self.loadImageToTab(annual_tab, os.path.join(directory_path, filename, "annual.png"))
-                    hydro_sub_sub_tabs.addTab(annual_tab, "Annual")
-
-                    # Create and add monthly tabs with images
-                    for month_index in range(1, 13):
-                        month_tab = QWidget()
-                        month_name = self.getMonthName(month_index)
-                        image_path = os.path.join(directory_path, filename, f"{month_index}.png")
-                        self.loadImageToTab(month_tab, image_path)
-                        hydro_sub_sub_tabs.addTab(month_tab, month_name)
-
-                    # Set the layout for the year tab to include the subtabs widget
-                    year_tab_layout = QVBoxLayout(year_tab)
-                    year_tab_layout.addWidget(hydro_sub_sub_tabs)
-                    year_tab.setLayout(year_tab_layout)
-
-                    hydro_sub_tabs.addTab(year_tab, filename)  # Add the year tab to the main year tabs widget
-                    #hydro_layout.insertWidget(2,hydro_sub_sub_tabs)
-
-        except FileNotFoundError:
-            print(f"Directory not found: {directory_path}")
+        return self.addYearTabs(hydro_sub_tabs, kind, year_tabs_layout, years)
         
         
-    def setupElectricityTabs(self, directory_path, year_tabs_layout):
+    def setupElectricityTabs(self, kind, year_tabs_layout, years=None):
         # This function is similar to setupHydroTabs but for electricity data visualization
         if self.electricity_tab.layout() is None:
             electricity_layout = QVBoxLayout(self.electricity_tab)
@@ -161,41 +236,81 @@ class MyWindow(QWidget):
 
         electricity_sub_tabs = QTabWidget(self.electricity_tab)
         electricity_layout.addWidget(electricity_sub_tabs)
-
-        try:
-            for filename in os.listdir(directory_path):
-                if re.search(r"\b\d{4}\b", filename):
-                    year_tab = QWidget()
-                    electricity_sub_sub_tabs = QTabWidget(year_tab)
-                    year_tabs_layout.addWidget(electricity_sub_tabs)
-                    annual_tab = QWidget()
-                    self.load_png_to_tab(annual_tab, os.path.join(directory_path, filename, "annual_electricity_usage.png"))
-                    electricity_sub_sub_tabs.addTab(annual_tab, "Annual")
-
-                    for month_index in range(1, 13):
-                        month_tab = QWidget()
-                        month_name = self.getMonthName(month_index)
-                        self.load_png_to_tab(month_tab, os.path.join(directory_path, filename, f"month_{month_index}_electricity_usage.png"))
-                        electricity_sub_sub_tabs.addTab(month_tab, month_name)
-
-                    year_tab_layout = QVBoxLayout(year_tab)
-                    year_tab_layout.addWidget(electricity_sub_sub_tabs)
-                    year_tab.setLayout(year_tab_layout)
-
-                    electricity_sub_tabs.addTab(year_tab, filename)
-
-        except FileNotFoundError:
-            print(f"Directory not found: {directory_path}")
-            
-            
-    def loadImageToTab(self, tab, image_path):
-        label = QLabel(tab)
-        pixmap = QPixmap(image_path)
-        label.setPixmap(pixmap)
-        label.setAlignment(Qt.AlignCenter)
-        layout = QVBoxLayout()
-        layout.addWidget(label)
-        tab.setLayout(layout)
+        return self.addYearTabs(electricity_sub_tabs, kind, year_tabs_layout, years)
+
+    def addYearTabs(self, year_tabs, kind, year_tabs_layout, years=None):
+        # One tab per year, such 2020, 2021, ... (by default every year with stored predictions).
+        # More years can be added later with addYearTab as their training finishes
+        year_tabs_layout.addWidget(year_tabs)
+        year_tabs.currentChanged.connect(lambda index: self.showYearTab(year_tabs.currentWidget()))
+        for year in plots.available_years(kind) if years is None else years:
+            self.addYearTab(year_tabs, kind, year)
+        return year_tabs
+
+    def addYearTab(self, year_tabs, kind, year):
+        # An empty year tab kept in year order; its sub-tabs are built when it is first selected
+        if not re.search(r"\b\d{4}\b", year):  # Check if the label indicates a year
+            return
+        year_tab = QWidget()  # This will be the container for the "Annual" tab and any other subtabs
+        year_tab.plot_year = (kind, year)
+        year_tab.sub_tabs = None
+
+        position = sum(1 for index in range(year_tabs.count()) if year_tabs.tabText(index) < year)
+        year_tabs.insertTab(position, year_tab, year)  # Add the year tab to the main year tabs widget
+
+    def buildYearTab(self, year_tab):
+        # The "Annual" and 12 monthly sub-tabs, each an empty label until its chart is first viewed
+        kind, year = year_tab.plot_year
+        sub_sub_tabs = QTabWidget(year_tab)  # Subtabs widget created inside the year tab
+
+        for month_index in [None] + list(range(1, 13)):
+            plot_tab = QWidget()
+            plot_tab.plot = (kind, year, month_index)
+            plot_tab.chart = QLabel(plot_tab)
+            plot_tab.chart.setAlignment(Qt.AlignCenter)
+            plot_tab_layout = QVBoxLayout(plot_tab)
+            plot_tab_layout.addWidget(plot_tab.chart)
+            tab_name = "Annual" if month_index is None else self.getMonthName(month_index)
+            sub_sub_tabs.addTab(plot_tab, tab_name)
+        sub_sub_tabs.currentChanged.connect(lambda index, tabs=sub_sub_tabs: self.showPlotTab(tabs.currentWidget()))
+
+        # Set the layout for the year tab to include the subtabs widget
+        year_tab_layout = QVBoxLayout(year_tab)
+        year_tab_layout.addWidget(sub_sub_tabs)
+        year_tab.setLayout(year_tab_layout)
+        year_tab.sub_tabs = sub_sub_tabs
+
+    def showYearTab(self, year_tab):
+        if year_tab is not None:
+            if year_tab.sub_tabs is None:
+                self.buildYearTab(year_tab)
+            self.showPlotTab(year_tab.sub_tabs.currentWidget())
+
+    def showPlotTab(self, plot_tab):
+        # Draw the tab's chart from the stored predictions straight into a pixmap (no PNG on disk).
+        # Only the MAX_SHOWN_CHARTS most recently viewed charts keep their pixmap; older ones are
+        # released and drawn again if viewed again
+        if plot_tab is None:
+            return
+        if plot_tab in self.shown_charts:
+            self.shown_charts.move_to_end(plot_tab)
+            return
+        image = plots.render_image(*plot_tab.plot)
+        if image is None:
+            plot_tab.chart.setText('No data for this period')
+        else:
+            height, width = image.shape[:2]
+            qimage = QImage(image.data, width, height, 4 * width, QImage.Format_RGBA8888)
+            plot_tab.chart.setPixmap(QPixmap.fromImage(qimage))
+        self.shown_charts[plot_tab] = plot_tab.plot[0]
+        while len(self.shown_charts) > MAX_SHOWN_CHARTS:
+            released, _ = self.shown_charts.popitem(last=False)
+            released.chart.clear()
+
+    def forgetCharts(self, kind):
+        # Charts of year tabs about to be deleted
+        for plot_tab in [plot_tab for plot_tab, plot_kind in self.shown_charts.items() if plot_kind == kind]:
+            del self.shown_charts[plot_tab]
 
     def getMonthName(self, month_index):
         import calendar
@@ -206,18 +321,26 @@ class MyWindow(QWidget):
         open_button = QPushButton('Open File', tab)
         process_button = QPushButton('Process Data', tab)
         process_button.setEnabled(False)
+        cancel_button = QPushButton('Cancel', tab)
+        cancel_button.setVisible(False)
+        progress_bar = QProgressBar(tab)
+        progress_bar.setVisible(False)
         file_label = QLabel('', tab)
         year_tabs_placeholder = QWidget(tab)  # Placeholder widget for year tabs
         year_tabs_placeholder_layout = QVBoxLayout(year_tabs_placeholder)
+        self.controls[tab_name] = {'process': process_button, 'cancel': cancel_button, 'progress': progress_bar}
 
 
         open_button.clicked.connect(lambda: self.on_open_file_click(tab_name, file_label, process_button))
         process_button.clicked.connect(lambda: self.on_process_data_click(tab_name, year_tabs_placeholder_layout))
+        cancel_button.clicked.connect(lambda: self.on_cancel_click(tab_name))
 
 
         tab_layout = QVBoxLayout(tab)
         tab_layout.addWidget(open_button)
         tab_layout.addWidget(process_button)
+        tab_layout.addWidget(cancel_button)
+        tab_layout.addWidget(progress_bar)
         tab_layout.addWidget(file_label)
         tab_layout.addWidget(year_tabs_placeholder)  # Add the placeholder to the layout
         tab_layout.addStretch(1)
@@ -226,6 +349,13 @@ class MyWindow(QWidget):
         self.close()
         self.reopen_start_dialog()
 
+    def closeEvent(self, event):
+        # Stop running training (its current fits finish first) before the window goes away
+        for worker in list(self.workers.values()):
+            worker.requestInterruption()
+            worker.wait()
+        super().closeEvent(event)
+
     def on_open_file_click(self, tab_name, file_label, process_button):
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
@@ -256,86 +386,64 @@ class MyWindow(QWidget):
             
 
     def on_process_data_click(self, tab_name, year_tabs_layout):
+        if tab_name in self.workers:
+            return
         print(f"Processing Data for {tab_name}...")
         
         # Clear the existing year tabs first
         self.clearLayout(year_tabs_layout)
 
-        if tab_name == "Electricity":                  
-            # Assuming electricity_file_combine has a method for post-combination processing
-            #electricity_file_combine.process_data()
-            # Implement your logic for processing electricity data here
-            module_path = os.path.abspath(__file__)
-            current_dir = os.path.dirname(module_path)
-            folder_path = os.path.join(current_dir, rf'Electricity\Combine')
-            #folder_path = 'Water/Combine'  # Example path to "Combine" folder
-            # Ensure this path logic and processing matches your project structure and requirements
-            file_paths = {file.split('_')[3].split('.')[0]: os.path.join(folder_path, file) 
-                          for file in os.listdir(folder_path) if file.endswith('.csv')}
-        
-            
-            # Assuming process_files_and_get_best_year is a method to handle file processing and get the best year
-            results, best_year = electricity_linear_regression.process_files_and_get_best_model_electricity(file_paths)
-            results, best_year = electricity_linear_regression.process_files_and_get_best_model_electricity_cost(file_paths)
-
-            # Assuming process_files_and_get_best_year is a method to handle file processing and get the best year         
-            results, best_year = electricity_random_forest.process_files_and_get_best_year(file_paths)
-            results, best_year = electricity_random_forest.process_files_and_get_best_year_cost(file_paths)
-
-
-            
-            
-            # dynamiclly create year tabs, such 2020, 2021, ...
-            folder_path_2_find = os.path.join(current_path, 'Electricity', 'Graphs')
-            self.setupElectricityTabs(folder_path_2_find, year_tabs_layout)
- 
-
-            
+        # dynamiclly create year tabs, such 2020, 2021, ... filled in as each year finishes training
+        if tab_name == "Electricity":
+            kind = 'electricity_usage'
+            self.forgetCharts(kind)
+            year_tabs = self.setupElectricityTabs(kind, year_tabs_layout, years=[])
         elif tab_name == "Hydro":
-            # Assuming water_file_combine has a method for post-combination processing
-            # Example usage of water_linear_regression assuming its methods are as below
-            # Get the current working directory
-            #current_dir = os.getcwd()
-            module_path = os.path.abspath(__file__)
-            current_dir = os.path.dirname(module_path)
-            folder_path = os.path.join(current_dir, rf'Water\Combine')
-            #folder_path = 'Water/Combine'  # Example path to "Combine" folder
-            # Ensure this path logic and processing matches your project structure and requirements
-            file_paths = {file.split('_')[3].split('.')[0]: os.path.join(folder_path, file) 
-                          for file in os.listdir(folder_path) if file.endswith('.csv')}
-        
-            
-            # Assuming process_files_and_get_best_year is a method to handle file processing and get the best year
-            wlr_good_year = {}
-            wlr_results, wlr_good_year = water_linear_regression.process_files_and_get_years_with_good_r2(file_paths)
-            #print("Results:", wlr_results)
-            #print("Good Year:", wlr_good_year)
-
-            # Assuming process_files_and_get_best_year is a method to handle file processing and get the best year
-            wrf_good_year = {}
-            wrf_results, wrf_good_year = Water_Random_Forest.process_files_and_get_years_with_good_r2(file_paths)
-            #print("Results:", wrf_results)
-            #print("Good Year:", wrf_good_year)
-
-            
-            
-            # dynamiclly create year tabs, such 2020, 2021, ...
-            folder_path_2_find = os.path.join(current_path, 'Water', 'Graph')
-            self.setupHydroTabs(folder_path_2_find, year_tabs_layout)
-            
-            prediction_temperature, prediction_precipitation = weather_forecast.get_weather_forecast()
-
-            prediction_precipitation = 0.0  # Example precipitation
-            predicted_water_use_wlr = water_linear_regression.predict_water_use(prediction_temperature, prediction_precipitation, file_paths, wlr_good_year)
-            predicted_water_use_wrf = Water_Random_Forest.predict_water_use(prediction_temperature, prediction_precipitation, file_paths, wrf_good_year)
-            print("Predicted Water Use linear:", predicted_water_use_wlr)
-            print("Predicted Water Use forest:", predicted_water_use_wrf)
+            kind = 'water'
+            self.forgetCharts(kind)
+            year_tabs = self.setupHydroTabs(kind, year_tabs_layout, years=[])
+
+        controls = self.controls[tab_name]
+        controls['process'].setEnabled(False)
+        controls['cancel'].setEnabled(True)
+        controls['cancel'].setVisible(True)
+        controls['progress'].setValue(0)
+        controls['progress'].setVisible(True)
+
+        worker = TrainingWorker(tab_name, self)
+        worker.progress.connect(lambda done, total: self.on_training_progress(tab_name, done, total))
+        worker.year_done.connect(lambda year: self.addYearTab(year_tabs, kind, year))
+        worker.cancelled.connect(lambda: print(f"Processing {tab_name} cancelled"))
+        worker.failed.connect(lambda message: print(f"Processing {tab_name} failed: {message}"))
+        worker.finished.connect(lambda: self.on_training_finished(tab_name))
+        self.workers[tab_name] = worker
+        worker.start()
+
+    def on_training_progress(self, tab_name, done, total):
+        progress_bar = self.controls[tab_name]['progress']
+        progress_bar.setMaximum(total)
+        progress_bar.setValue(done)
+
+    def on_cancel_click(self, tab_name):
+        worker = self.workers.get(tab_name)
+        if worker is not None:
+            # Fits already running finish first; no new one is started
+            worker.requestInterruption()
+            self.controls[tab_name]['cancel'].setEnabled(False)
+
+    def on_training_finished(self, tab_name):
+        self.workers.pop(tab_name, None)
+        controls = self.controls[tab_name]
+        controls['process'].setEnabled(True)
+        controls['cancel'].setVisible(False)
+        controls['progress'].setVisible(False)
 
 
                
 
 def main():
     app = QApplication(sys.argv)
+    preload_modules()
     def reopen_start_dialog():
         while True:
             start_dialog = StartDialog()
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score
+
+# Benchmark: tree model backends (forecasting_model/backends.py) on the combined daily electricity
+# data and on a synthetic multi-year hourly series of the same shape, comparing fit time,
+# predict latency, pickled model size and holdout R2.
+# Usage: python benchmarks/bench_backends.py [years of hourly data, default 3]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import combine_store  # noqa: E402
+import electricity_file_combine  # noqa: E402
+from forecasting_model import backends  # noqa: E402
+from forecasting_model import dataset  # noqa: E402
+from forecasting_model import electricity_random_forest  # noqa: E402
+
+
+def daily_data():
+    # The first store's "All" view
+    paths = [path for label, path in electricity_file_combine.combined_file_paths().items()
+             if combine_store.label_year(label) == combine_store.ALL_KEY]
+    if not paths:
+        return None
+    data = dataset.load_electricity(paths[0])
+    return data[electricity_random_forest.FEATURES].fillna(0), data['Total_Usage']
+
+
+def hourly_data(years, seed=42):
+    # Yearly temperature cycle, a daily load profile, heating/cooling load and noise
+    rng = np.random.default_rng(seed)
+    hours = np.arange(years * 365 * 24)
+    day_of_year = (hours // 24) % 365 + 1
+    hour = hours % 24
+    temperature = 8 - 14 * np.cos(2 * np.pi * (day_of_year - 15) / 365) + 4 * np.sin(2 * np.pi * (hour - 9) / 24)
+    temperature += rng.normal(0, 3, len(hours))
+    usage = 0.4 + 0.6 * np.exp(-((hour - 19) ** 2) / 8) + 0.05 * np.abs(temperature - 18)
+    usage += rng.normal(0, 0.1, len(hours))
+    X = pd.DataFrame({'Day of Year': day_of_year, 'Hour': hour, 'Temperature': temperature})
+    return X, pd.Series(usage)
+
+
+def measure(backend, X, y):
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = backends.make_model(backend)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    row = X_test.iloc[:1]
+    repeat = 20
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(row)
+    single_latency = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    batch_latency = time.perf_counter() - start
+
+    size = len(pickle.dumps(model))
+    return fit_time, single_latency, batch_latency, size, r2_score(y_test, y_pred)
+
+
+def report(name, data):
+    if data is None:
+        print(f"{name}: no data")
+        return
+    X, y = data
+    print(f"{name}: {len(X)} rows, {X.shape[1]} features")
+    print(f"{'backend':>24} {'fit':>9} {'1-row predict':>14} {'test predict':>13} {'size':>10} {'R2':>7}")
+    for backend in backends.ESTIMATORS:
+        fit_time, single, batch, size, r2 = measure(backend, X, y)
+        print(f"{backend:>24} {fit_time:8.3f}s {single * 1000:12.2f}ms {batch * 1000:11.2f}ms "
+              f"{size / 1024 / 1024:8.2f}MB {r2:7.3f}")
+    print()
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    report('daily electricity (All view)', daily_data())
+    report(f'synthetic hourly, {years} years', hourly_data(years))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.linear_model import Lasso
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# Benchmark: joint usage+cost training (one multi-output model per year) against one model per target,
+# for the electricity forests and the Lasso alpha search, on every combined electricity year.
+# Only the fits are timed; the model cache is bypassed. The scheduler uses the joint forest only: the
+# shared Lasso alpha saves no time and would change the usage and cost models.
+# Usage: python benchmarks/bench_joint.py [repeats, default 3]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import electricity_file_combine  # noqa: E402
+from forecasting_model import backends  # noqa: E402
+from forecasting_model import dataset  # noqa: E402
+from forecasting_model import lasso_search  # noqa: E402
+from forecasting_model import electricity_random_forest  # noqa: E402
+
+LINEAR_FEATURES = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
+TARGETS = electricity_random_forest.JOINT_TARGETS
+
+
+def forests_separate(X, Y):
+    for target in TARGETS:
+        backends.make_model().fit(X, Y[target])
+
+
+def forest_joint(X, Y):
+    TransformedTargetRegressor(regressor=backends.make_model(multi_output=True),
+                               transformer=StandardScaler()).fit(X, Y)
+
+
+def lasso_separate(X, Y):
+    for target in TARGETS:
+        alpha = lasso_search.best_alphas(X, Y[target].to_numpy())[0]
+        lasso_search.fit_lasso(X, Y[target], alpha)
+
+
+def lasso_joint(X, Y):
+    alpha = lasso_search.best_alphas(X, Y.to_numpy(), shared=True, scale_targets=True)[0]
+    TransformedTargetRegressor(regressor=Lasso(alpha=alpha, max_iter=lasso_search.MAX_ITER),
+                               transformer=StandardScaler()).fit(X, Y)
+
+
+def training_sets():
+    forest_sets, linear_sets = [], []
+    for year, path in electricity_file_combine.combined_file_paths(include_all=False).items():
+        df = dataset.load_electricity(path)
+        Y = df[TARGETS].fillna(0)
+        forest_sets.append((df[electricity_random_forest.FEATURES].fillna(0), Y))
+        X = StandardScaler().fit_transform(df[LINEAR_FEATURES].fillna(df[LINEAR_FEATURES].mean()))
+        X_train, _, Y_train, _ = train_test_split(X, Y, test_size=0.3, random_state=42)
+        linear_sets.append((X_train, Y_train))
+    return forest_sets, linear_sets
+
+
+def timed(fit, sets, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for X, Y in sets:
+            fit(X, Y)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    forest_sets, linear_sets = training_sets()
+    if not forest_sets:
+        print("no electricity data")
+        return
+    print(f"{len(forest_sets)} years, best of {repeat}")
+    for name, separate, joint, sets in [('forest', forests_separate, forest_joint, forest_sets),
+                                        ('lasso', lasso_separate, lasso_joint, linear_sets)]:
+        separate_time = timed(separate, sets, repeat)
+        joint_time = timed(joint, sets, repeat)
+        print(f"{name:>7}: one model per target {separate_time:.3f}s, joint {joint_time:.3f}s "
+              f"({joint_time / separate_time:.0%} of the separate time)")
+
+
+if __name__ == '__main__':
+    main()
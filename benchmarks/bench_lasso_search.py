@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.linear_model import Lasso
+from sklearn.preprocessing import StandardScaler
+
+# Benchmark: Lasso alpha search for usage and cost of every combined electricity year,
+# one 5-fold GridSearchCV per target (the previous approach) vs the shared regularization path.
+# Usage: python benchmarks/bench_lasso_search.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import electricity_file_combine  # noqa: E402
+from forecasting_model import dataset  # noqa: E402
+from forecasting_model import lasso_search  # noqa: E402
+
+FEATURES = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
+TARGETS = ['Total_Usage', 'Total_Cost']
+GRID = np.logspace(-4, 0, 5)
+
+
+def training_sets():
+    sets = []
+    for year, path in electricity_file_combine.combined_file_paths().items():
+        df = dataset.load_electricity(path)
+        X = StandardScaler().fit_transform(df[FEATURES].fillna(df[FEATURES].mean()))
+        y = df[TARGETS].fillna(0).to_numpy()
+        X_train, _, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=42)
+        sets.append((year, X_train, y_train))
+    return sets
+
+
+def grid_search(X, y):
+    alphas = []
+    for j in range(y.shape[1]):
+        search = GridSearchCV(Lasso(max_iter=10000), param_grid={'alpha': GRID}, cv=5, scoring='r2')
+        search.fit(X, y[:, j])
+        alphas.append(search.best_params_['alpha'])
+    return np.array(alphas)
+
+
+def timed(search, sets, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        picks = [search(X, y) for _, X, y in sets]
+    return (time.perf_counter() - start) / repeat, picks
+
+
+def main():
+    sets = training_sets()
+    if not sets:
+        print("No combined electricity data found")
+        return
+
+    repeat = 5
+    grid_time, grid_picks = timed(grid_search, sets, repeat)
+    path_time, path_picks = timed(lambda X, y: lasso_search.best_alphas(X, y, GRID), sets, repeat)
+    dense_time, dense_picks = timed(lambda X, y: lasso_search.best_alphas(X, y), sets, repeat)
+    print(f"{len(sets)} years x {len(TARGETS)} targets")
+    print(f"GridSearchCV, {len(GRID)} alphas      : {grid_time * 1000:8.1f} ms")
+    print(f"path search, {len(GRID)} alphas       : {path_time * 1000:8.1f} ms ({grid_time / path_time:.1f}x)")
+    print(f"path search, {len(lasso_search.ALPHAS)} alphas      : {dense_time * 1000:8.1f} ms ({grid_time / dense_time:.1f}x)")
+    for (year, _, _), grid_alpha, path_alpha, dense_alpha in zip(sets, grid_picks, path_picks, dense_picks):
+        print(f"{year}: best alpha grid {grid_alpha}, path {path_alpha}, dense path {dense_alpha}")
+
+
+if __name__ == '__main__':
+    main()
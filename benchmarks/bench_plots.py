@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+# Benchmark: producing the full Graphs / Graphs_cost / Water/Graph tree.
+# "per-chart pyplot" is how the charts used to be drawn (a new pyplot figure, tight_layout, savefig
+# and close for every chart), at matplotlib's default zlib level and at plots.PNG_COMPRESS_LEVEL, so
+# the PNG encoding and the canvas reuse are measured separately; "reused canvas" is plots.render_all
+# on one and on all cores, and "cached" is the same call once every image is up to date.
+# Usage: python benchmarks/bench_plots.py [workers]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import combine_store  # noqa: E402
+import water_file_combine  # noqa: E402
+import electricity_file_combine  # noqa: E402
+from forecasting_model import plots  # noqa: E402
+from forecasting_model import scheduler  # noqa: E402
+
+
+def store_predictions():
+    # Training stores the predictions the charts are drawn from (models come from the model cache)
+    water_paths = combine_store.partition_paths(os.path.join(ROOT, 'Water', 'Combine'), water_file_combine.COMBINED_PREFIX)
+    if water_paths:
+        scheduler.process_all('Hydro', water_paths, max_workers=1)
+    electricity_paths = electricity_file_combine.combined_file_paths()
+    if electricity_paths:
+        scheduler.process_all('Electricity', electricity_paths, max_workers=1)
+
+
+def charts():
+    for kind in plots.PLOT_SPECS:
+        for year in plots.available_years(kind):
+            predictions = plots.load_predictions(kind, year)
+            yield kind, year, None, predictions
+            for month in np.unique(predictions['months']):
+                yield kind, year, int(month), predictions
+
+
+def per_chart_pyplot(folder, compress_level=None):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    count = 0
+    for kind, year, month, predictions in charts():
+        spec = plots.PLOT_SPECS[kind]
+        if month is None:
+            rows = slice(None)
+            title, label = spec['annual_title'].format(year=year), spec['annual_predicted_label']
+            predicted = predictions.get('annual_predicted', predictions['predicted'])
+        else:
+            rows = predictions['months'] == month
+            title, label = spec['month_title'].format(month=month), spec['month_predicted_label']
+            predicted = predictions['predicted']
+        plt.figure(figsize=(10, 6))
+        plt.plot(predictions['x'][rows], predictions['actual'][rows], label=spec['actual_label'], color='green', linewidth=2)
+        plt.plot(predictions['x'][rows], predicted[rows], label=label, color='red', linestyle=spec['predicted_linestyle'])
+        plt.title(title)
+        plt.xlabel(spec['xlabel'])
+        plt.ylabel(spec['ylabel'])
+        plt.legend()
+        plt.tight_layout()
+        pil_kwargs = None if compress_level is None else {'compress_level': compress_level}
+        plt.savefig(os.path.join(folder, f'{count}.png'), pil_kwargs=pil_kwargs)
+        plt.close()
+        count += 1
+    return count
+
+
+def invalidate():
+    for kind in plots.PLOT_SPECS:
+        for year in plots.available_years(kind):
+            path = os.path.join(plots.plot_folder(kind, year), plots.KEYS_NAME)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def timed(name, function, *args):
+    start = time.perf_counter()
+    count = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>34}: {count:4d} charts in {elapsed:7.2f}s ({elapsed / max(count, 1) * 1000:6.1f} ms/chart)")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    store_predictions()
+    with tempfile.TemporaryDirectory() as folder:
+        timed('per-chart pyplot, default zlib', per_chart_pyplot, folder)
+        timed(f'per-chart pyplot, zlib {plots.PNG_COMPRESS_LEVEL}', per_chart_pyplot, folder, plots.PNG_COMPRESS_LEVEL)
+    invalidate()
+    timed(f'reused canvas, zlib {plots.PNG_COMPRESS_LEVEL}, 1 worker', plots.render_all, None, 1)
+    invalidate()
+    timed(f'reused canvas, zlib {plots.PNG_COMPRESS_LEVEL}, {workers} workers', plots.render_all, None, workers)
+    timed('cached', plots.render_all, None, workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import glob
+import time
+import pandas as pd
+
+# Benchmark: per-file parse time for a year of monthly water exports,
+# row-by-row date conversion (the previous convert_date_fixed approach) vs the vectorized parser.
+# Usage: python benchmarks/bench_water_parse.py [folder with "Water Use For {Month} {Year}.csv" files]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import water_file_combine  # noqa: E402
+
+
+def legacy_convert_date(day_of_month, file_path):
+    # Per-row conversion as it used to run through Series.apply
+    parts = file_path.replace('\\', '/').split('/')[-1].split(' ')
+    month_str = parts[-2]
+    year_str = parts[-1].split('.')[0]
+    month_map = {
+        "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+        "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
+    }
+    month = month_map[month_str[:3]]
+    day = int(day_of_month.split(' ')[-1].split('-')[0])
+    date = pd.to_datetime(f"{year_str}-{month:02d}-{day:02d}").strftime('%Y-%m-%d')
+    return date, year_str
+
+
+def legacy_load(file_path):
+    df = pd.read_csv(file_path)
+    df['Date'], df['Year'] = zip(*df['Day of Month'].apply(lambda x: legacy_convert_date(x, file_path)))
+    df.drop(['Day of Month'], axis=1, inplace=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Outside Temperature (°C)'] = df['Outside Temperature (°C)'].str.replace(' C', '').astype(float)
+    df['Precipitation (mm)'] = df['Precipitation (mm)'].str.replace(' mm', '').astype(float)
+    return df
+
+
+def time_per_file(load, file_paths, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for file_path in file_paths:
+            load(file_path)
+    return (time.perf_counter() - start) / (repeat * len(file_paths))
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'Water', 'Data 2023')
+    file_paths = sorted(glob.glob(os.path.join(folder, 'Water Use For * *.csv')))
+    if not file_paths:
+        print(f"No water exports found in {folder}")
+        return
+
+    repeat = 20
+    legacy = time_per_file(legacy_load, file_paths, repeat)
+    vectorized = time_per_file(water_file_combine.load_water_file, file_paths, repeat)
+    print(f"{len(file_paths)} files from {folder}")
+    print(f"row-by-row parser : {legacy * 1000:8.2f} ms/file")
+    print(f"vectorized parser : {vectorized * 1000:8.2f} ms/file ({legacy / vectorized:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import ast
+import json
+import time
+import subprocess
+
+# Startup budget check for the GUI.
+# GUI_demo.py must not import pandas, numpy, scikit-learn, matplotlib, requests or the model modules
+# at module load: they are imported on first use or preloaded while the start dialog is shown.
+# This script fails (exit status 1) when
+# - a module-level import of GUI_demo.py pulls in one of those modules,
+# - importing GUI_demo takes longer than IMPORT_BUDGET seconds, or
+# - the start dialog is painted later than FIRST_PAINT_BUDGET seconds after the interpreter starts.
+# The timed checks run in fresh interpreters with Qt's offscreen platform and need PyQt5.
+# Usage: python benchmarks/check_startup.py
+# tests/test_startup.py runs the same checks with pytest.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_PATH = os.path.join(ROOT, 'GUI_demo.py')
+
+IMPORT_BUDGET = 0.5
+FIRST_PAINT_BUDGET = 1.5
+
+HEAVY_PACKAGES = ['pandas', 'numpy', 'sklearn', 'matplotlib', 'requests', 'joblib', 'scipy', 'forecasting_model']
+LOCAL_MODULES = ['water_file_combine', 'electricity_file_combine', 'combine_store', 'weather_forecast',
+                 'columnar_cache', 'green_button_xml', 'interval_store', 'rollup_index', 'sufficient_stats']
+
+IMPORT_SCRIPT = '''
+import sys, time, json
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import GUI_demo
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+'''
+
+PAINT_SCRIPT = '''
+import sys, json
+sys.path.insert(0, {root!r})
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+import GUI_demo
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(json.dumps({{'painted': True}}))
+            sys.stdout.flush()
+            QApplication.instance().exit(0)
+        return False
+
+app = QApplication(sys.argv)
+GUI_demo.preload_modules()
+dialog = GUI_demo.StartDialog()
+watcher = FirstPaint()
+dialog.installEventFilter(watcher)
+dialog.show()
+QTimer.singleShot(10000, lambda: app.exit(1))
+sys.exit(app.exec_())
+'''
+
+
+def is_heavy(name):
+    top = name.split('.')[0]
+    return top in HEAVY_PACKAGES or top in LOCAL_MODULES
+
+
+def module_level_imports(path):
+    # Names imported by statements at the top level of a file (not inside functions or classes)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return names
+
+
+def has_pyqt():
+    result = subprocess.run([sys.executable, '-c', 'import PyQt5.QtWidgets'], capture_output=True)
+    return result.returncode == 0
+
+
+def run(script):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script.format(root=ROOT)], capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1]), elapsed
+
+
+def check(name, ok, detail):
+    print(f"{'ok' if ok else 'FAIL':>4}  {name}: {detail}")
+    return ok
+
+
+def main():
+    results = []
+    heavy = [name for name in module_level_imports(GUI_PATH) if is_heavy(name)]
+    results.append(check('module-level imports', not heavy, ', '.join(heavy) or 'none of the heavy modules'))
+
+    if not has_pyqt():
+        print('skip  import time and first paint: PyQt5 is not installed')
+    else:
+        report, _ = run(IMPORT_SCRIPT)
+        loaded = sorted({name.split('.')[0] for name in report['modules'] if is_heavy(name)})
+        results.append(check('modules loaded by import GUI_demo', not loaded, ', '.join(loaded) or 'none of the heavy modules'))
+        results.append(check('import GUI_demo', report['seconds'] <= IMPORT_BUDGET,
+                             f"{report['seconds']:.3f}s (budget {IMPORT_BUDGET}s)"))
+        _, elapsed = run(PAINT_SCRIPT)
+        results.append(check('first paint of the start dialog', elapsed <= FIRST_PAINT_BUDGET,
+                             f"{elapsed:.3f}s from interpreter start (budget {FIRST_PAINT_BUDGET}s)"))
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+
+# Batch export: writes the PNG of every chart whose stored predictions are newer than its image,
+# into the usual Graphs folders. The GUI does not need this, it draws each chart in memory when its
+# tab is first viewed.
+# Usage: python benchmarks/render_charts.py [plot kind ...] [--workers N]
+#   e.g. python benchmarks/render_charts.py water electricity_usage --workers 4
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from forecasting_model import plots  # noqa: E402
+from forecasting_model import scheduler  # noqa: E402
+
+
+def main():
+    args = sys.argv[1:]
+    workers = None
+    if '--workers' in args:
+        position = args.index('--workers')
+        workers = int(args[position + 1])
+        del args[position:position + 2]
+    unknown = [kind for kind in args if kind not in plots.PLOT_SPECS]
+    if unknown:
+        sys.exit(f"unknown plot kind {', '.join(unknown)}, expected one of {', '.join(plots.PLOT_SPECS)}")
+    start = time.perf_counter()
+    try:
+        count = plots.render_all(args or None, max_workers=workers)
+    finally:
+        scheduler.shutdown_pool()
+    print(f"{count} charts written in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
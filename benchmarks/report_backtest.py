@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import pandas as pd
+
+# Report: rolling-origin backtest (forecasting_model/backtest.py) of every model family.
+# Prints the fold x model metrics table, the per-model means and the run time. A second run only
+# computes the folds whose rows changed, so rerunning after adding a month is cheap.
+# Usage: python benchmarks/report_backtest.py [Electricity|Hydro] [workers]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import combine_store  # noqa: E402
+import water_file_combine  # noqa: E402
+import electricity_file_combine  # noqa: E402
+from forecasting_model import backtest  # noqa: E402
+
+
+def file_paths(utility):
+    if utility == 'Electricity':
+        return electricity_file_combine.combined_file_paths()
+    folder = os.path.join(ROOT, 'Water', 'Combine')
+    return combine_store.partition_paths(folder, water_file_combine.COMBINED_PREFIX, include_all=True)
+
+
+def main():
+    utilities = sys.argv[1:2] or list(backtest.UTILITIES)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    pd.set_option('display.width', 160)
+    pd.set_option('display.max_rows', 500)
+    for utility in utilities:
+        stores = combine_store.split_stores(file_paths(utility))
+        if not stores:
+            print(f"{utility}: no data")
+        # Every store (one per meter for electricity) has its own history
+        for store, paths in stores.items():
+            name = utility if store is None else f"{utility} {store}"
+            start = time.perf_counter()
+            table = backtest.run_backtest(utility, paths, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{name}: {len(table)} folds in {elapsed:.2f}s")
+            print(table.to_string(index=False))
+            print()
+            print(backtest.summarize(table))
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import numpy as np
+from sklearn.metrics import mean_squared_error, r2_score
+
+# Report: pooled cross-year water models vs the ensemble of per-year models.
+# Each qualifying year is held out in turn; the ensemble averages the models of the other qualifying
+# years (as predict_water_use does) and the pooled model is trained once on those same years.
+# Accuracy is measured on the held-out year, latency on getting the models (fit or load from the
+# model cache) and on a 365-day forecast.
+# Usage: python benchmarks/report_pooled.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import combine_store  # noqa: E402
+import water_file_combine  # noqa: E402
+from forecasting_model import dataset  # noqa: E402
+from forecasting_model import model_cache  # noqa: E402
+from forecasting_model import pooled  # noqa: E402
+from forecasting_model import water_linear_regression  # noqa: E402
+from forecasting_model import Water_Random_Forest  # noqa: E402
+
+MODELS = {
+    'linear': water_linear_regression,
+    'random_forest': Water_Random_Forest
+}
+
+
+def ensemble_predict(module, file_paths, years, data):
+    X = data[module.PREDICTION_FEATURES].fillna(0)
+    return np.mean([module.get_prediction_model(file_paths[year]).predict(X) for year in years], axis=0)
+
+
+def pooled_predict(module, file_paths, years, data):
+    X = data[pooled.POOLED_FEATURES].fillna(0)
+    return module.get_pooled_model(file_paths, years).predict(X)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    folder = os.path.join(ROOT, 'Water', 'Combine')
+    file_paths = combine_store.partition_paths(folder, water_file_combine.COMBINED_PREFIX)
+    if len(file_paths) < 2:
+        print(f"Need at least two combined years in {folder}")
+        return
+
+    for name, module in MODELS.items():
+        _, good_years = module.summarize_results({year: module.fit_year(path, year) for year, path in file_paths.items()})
+        years = sorted(good_years) if len(good_years) >= 2 else sorted(file_paths)
+        print(f"{name}: qualifying years {years}")
+        print(f"{'held out':>10} {'ensemble R2':>12} {'pooled R2':>10} {'ensemble MSE':>13} {'pooled MSE':>11} "
+              f"{'ensemble fit':>13} {'pooled fit':>11}")
+
+        for held_out in years:
+            train_years = [year for year in years if year != held_out]
+            data = pooled.add_features(dataset.load_water(file_paths[held_out]))
+            data = data.dropna(subset=[pooled.TARGET])
+            y = data[pooled.TARGET]
+
+            # Nothing in memory; models already on disk are loaded instead of refit, as in the app
+            model_cache.clear_loaded()
+            ensemble, ensemble_fit = timed(ensemble_predict, module, file_paths, train_years, data)
+            result, pooled_fit = timed(pooled_predict, module, file_paths, train_years, data)
+            print(f"{held_out:>10} {r2_score(y, ensemble):12.3f} {r2_score(y, result):10.3f} "
+                  f"{mean_squared_error(y, ensemble):13.3f} {mean_squared_error(y, result):11.3f} "
+                  f"{ensemble_fit:12.3f}s {pooled_fit:10.3f}s")
+
+        # Forecast latency with warm models: 365 days of one weather scenario
+        days = np.arange(1, 366)
+        frame = pooled.prediction_frame(days, int(years[-1]) + 1, 10.0, 0.0)
+        repeat = 20
+        _, ensemble_latency = timed(lambda: [ensemble_predict(module, file_paths, years, frame) for _ in range(repeat)])
+        _, pooled_latency = timed(lambda: [pooled_predict(module, file_paths, years, frame) for _ in range(repeat)])
+        print(f"365-day forecast: ensemble {ensemble_latency / repeat * 1000:.2f} ms, "
+              f"pooled {pooled_latency / repeat * 1000:.2f} ms")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+import combine_store
+
+# Typed binary cache written next to every combined year CSV.
+# The cache is a .npy file holding a structured array: one field per column, 'Date' stored as
+# int32 days since 1970-01-01, every other column as float64 (integer columns as int32). The .npy
+# header carries the field names and dtypes, which is the schema. Loading maps the file and copies
+# each column into the frame once, with no CSV parsing; the frame does not keep the file open, so the
+# cache can be replaced while frames read from it are still in use.
+# The CSV stays the source of truth; the cache is rebuilt from it whenever it is stale.
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+NUMBER_PATTERN = r'(-?\d+(?:\.\d+)?)'
+
+
+def cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.npy'
+
+
+def to_number(series):
+    # Turn a column into numbers, stripping unit suffixes such as "4.50 C" or "1.00 mm"
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series.astype(str).str.extract(NUMBER_PATTERN)[0], errors='coerce')
+
+
+def _field_dtype(values):
+    if pd.api.types.is_integer_dtype(values):
+        return np.int32
+    return np.float64
+
+
+def to_records(df):
+    """
+    Converts a combined frame to the cache's structured array.
+    'Date' becomes epoch days and every other column becomes a number.
+    """
+    dates = pd.to_datetime(df['Date']).values.astype('datetime64[D]')
+    columns = {'Date': (dates - EPOCH).astype(np.int32)}
+    for name in df.columns:
+        if name != 'Date':
+            columns[name] = to_number(df[name]).to_numpy()
+
+    dtype = [(name, np.int32 if name == 'Date' else _field_dtype(values)) for name, values in columns.items()]
+    records = np.empty(len(df), dtype=dtype)
+    for name, values in columns.items():
+        records[name] = values
+    return records
+
+
+def write_cache(csv_path, df):
+    # Used as the combine_store on_write hook, so the cache follows every partition write
+    path = cache_path(csv_path)
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, to_records(df))
+    os.replace(tmp_path, path)
+
+
+def is_fresh(csv_path):
+    path = cache_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    if os.path.exists(csv_path) and os.path.getmtime(path) < os.path.getmtime(csv_path):
+        return False
+    return True
+
+
+def load_records(csv_path):
+    """
+    Returns the memory-mapped structured array for a combined year CSV, or None when the
+    cache is missing, older than the CSV, or in an older format (untyped object arrays, or
+    float32 weather columns).
+    """
+    if not is_fresh(csv_path):
+        return None
+    try:
+        records = np.load(cache_path(csv_path), mmap_mode='r')
+    except ValueError:
+        # Object arrays written by earlier versions cannot be memory-mapped
+        return None
+    if records.dtype.names is None or 'Date' not in records.dtype.names:
+        return None
+    if any(records.dtype[name] == np.float32 for name in records.dtype.names):
+        return None
+    return records
+
+
+def records_to_frame(records):
+    # Each column is copied out of the mapped file into the frame; 'Date' is converted back to timestamps
+    frame = {'Date': pd.to_datetime(EPOCH + records['Date'].astype('timedelta64[D]'))}
+    for name in records.dtype.names:
+        if name != 'Date':
+            frame[name] = records[name]
+    return pd.DataFrame(frame)
+
+
+def load_frame(csv_path):
+    """
+    Loads a combined year with numeric columns and a datetime 'Date' column.
+
+    Parameters:
+    - csv_path: str. A partition path from combine_store.partition_paths, including the virtual "All" path.
+
+    Returns:
+    - A DataFrame read from the binary cache, or from the CSV (refreshing the cache) when the cache is stale.
+    """
+    if combine_store.is_all_view(csv_path):
+        folder = os.path.dirname(csv_path)
+        prefix = os.path.basename(csv_path)[:-len(f'_{combine_store.ALL_KEY}.csv')]
+        paths = combine_store.partition_paths(folder, prefix)
+        frames = [load_frame(path) for path in paths.values()]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Date'])
+
+    records = load_records(csv_path)
+    if records is None:
+        df = pd.read_csv(csv_path)
+        write_cache(csv_path, df)
+        records = to_records(df)
+    return records_to_frame(records)
@@ -0,0 +1,251 @@
+import os
+import json
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Year-partitioned store shared by the electricity and water combine steps.
+# Each partition is one sorted CSV per year. A small manifest records every partition's
+# file, date range, row count and columns, so ingesting new rows only touches the years
+# they fall in, and the "All" view is a concatenation of the partitions in year order.
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+ALL_KEY = 'All'
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 4
+
+
+def manifest_path(folder):
+    return os.path.join(folder, MANIFEST_NAME)
+
+
+def partition_file_name(prefix, year):
+    return f'{prefix}_{year}.csv'
+
+
+def _write_atomic(path, write):
+    # Write to a temporary file first so a crash never leaves a half-written partition behind
+    tmp_path = path + '.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_json(path, obj):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(obj, f, indent=2, sort_keys=True)
+    _write_atomic(path, write)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(folder, manifest):
+    save_json(manifest_path(folder), manifest)
+
+
+def _partition_entry(prefix, year, df):
+    return {
+        'file': partition_file_name(prefix, year),
+        'start': df['Date'].iloc[0].strftime('%Y-%m-%d'),
+        'end': df['Date'].iloc[-1].strftime('%Y-%m-%d'),
+        'rows': int(len(df)),
+        'columns': list(df.columns)
+    }
+
+
+def rebuild_manifest(folder, prefix):
+    # Build the manifest from partition files written before the manifest existed
+    manifest = {'version': MANIFEST_VERSION, 'prefix': prefix, 'partitions': {}}
+    if os.path.isdir(folder):
+        for file_name in sorted(os.listdir(folder)):
+            year = file_name[len(prefix) + 1:-len('.csv')]
+            if file_name.startswith(prefix + '_') and file_name.endswith('.csv') and year.isdigit():
+                df = pd.read_csv(os.path.join(folder, file_name))
+                if len(df):
+                    df['Date'] = pd.to_datetime(df['Date'])
+                    manifest['partitions'][year] = _partition_entry(prefix, year, df)
+        save_manifest(folder, manifest)
+    return manifest
+
+
+def load_manifest(folder, prefix):
+    path = manifest_path(folder)
+    if os.path.exists(path):
+        manifest = load_json(path)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('prefix') == prefix:
+            return manifest
+    return rebuild_manifest(folder, prefix)
+
+
+def merge_sorted(existing, new, key='Date', fill_missing=False):
+    """
+    Merges new rows into an already sorted partition and drops duplicate keys.
+
+    Both inputs are sorted runs, so the stable sort below is a single linear merge (timsort).
+    On duplicate keys the most recently ingested row wins, for electricity and water alike,
+    so a corrected re-export always replaces what was stored before.
+    With fill_missing the merge is per column instead: a value missing from the newer row keeps
+    the older one, so rows built from different sources (e.g. an XML rollup without temperatures
+    and a CSV export of the same day) complete each other.
+    """
+    new = new.sort_values(by=key, kind='stable')
+    combined = pd.concat([existing, new], ignore_index=True)
+    order = np.argsort(combined[key].values, kind='stable')
+    combined = combined.iloc[order].reset_index(drop=True)
+    keys = combined[key].values
+    keep = np.ones(len(keys), dtype=bool)
+    keep[:-1] = keys[1:] != keys[:-1]
+    if fill_missing and not keep.all():
+        # GroupBy.last takes the last non-missing value of every column
+        columns = combined.columns
+        return combined.groupby(key, sort=False, as_index=False).last()[columns]
+    return combined[keep].reset_index(drop=True)
+
+
+def read_partition(folder, entry):
+    df = pd.read_csv(os.path.join(folder, entry['file']))
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def write_partition(folder, prefix, year, df, manifest, on_write=None):
+    path = os.path.join(folder, partition_file_name(prefix, year))
+    _write_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+    manifest['partitions'][str(year)] = _partition_entry(prefix, year, df)
+    if on_write is not None:
+        on_write(path, df)
+
+
+def merge_into_store(folder, prefix, df, on_write=None, fill_missing=False):
+    """
+    Merges a frame with a 'Date' column into the year partitions under folder.
+
+    Parameters:
+    - folder: str. The Combine folder holding the partitions and the manifest.
+    - prefix: str. Partition file prefix, e.g. 'Combined_Electricity_Usage'.
+    - df: DataFrame. New rows, in any order and spanning any number of years.
+    - on_write: callable(path, df), optional. Called with the full partition after it is written.
+    - fill_missing: bool. Merge duplicate dates column by column, see merge_sorted.
+
+    Returns:
+    - The list of years whose partitions changed.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    manifest = load_manifest(folder, prefix)
+
+    changed = []
+    for year, data in df.groupby(df['Date'].dt.year):
+        year = str(year)
+        data = data.sort_values(by='Date', kind='stable')
+        entry = manifest['partitions'].get(year)
+
+        if entry is None:
+            data = merge_sorted(data.iloc[:0], data, fill_missing=fill_missing)
+            write_partition(folder, prefix, year, data, manifest, on_write)
+        elif (data['Date'].iloc[0] > pd.Timestamp(entry['end'])
+                and list(data.columns) == entry['columns']
+                and not data['Date'].duplicated().any()):
+            # Rows after the end of the partition: append them instead of rewriting the year
+            path = os.path.join(folder, entry['file'])
+            data.to_csv(path, mode='a', header=False, index=False)
+            entry['end'] = data['Date'].iloc[-1].strftime('%Y-%m-%d')
+            entry['rows'] += int(len(data))
+            if on_write is not None:
+                on_write(path, read_partition(folder, entry))
+        else:
+            # Overlapping rows: merge the two sorted runs and rewrite only this year
+            existing = read_partition(folder, entry)
+            write_partition(folder, prefix, year, merge_sorted(existing, data, fill_missing=fill_missing),
+                            manifest, on_write)
+        changed.append(year)
+
+    save_manifest(folder, manifest)
+    return changed
+
+
+def map_files(load, file_paths, max_workers=None):
+    """
+    Runs load on every file, concurrently in a process pool when there are enough of them.
+
+    Parameters:
+    - load: callable(path). Must be a module-level function (or a partial of one) so it can be sent to workers.
+    - file_paths: list of str. The exports to parse.
+    - max_workers: int, optional. Pool size, defaults to the number of cores.
+
+    Returns:
+    - The results in the order of file_paths.
+    """
+    file_paths = list(file_paths)
+    if len(file_paths) < PARALLEL_MIN_FILES or max_workers == 1:
+        return [load(file_path) for file_path in file_paths]
+    # Spawned rather than forked, since the GUI parses files while its other threads run
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return list(executor.map(load, file_paths))
+
+
+def load_files(load, file_paths, max_workers=None):
+    """
+    Parses many exports into frames, see map_files.
+
+    Returns:
+    - The parsed frames concatenated in the order of file_paths, so later files win duplicate dates.
+    """
+    frames = map_files(load, file_paths, max_workers)
+    if not frames:
+        return pd.DataFrame(columns=['Date'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def partition_paths(folder, prefix, include_all=False):
+    # Map each year (and optionally the virtual "All" view) to its partition path
+    manifest = load_manifest(folder, prefix)
+    paths = {year: os.path.join(folder, entry['file'])
+             for year, entry in sorted(manifest['partitions'].items())}
+    if include_all and paths:
+        paths[ALL_KEY] = os.path.join(folder, partition_file_name(prefix, ALL_KEY))
+    return paths
+
+
+class StoreYear(namedtuple('StoreYear', ['store', 'year'])):
+    # Label of a year partition (or the "All" view) when several stores are processed together,
+    # e.g. one per meter. str() gives '<store> <year>', the name its predictions and charts are stored under.
+    __slots__ = ()
+
+    def __str__(self):
+        return f'{self.store} {self.year}'
+
+
+def label_year(label):
+    # Year (or ALL_KEY) of a partition label, plain or StoreYear
+    return label.year if isinstance(label, StoreYear) else str(label)
+
+
+def split_stores(file_paths):
+    # {label: path} -> {store: {year: path}}; plain year labels belong to store None
+    stores = {}
+    for label, path in file_paths.items():
+        store = label.store if isinstance(label, StoreYear) else None
+        stores.setdefault(store, {})[label_year(label)] = path
+    return stores
+
+
+def is_all_view(file_path):
+    return os.path.basename(file_path).endswith(f'_{ALL_KEY}.csv')
+
+
+def load_all(folder, prefix):
+    # Partitions never overlap and are sorted, so concatenating them in year order is already sorted
+    manifest = load_manifest(folder, prefix)
+    frames = [read_partition(folder, entry) for _, entry in sorted(manifest['partitions'].items())]
+    if not frames:
+        return pd.DataFrame(columns=['Date'])
+    return pd.concat(frames, ignore_index=True)
+
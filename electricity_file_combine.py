@@ -1,5 +1,53 @@
 import os
+import re
 import pandas as pd
+import green_button_xml
+import combine_store
+import columnar_cache
+import interval_store
+import rollup_index
+
+COMBINED_PREFIX = 'Combined_Electricity_Usage'
+
+# Utility exports are named DailyChart-<account>-<meter>-<export date>.csv
+DAILY_CHART_PATTERN = re.compile(r'DailyChart-(\d+)-(\d+)-(\d{4}-\d{2}-\d{2})\.csv$', re.IGNORECASE)
+
+# Each meter gets its own year-partitioned store under Combine/meters/<account>-<meter>
+METERS_FOLDER = 'meters'
+METERS_INDEX = 'meters.json'
+# Store name of the shared Combine folder in multi-store labels
+SHARED_STORE = 'shared'
+
+def get_combined_folder():
+    module_path = os.path.abspath(__file__)
+    current_dir = os.path.dirname(module_path)
+    return os.path.join(current_dir, 'Electricity', 'Combine')
+
+def parse_daily_chart_name(file_path):
+    # Return (account, meter) for a DailyChart export, or None for any other file
+    match = DAILY_CHART_PATTERN.search(os.path.basename(file_path.replace('\\', '/')))
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+def meter_key(account, meter):
+    return f'{account}-{meter}'
+
+def meter_folder(combined_folder, key):
+    return os.path.join(combined_folder, METERS_FOLDER, key)
+
+def load_meter_index(combined_folder):
+    path = os.path.join(combined_folder, METERS_FOLDER, METERS_INDEX)
+    if os.path.exists(path):
+        return combine_store.load_json(path)
+    return {}
+
+def update_meter_index(combined_folder, key, account, meter):
+    # Keep a small index of every meter and the years it covers so selection never opens other stores
+    index = load_meter_index(combined_folder)
+    years = combine_store.partition_paths(meter_folder(combined_folder, key), COMBINED_PREFIX)
+    index[key] = {'account': account, 'meter': meter, 'years': sorted(years)}
+    combine_store.save_json(os.path.join(combined_folder, METERS_FOLDER, METERS_INDEX), index)
 
 def load_and_process_csv(file_path):
     # Load CSV, skipping the first row which is a header comment
@@ -8,50 +56,109 @@ def load_and_process_csv(file_path):
     df['Date'] = pd.to_datetime(df['Date'])
     return df
 
-def combine_files(file_paths):
+def load_and_process_file(file_path):
+    # Green Button XML feeds are streamed into daily rows, everything else is a CSV export
+    if file_path.lower().endswith('.xml'):
+        return green_button_xml.load_and_process_xml(file_path)
+    return load_and_process_csv(file_path)
+
+# Every partition write refreshes its binary cache and its rollup index
+def write_caches(csv_path, df):
+    columnar_cache.write_cache(csv_path, df)
+    rollup_index.write_index(csv_path, df)
+
+def combine_files(file_paths, max_workers=None):
     # Create "Electricity" and "Combine" folders in the current directory
-    module_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(module_path)
-    # current_dir = os.getcwd()
-    # electricity_folder = os.path.join(current_dir, 'Electricity')
-    # combined_folder = os.path.join(electricity_folder, 'Combine')
-    combined_folder = os.path.join(current_dir, rf'Electricity\Combine')
-    if not os.path.exists(combined_folder):
-        os.makedirs(combined_folder)
-    # os.makedirs(combined_folder, exist_ok=True)
-    
+    combined_folder = get_combined_folder()
+
+    # DailyChart exports go to their meter's store, other exports to the shared Combine store
+    groups = {}
     for file_path in file_paths:
-        df = load_and_process_csv(file_path)
-
-        # Process and save data by year
-        for year, data in df.groupby(df['Date'].dt.year):
-            year_file_path = os.path.join(combined_folder, f'Combined_Electricity_Usage_{year}.csv')
-
-            if os.path.exists(year_file_path):
-                # Load existing data and combine with new data
-                existing_data = pd.read_csv(year_file_path)
-                existing_data['Date'] = pd.to_datetime(existing_data['Date'])
-                combined_data = pd.concat([existing_data, data], ignore_index=True).drop_duplicates(subset=['Date'])
-            else:
-                # Just save the new data directly if the file does not exist
-                combined_data = data
-            
-            # Save updated combined data back to the file
-            combined_data.sort_values(by='Date', inplace=True)
-            combined_data.to_csv(year_file_path, index=False)
-            #print(f"Updated combined electricity data for {year} saved to {year_file_path}")
-
-    # Optionally, combine all data across all years into one file
-    all_data = []
-    for year_file in os.listdir(combined_folder):
-        year_file_path = os.path.join(combined_folder, year_file)
-        df = pd.read_csv(year_file_path)
-        all_data.append(df)
-    
-    if all_data:  # Check if there is any data to combine
-        combined_all_data = pd.concat(all_data, ignore_index=True).drop_duplicates(subset=['Date'])
-        combined_all_file_path = os.path.join(combined_folder, 'Combined_Electricity_Usage_All.csv')
-        combined_all_data.sort_values(by='Date', inplace=True)
-        combined_all_data.to_csv(combined_all_file_path, index=False)
-        #print(f"Overall combined electricity data saved to {combined_all_file_path}")
+        ids = parse_daily_chart_name(file_path)
+        groups.setdefault(ids, []).append(file_path)
+
+    for ids, group_paths in groups.items():
+        store_folder = combined_folder if ids is None else meter_folder(combined_folder, meter_key(*ids))
+        xml_paths = [path for path in group_paths if path.lower().endswith('.xml')]
+        csv_paths = [path for path in group_paths if not path.lower().endswith('.xml')]
+
+        # Parse every export first (in parallel when there are many), then merge once per year
+        frames = []
+        if csv_paths:
+            frames.append(combine_store.load_files(load_and_process_csv, csv_paths, max_workers))
+        if xml_paths:
+            # XML feeds keep their raw intervals; only the days they touch are rolled up into daily rows
+            frames.append(interval_store.ingest_xml_files(store_folder, xml_paths, max_workers))
+        df = pd.concat([frame for frame in frames if not frame.empty], ignore_index=True) if frames else pd.DataFrame()
+        if df.empty:
+            continue
+
+        # Merge the new rows into the year partitions they fall in and refresh their binary cache;
+        # the "All" view is served from the manifest instead of a rewritten file.
+        # Rows are merged column by column, so the TOU totals of an XML rollup do not wipe the
+        # temperature and tier/ULO columns a CSV export stored for the same day
+        combine_store.merge_into_store(store_folder, COMBINED_PREFIX, df, on_write=write_caches, fill_missing=True)
+        if ids is not None:
+            update_meter_index(combined_folder, meter_key(*ids), *ids)
+        #print(f"Updated combined electricity data saved to {combined_folder}")
+
+def select_meters(account=None, meter=None):
+    # Keys of the stored meters matching an account and/or meter number, read from the index only
+    index = load_meter_index(get_combined_folder())
+    return [key for key, entry in sorted(index.items())
+            if (account is None or entry['account'] == str(account))
+            and (meter is None or entry['meter'] == str(meter))]
+
+def covered_years(shared_partitions, meter_partitions):
+    # Years of the shared store whose dates a meter store also holds. Before DailyChart exports were
+    # routed to their meter, they were merged into the shared store, so those rows are duplicates
+    covered = []
+    for year, entry in shared_partitions.items():
+        for partitions in meter_partitions:
+            meter_entry = partitions.get(year)
+            if meter_entry is not None and meter_entry['start'] <= entry['start'] and entry['end'] <= meter_entry['end']:
+                covered.append(year)
+                break
+    return covered
+
+def combined_file_paths(meters=None, include_all=True):
+    """
+    Builds the {label: path} mapping the forecasting entry points take.
+
+    Parameters:
+    - meters: list of str, optional. Meter keys ('<account>-<meter>') to load. By default every stored
+      meter and the shared Combine store (XML feeds and other exports) are used, leaving out the
+      shared years a meter store already covers (see covered_years).
+    - include_all: bool. Also add each store's virtual "All" view.
+
+    Returns:
+    - A dictionary of labels to partition paths. Labels are plain years when only one store holds data,
+      and combine_store.StoreYear(store, year) when several do; the shared store is named SHARED_STORE.
+    """
+    combined_folder = get_combined_folder()
+    shared = meters is None
+    if shared:
+        meters = sorted(load_meter_index(combined_folder))
+
+    stores = {}
+    meter_partitions = []
+    for key in meters:
+        folder = meter_folder(combined_folder, key)
+        meter_partitions.append(combine_store.load_manifest(folder, COMBINED_PREFIX)['partitions'])
+        paths = combine_store.partition_paths(folder, COMBINED_PREFIX, include_all)
+        if paths:
+            stores[key] = paths
+    if shared:
+        shared_partitions = combine_store.load_manifest(combined_folder, COMBINED_PREFIX)['partitions']
+        covered = covered_years(shared_partitions, meter_partitions)
+        paths = combine_store.partition_paths(combined_folder, COMBINED_PREFIX, include_all)
+        # The "All" view would bring the covered years back, so it is only kept when nothing is left out
+        paths = {year: path for year, path in paths.items()
+                 if year not in covered and not (covered and year == combine_store.ALL_KEY)}
+        if any(year != combine_store.ALL_KEY for year in paths):
+            stores = {SHARED_STORE: paths, **stores}
+    if len(stores) == 1:
+        return next(iter(stores.values()))
 
+    return {combine_store.StoreYear(store, year): path
+            for store, paths in stores.items() for year, path in paths.items()}
@@ -1,98 +1,60 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from datetime import datetime
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import os
+from forecasting_model import dataset
+from forecasting_model import model_cache
+from forecasting_model import incremental
+from forecasting_model import pipeline
+from forecasting_model import pooled
+from forecasting_model import backends
+from forecasting_model import plots
+
+# Features and hyperparameters of the forecasting forest, part of its model cache key
+PREDICTION_FEATURES = ['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']
+PREDICTION_PARAMS = {'n_estimators': 100, 'random_state': 42, 'test_size': 0.2, 'features': PREDICTION_FEATURES}
+# The forest scored in preprocess_and_fit only sees the weather
+EVALUATION_FEATURES = ['Outside Temperature (°C)', 'Precipitation (mm)']
+EVALUATION_PARAMS = dict(PREDICTION_PARAMS, features=EVALUATION_FEATURES)
+POOLED_PARAMS = dict(PREDICTION_PARAMS, features=pooled.POOLED_FEATURES)
+
+# Forest (or other backends.py model) shared by the forecasting and the evaluation models
+def make_forest(backend=None):
+    return backends.make_model(backend)
 
 # Function to round predictions to the nearest multiple of 0.5
 def round_to_nearest_half(number):
     return np.round(number * 2) / 2
 
 # Function to preprocess and fit Linear Regression, returning MSE and R2
-def preprocess_and_fit(file_path, year):
-    data = pd.read_csv(file_path)
-    # Data Cleaning and Preprocessing
-    # Remove units and convert columns to numeric
-    data['Outside Temperature (°C)'] = data['Outside Temperature (°C)'].str.replace(' C', '').astype(float)
-    data['Precipitation (mm)'] = data['Precipitation (mm)'].str.replace(' mm', '').astype(float)
-    # Convert "Date" to datetime format
-    data['Date'] = pd.to_datetime(data['Date'])
-    # Create a new feature 'Day of Year'
-    data['Day of Year'] = data['Date'].dt.dayofyear    
-    data['Month'] = data['Date'].dt.month
-
-    # Sort by date to ensure the time series is in order
-    data = data.sort_values(by='Date').reset_index(drop=True)
+def preprocess_and_fit(file_path, year, backend=None):
+    # Cleaned frame sorted by date, with numeric weather, 'Day of Year' and 'Month', shared with the other models
+    data = dataset.load_water(file_path)
 
     # Prepare the data for Random Forest analysis
     X_full = data[['Outside Temperature (°C)', 'Precipitation (mm)']].fillna(0)  # Handling missing values
     y_full = data['Water Use (m³)']
 
-    X = data[['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']]
-    y = data['Water Use (m³)']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Split the full data into training and testing sets
-    X_full_train, X_full_test, y_full_train, y_full_test = train_test_split(X_full, y_full, test_size=0.2, random_state=42)
+    # Random Forest trained on 80% of the year, reused (or grown incrementally) while the year is unchanged
+    rf_model_full = get_evaluation_model(file_path, backend)
 
-    # Initialize and fit the Random Forest Regressor model with full data
-    rf_model_full = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_model_full.fit(X_full_train, y_full_train)
-
-    # Generate predictions using the Random Forest model trained on full data
-    y_full_raw_pred = rf_model_full.predict(X_full)
+    # Generate predictions once using the Random Forest model trained on full data;
+    # the annual chart, the monthly charts and the evaluation all reuse them
+    data = pipeline.attach_predictions(data, rf_model_full, EVALUATION_FEATURES)
+    y_full_raw_pred = data[pipeline.PREDICTION_COLUMN].to_numpy()
 
     # Apply rounding to the nearest multiple of 0.5 and ensure at least 0.5
-    y_full_final_pred = np.maximum(np.array([round_to_nearest_half(pred) for pred in y_full_raw_pred]), 0.5)
+    y_full_final_pred = np.maximum(round_to_nearest_half(y_full_raw_pred), 0.5)
 
-    # Plotting the predictions in individual subplots as line graphs
-    #fig, axs = plt.subplots(3, 1, figsize=(12, 18))
-    # Plot for Actual vs Linear Regression
-    
-    # annual plot #
-    plt.figure(figsize=(10, 6))
-    plt.plot(X['Day of Year'], y, label='Actual', color='green', linewidth=2) # org data
-    plt.plot(X['Day of Year'], y_full_final_pred, label='Linear Regression Prediction', color='red') # prediction
-    plt.title('Linear Regression Predictions')
-    plt.xlabel('Day of Year')
-    plt.ylabel('Water Use (m³)')
-    plt.legend()
-    plt.tight_layout()
-    #plt.show()
-    module_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(module_path)
-    fig_path = os.path.join(current_dir, '..', 'Water', 'Graph', str(year))
-    if not os.path.exists(fig_path):
-        os.makedirs(fig_path)
-    fig_path = os.path.join(fig_path,'annual.png')
-    plt.savefig(fig_path)
-    plt.close()
-    
-    # monthly plot #
-    months = sorted(data['Month'].unique())
-    for month in months:
-        plt.figure(figsize=(10, 6))
-        month_data = data[data['Month'] == month]
-        plt.plot(month_data['Day of Year'], month_data['Water Use (m³)'], label='Actual', color='green', linewidth=2) 
-        # Corrected line for prediction, removing 'Day of Year' from the prediction data
-        plt.plot(month_data['Day of Year'], rf_model_full.predict(month_data[['Outside Temperature (°C)', 'Precipitation (mm)']].fillna(0)), label='Random Forest Prediction', color='red') # prediction
-        plt.title('Linear Regression Predictions for Month {}'.format(month))
-        plt.xlabel('Day of Year')
-        plt.ylabel('Water Use (m³)')
-        plt.legend()
-        plt.tight_layout()
-        module_path = os.path.abspath(__file__)
-        current_dir = os.path.dirname(module_path)
-        fig_path = os.path.join(current_dir, '..', 'Water', 'Graph', str(year))
-        if not os.path.exists(fig_path):
-            os.makedirs(fig_path)
-        fig_path = os.path.join(fig_path,'{}.png'.format(month))
-        plt.savefig(fig_path)
-        plt.close()
+    # The annual chart shows the adjusted predictions and the monthly charts the raw ones;
+    # both are rendered from the stored predictions when their tab is opened
+    version = model_cache.model_key('water_random_forest_evaluation', dataset.dataset_hash(file_path),
+                                    backends.cache_params(EVALUATION_PARAMS, backend))
+    plots.save_predictions('water', year, dataset.dataset_hash(file_path), version, data['Day of Year'],
+                           data['Water Use (m³)'], y_full_raw_pred, data['Month'], annual_predicted=y_full_final_pred)
 
     # Evaluate the adjusted predictions on the full dataset
     mse = mean_squared_error(y_full, y_full_final_pred)
@@ -100,46 +62,84 @@ def preprocess_and_fit(file_path, year):
     
     return mse, r2
 
-def process_files_and_get_years_with_good_r2(file_paths):
+# Fit and score one year, the unit of work the training scheduler runs in parallel
+def fit_year(path, year, backend=None):
+    mse, r2 = preprocess_and_fit(path, year, backend)
+    return {'MSE': mse, 'R2': r2}
+
+# Turn per-year metrics into the (results, good_years) pair
+def summarize_results(results):
+    # Filter years with R2 value greater than the threshold
+    good_years = {year: result for year, result in results.items() if result['R2'] > 0.4}
+
+    return results, good_years
+
+def process_files_and_get_years_with_good_r2(file_paths, backend=None):
     # Dictionary to store results
     results = {}
 
     # Process each file and store results
     for year, path in file_paths.items():
-        mse, r2 = preprocess_and_fit(path, year)
-        results[year] = {'MSE': mse, 'R2': r2}
+        results[year] = fit_year(path, year, backend)
 
-    # Filter years with R2 value greater than 0.2
-    good_years = {year: result for year, result in results.items() if result['R2'] > 0.4}
+    return summarize_results(results)
 
-    return results, good_years
+
+# Load the forecasting forest for one year, training and caching it on first use
+def get_prediction_model(file_path, backend=None):
+    # A year that only gained a new month grows a few trees on it instead of being refit
+    def prepare(data):
+        return data[PREDICTION_FEATURES].fillna(0), data['Water Use (m³)']
+
+    return incremental.get_or_fit(model_cache.default_folder('Water'), 'water_random_forest', file_path,
+                                  backends.cache_params(PREDICTION_PARAMS, backend), dataset.load_water, prepare,
+                                  lambda: make_forest(backend))
+
+
+# Load the weather-only forest scored and plotted by preprocess_and_fit, cached and updated the same way
+def get_evaluation_model(file_path, backend=None):
+    def prepare(data):
+        return data[EVALUATION_FEATURES].fillna(0), data['Water Use (m³)']
+
+    return incremental.get_or_fit(model_cache.default_folder('Water'), 'water_random_forest_evaluation', file_path,
+                                  backends.cache_params(EVALUATION_PARAMS, backend), dataset.load_water, prepare,
+                                  lambda: make_forest(backend))
+
+
+# One forest over every good year, with the year and seasonality as features, trained once per set of years
+def get_pooled_model(file_paths, good_years, backend=None):
+    def fit():
+        data = pooled.load_years(file_paths, good_years)
+        X = data[pooled.POOLED_FEATURES].fillna(0)
+        y = data[pooled.TARGET]
+
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+        rf_model = make_forest(backend)
+        rf_model.fit(X_train, y_train)
+        return rf_model
+
+    return model_cache.get_or_fit(model_cache.default_folder('Water'), 'water_random_forest_pooled',
+                                  pooled.pooled_hash(file_paths, good_years), backends.cache_params(POOLED_PARAMS, backend), fit)
 
 
 # Function to predict water use based on temperature and precipitation
-def predict_water_use(prediction_temperature, prediction_precipitation, file_paths, good_years):
+# (pooled_model=True uses one cross-year forest instead of averaging one forest per good year)
+def predict_water_use(prediction_temperature, prediction_precipitation, file_paths, good_years, pooled_model=False, backend=None):
     predictions = []
     
+    current_date = datetime.now()
+    day_of_year = current_date.timetuple().tm_yday
+
+    if pooled_model:
+        if not good_years:
+            return None
+        prediction_data = pooled.prediction_frame(day_of_year, current_date.year, prediction_temperature, prediction_precipitation)
+        return get_pooled_model(file_paths, good_years, backend).predict(prediction_data)[0]
+    
     for year in good_years:
-        file_path = file_paths[year]
-        data = pd.read_csv(file_path)
-        
-        # Data Cleaning and Preprocessing
-        data['Outside Temperature (°C)'] = data['Outside Temperature (°C)'].str.replace(' C', '').astype(float)
-        data['Precipitation (mm)'] = data['Precipitation (mm)'].str.replace(' mm', '').astype(float)
-        data['Date'] = pd.to_datetime(data['Date'])
-        data['Day of Year'] = data['Date'].dt.dayofyear
-        data = data.sort_values(by='Date').reset_index(drop=True)
-        
-        X = data[['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']].fillna(0)
-        y = data['Water Use (m³)']
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        rf_model.fit(X_train, y_train)
-        
-        current_date = datetime.now()
-        day_of_year = current_date.timetuple().tm_yday
+        # Trained forests are reused from the model cache as long as the year's data is unchanged
+        rf_model = get_prediction_model(file_paths[year], backend)
         
         prediction_data = pd.DataFrame({
             'Day of Year': [day_of_year], 
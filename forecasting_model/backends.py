@@ -0,0 +1,55 @@
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
+
+# Tree model backends shared by the electricity and water forecasting modules.
+# 'random_forest' is the original RandomForestRegressor(n_estimators=100). 'hist_gradient_boosting'
+# bins the features into histograms and stops adding trees once a validation split stops improving,
+# which keeps fit time and model size small on multi-year hourly data.
+
+DEFAULT_BACKEND = 'random_forest'
+
+BACKEND_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'random_state': 42},
+    'hist_gradient_boosting': {'max_iter': 500, 'learning_rate': 0.1, 'early_stopping': True,
+                               'validation_fraction': 0.1, 'n_iter_no_change': 10, 'random_state': 42}
+}
+
+# Threads a random forest fits and predicts with; the training scheduler sets each worker's share of
+# the cores. Not part of the cache key, it changes how fast a forest is built but not the forest
+N_JOBS = None
+
+ESTIMATORS = {
+    'random_forest': RandomForestRegressor,
+    'hist_gradient_boosting': HistGradientBoostingRegressor
+}
+
+
+def resolve(backend):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in ESTIMATORS:
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {sorted(ESTIMATORS)}")
+    return backend
+
+
+def make_model(backend=None, multi_output=False):
+    """
+    Returns an unfitted regressor of the backend.
+
+    Parameters:
+    - backend: str, optional. Key of ESTIMATORS, defaults to DEFAULT_BACKEND.
+    - multi_output: bool. The model is fitted on several target columns; backends without native
+      multi-output support get one model per target.
+    """
+    backend = resolve(backend)
+    model = ESTIMATORS[backend](**BACKEND_PARAMS[backend])
+    if backend == 'random_forest':
+        model.set_params(n_jobs=N_JOBS)
+    if multi_output and backend == 'hist_gradient_boosting':
+        model = MultiOutputRegressor(model)
+    return model
+
+
+def cache_params(params, backend=None):
+    # Backend name and hyperparameters become part of the model cache key
+    backend = resolve(backend)
+    return dict(params, backend=backend, backend_params=BACKEND_PARAMS[backend])
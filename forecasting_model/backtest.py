@@ -0,0 +1,211 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, Lasso
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+import combine_store
+from forecasting_model import dataset
+from forecasting_model import model_cache
+from forecasting_model import backends
+from forecasting_model import lasso_search
+from forecasting_model import scheduler
+from forecasting_model import Water_Random_Forest
+from forecasting_model import electricity_random_forest
+
+# Rolling-origin backtesting.
+# The models are scored the way they are used: trained on everything before an origin date and
+# tested on the month that follows it, for every month of the history, instead of on a shuffled
+# split of one year. Folds run in parallel through the training scheduler; each worker builds the
+# feature matrix of the history once (through the dataset cache) and every fold is a pair of row
+# ranges into it. Fold results are remembered by a hash of the rows they saw, so rerunning after a
+# new month only computes the folds that include it.
+
+RESULTS_NAME = 'backtest.json'
+
+# Months of history before the first origin
+MIN_TRAIN_MONTHS = 6
+HORIZON_MONTHS = 1
+
+ELECTRICITY_LINEAR_FEATURES = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
+
+UTILITIES = {
+    'Electricity': {
+        'folder': 'Electricity',
+        'load': dataset.load_electricity,
+        'targets': electricity_random_forest.JOINT_TARGETS,
+        'models': {
+            'linear': ELECTRICITY_LINEAR_FEATURES,
+            'random_forest': electricity_random_forest.FEATURES,
+            'hist_gradient_boosting': electricity_random_forest.FEATURES
+        }
+    },
+    'Hydro': {
+        'folder': 'Water',
+        'load': dataset.load_water,
+        'targets': ['Water Use (m³)'],
+        'models': {
+            'linear': Water_Random_Forest.PREDICTION_FEATURES,
+            'random_forest': Water_Random_Forest.PREDICTION_FEATURES,
+            'hist_gradient_boosting': Water_Random_Forest.PREDICTION_FEATURES
+        }
+    }
+}
+
+# Per-process memo of the history's feature matrix, shared by all folds a worker runs
+_features = {}
+
+
+def _fit(utility, model, X, y):
+    if model == 'linear' and utility == 'Electricity':
+        # Lasso with alpha picked on the training window only, as in electricity_linear_regression
+        X_scaled = StandardScaler().fit_transform(X)
+        alpha = lasso_search.best_alphas(X_scaled, y)[0]
+        estimator = make_pipeline(StandardScaler(), Lasso(alpha=alpha, max_iter=lasso_search.MAX_ITER))
+    elif model == 'linear':
+        estimator = LinearRegression()
+    else:
+        estimator = backends.make_model(model)
+    estimator.fit(X, y)
+    return estimator
+
+
+def history(utility, file_path):
+    """
+    Returns (days, {model: X}, {target: y}) for the whole history behind file_path, sorted by date.
+    Built once per process and data version; the folds only slice it.
+    """
+    key = (utility, os.path.abspath(file_path), dataset.dataset_hash(file_path))
+    if key not in _features:
+        spec = UTILITIES[utility]
+        data = spec['load'](file_path).sort_values(by='Date', kind='stable').reset_index(drop=True)
+        days = data['Date'].values.astype('datetime64[D]')
+        X = {}
+        for model, features in spec['models'].items():
+            if model == 'linear' and utility == 'Electricity':
+                X[model] = data[features].fillna(data[features].mean()).to_numpy(dtype=float)
+            else:
+                X[model] = data[features].fillna(0).to_numpy(dtype=float)
+        y = {target: data[target].fillna(0).to_numpy(dtype=float) for target in spec['targets']}
+        _features.clear()
+        _features[key] = (days, X, y)
+    return _features[key]
+
+
+def history_path(file_paths):
+    # The "All" view of the store the year partitions belong to
+    stores = combine_store.split_stores(file_paths)
+    if len(stores) != 1:
+        raise ValueError(f"Backtest one store at a time, got {len(stores)}: {', '.join(sorted(map(str, stores)))}")
+    years = next(iter(stores.values()))
+    if combine_store.ALL_KEY in years:
+        return years[combine_store.ALL_KEY]
+    year, path = sorted(years.items())[0]
+    folder, name = os.path.split(path)
+    prefix = name[:-len(f'_{year}.csv')]
+    return os.path.join(folder, combine_store.partition_file_name(prefix, combine_store.ALL_KEY))
+
+
+def origins(days, min_train_months=MIN_TRAIN_MONTHS):
+    # First day of every month after the initial training period
+    months = np.unique(days.astype('datetime64[M]'))
+    return [month.astype('datetime64[D]') for month in months[min_train_months:]]
+
+
+def run_fold(utility, file_path, model, target, origin, horizon_months=HORIZON_MONTHS):
+    """
+    Trains one model on every row before origin and scores it on the following months.
+
+    Returns:
+    - A dictionary of metrics, or None when the test window is empty.
+    """
+    days, X, y = history(utility, file_path)
+    origin = np.datetime64(origin, 'D')
+    end = (origin.astype('datetime64[M]') + horizon_months).astype('datetime64[D]')
+    train_end = int(np.searchsorted(days, origin, side='left'))
+    test_end = int(np.searchsorted(days, end, side='left'))
+    if train_end == 0 or test_end == train_end:
+        return None
+
+    estimator = _fit(utility, model, X[model][:train_end], y[target][:train_end])
+    y_test = y[target][train_end:test_end]
+    y_pred = estimator.predict(X[model][train_end:test_end])
+    return {
+        'Train rows': train_end,
+        'Test rows': test_end - train_end,
+        'MSE': float(mean_squared_error(y_test, y_pred)),
+        'MAE': float(mean_absolute_error(y_test, y_pred)),
+        'R2': float(r2_score(y_test, y_pred)) if len(y_test) > 1 else np.nan
+    }
+
+
+def _fold_key(utility, file_path, model, target, origin, horizon_months):
+    # The fold's result only depends on the rows it trains and tests on
+    days, X, y = history(utility, file_path)
+    origin = np.datetime64(origin, 'D')
+    end = (origin.astype('datetime64[M]') + horizon_months).astype('datetime64[D]')
+    test_end = int(np.searchsorted(days, end, side='left'))
+    sha = hashlib.sha1()
+    sha.update(f'{utility}|{model}|{target}|{origin}|{horizon_months}|{backends.BACKEND_PARAMS}|'.encode())
+    sha.update(days[:test_end].tobytes())
+    sha.update(np.ascontiguousarray(X[model][:test_end]).tobytes())
+    sha.update(y[target][:test_end].tobytes())
+    return sha.hexdigest()
+
+
+def run_backtest(utility, file_paths, models=None, min_train_months=MIN_TRAIN_MONTHS,
+                 horizon_months=HORIZON_MONTHS, max_workers=None):
+    """
+    Backtests model families over rolling origins on the whole history.
+
+    Parameters:
+    - utility: 'Electricity' or 'Hydro'.
+    - file_paths: dict of year label -> combined path of one store; the folds run over its "All" view.
+    - models: list of model names from UTILITIES[utility]['models'], defaults to all of them.
+    - min_train_months, horizon_months: months before the first origin and months tested per fold.
+    - max_workers: int, optional. Pool size, 1 runs every fold in this process.
+
+    Returns:
+    - A DataFrame with one row per (origin, model, target): 'Origin', 'Model', 'Target',
+      'Train rows', 'Test rows', 'MSE', 'MAE' and 'R2'.
+    """
+    spec = UTILITIES[utility]
+    models = list(models or spec['models'])
+    file_path = history_path(file_paths)
+    days, _, _ = history(utility, file_path)
+
+    results_path = os.path.join(model_cache.default_folder(spec['folder']), RESULTS_NAME)
+    stored = combine_store.load_json(results_path) if os.path.exists(results_path) else {}
+
+    folds = {}
+    jobs = {}
+    # Slow tree models first so the pool stays busy until the end
+    for model in sorted(models, key=lambda model: model == 'linear'):
+        for target in spec['targets']:
+            for origin in origins(days, min_train_months):
+                fold = (str(origin), model, target)
+                key = _fold_key(utility, file_path, model, target, origin, horizon_months)
+                folds[fold] = key
+                if key not in stored:
+                    jobs[fold] = (run_fold, utility, file_path, model, target, str(origin), horizon_months)
+
+    computed = scheduler.run_jobs(jobs, max_workers)
+    for fold, metrics in computed.items():
+        stored[folds[fold]] = metrics
+    if computed:
+        os.makedirs(os.path.dirname(results_path), exist_ok=True)
+        combine_store.save_json(results_path, {key: stored[key] for key in folds.values() if key in stored})
+
+    rows = []
+    for (origin, model, target), key in sorted(folds.items()):
+        metrics = stored.get(key)
+        if metrics is not None:
+            rows.append(dict({'Origin': origin, 'Model': model, 'Target': target}, **metrics))
+    return pd.DataFrame(rows, columns=['Origin', 'Model', 'Target', 'Train rows', 'Test rows', 'MSE', 'MAE', 'R2'])
+
+
+def summarize(table):
+    # Mean fold metrics per model and target
+    return table.groupby(['Model', 'Target'])[['MSE', 'MAE', 'R2']].mean()
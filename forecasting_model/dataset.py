@@ -0,0 +1,141 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import columnar_cache
+import combine_store
+
+# Shared loader for the forecasting models.
+# Each combined year is read and cleaned once; the typed frame (dates, numeric weather, totals and
+# calendar features) is kept in an LRU cache keyed by the file's content hash, so the linear,
+# Lasso and random forest passes of one "Process Data" click all reuse the same frame.
+
+ELECTRICITY_USAGE_COLUMNS = ['Usage TOU off-peak (kWh)', 'Usage TOU mid-peak (kWh)', 'Usage TOU on-peak (kWh)']
+ELECTRICITY_COST_COLUMNS = ['Cost TOU off-peak ($)', 'Cost TOU mid-peak ($)', 'Cost TOU on-peak ($)']
+WATER_WEATHER_COLUMNS = ['Outside Temperature (°C)', 'Precipitation (mm)']
+
+# Upper bound on the memory held by cached frames
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_hashes = {}
+_lock = threading.Lock()
+
+
+def file_hash(file_path):
+    # Content hash of a file, recomputed only when its size or modification time changes
+    stat = os.stat(file_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _hashes.get(file_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    sha = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _hashes[file_path] = (stamp, digest)
+    return digest
+
+
+def dataset_hash(file_path):
+    """
+    Returns the content hash identifying the data behind a combined year path.
+    The virtual "All" path hashes the partitions it is made of.
+    """
+    file_path = os.path.abspath(file_path)
+    if combine_store.is_all_view(file_path):
+        folder = os.path.dirname(file_path)
+        prefix = os.path.basename(file_path)[:-len(f'_{combine_store.ALL_KEY}.csv')]
+        sha = hashlib.sha1()
+        for path in combine_store.partition_paths(folder, prefix).values():
+            sha.update(file_hash(path).encode())
+        return sha.hexdigest()
+    return file_hash(file_path)
+
+
+def _add_calendar_features(data):
+    data['Date'] = pd.to_datetime(data['Date'])
+    data['Day of Year'] = data['Date'].dt.dayofyear
+    data['Month'] = data['Date'].dt.month
+    data['Year'] = data['Date'].dt.year
+    data['Day'] = data['Date'].dt.day
+    data['Weekday'] = data['Date'].dt.weekday
+    return data
+
+
+def _build_electricity(file_path):
+    data = columnar_cache.load_frame(file_path)
+    data = _add_calendar_features(data)
+    data['Total_Usage'] = data[ELECTRICITY_USAGE_COLUMNS].sum(axis=1)
+    data['Total_Cost'] = data[ELECTRICITY_COST_COLUMNS].sum(axis=1)
+    data['Temperature'] = data['Average temperature (C)']
+    return data
+
+
+def _build_water(file_path):
+    data = columnar_cache.load_frame(file_path)
+    data = _add_calendar_features(data)
+    for column in WATER_WEATHER_COLUMNS:
+        data[column] = columnar_cache.to_number(data[column]).astype(float)
+    # Sort by date to ensure the time series is in order
+    return data.sort_values(by='Date').reset_index(drop=True)
+
+
+def _load(kind, build, file_path):
+    key = (kind, os.path.abspath(file_path), dataset_hash(file_path))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+
+    if cached is not None:
+        data = cached
+    else:
+        data = _store(key, build(file_path))
+    # Callers get a shallow copy so adding columns never changes the cached frame
+    data = data.copy(deep=False)
+    # Remember the partition and the version of it the frame was built from, so row-order lookups
+    # (e.g. pipeline.month_groups) can use its rollup index while the file is unchanged
+    data.attrs['source'] = os.path.abspath(file_path)
+    data.attrs['source_hash'] = key[2]
+    return data
+
+
+def _store(key, data):
+    global _cache_bytes
+    size = int(data.memory_usage(deep=True).sum())
+    with _lock:
+        if key not in _cache:
+            _cache[key] = data
+            _cache_bytes += size
+            # Evict the least recently used frames until the cache fits its memory cap again
+            while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= int(evicted.memory_usage(deep=True).sum())
+    return data
+
+
+def load_electricity(file_path):
+    """
+    Loads a combined electricity year with 'Total_Usage', 'Total_Cost', 'Temperature'
+    and the calendar features ('Day of Year', 'Month', 'Year', 'Day', 'Weekday').
+    """
+    return _load('electricity', _build_electricity, file_path)
+
+
+def load_water(file_path):
+    """
+    Loads a combined water year sorted by date, with numeric weather columns
+    and the calendar features ('Day of Year', 'Month', 'Year', 'Day', 'Weekday').
+    """
+    return _load('water', _build_water, file_path)
+
+
+def clear_cache():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -1,26 +1,21 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.linear_model import Lasso
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
 import os
+from forecasting_model import dataset
+from forecasting_model import lasso_search
+from forecasting_model import pipeline
 
 def preprocess_and_fit_electricity(file_path):
     # Assuming 'weather_forecast' module is available for merging weather data
     # import weather_forecast as wf
 
-    df = pd.read_csv(file_path)
-    df['Date'] = pd.to_datetime(df['Date'])
     # df = pd.merge(df, wf.history_df, on='Date', how='inner')
     
-    # Assuming specific electricity usage and weather columns are defined here
-    # Calculate 'Total_Usage'
-    df['Total_Usage'] = df[['Usage TOU off-peak (kWh)', 'Usage TOU mid-peak (kWh)', 'Usage TOU on-peak (kWh)']].sum(axis=1)
-    
-    # Feature Engineering
-    df = df.assign(Year=df['Date'].dt.year, Month=df['Date'].dt.month, Day=df['Date'].dt.day, Weekday=df['Date'].dt.weekday)
+    # Cleaned frame with 'Total_Usage' and the calendar features, shared with the other models
+    df = dataset.load_electricity(file_path)
     features = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
     target = 'Total_Usage'
     
@@ -33,20 +28,16 @@ def preprocess_and_fit_electricity(file_path):
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.3, random_state=42)
     
-    # Model fitting with Lasso Regression
-    lasso = Lasso(max_iter=10000)
-    param_grid = {'alpha': np.logspace(-4, 0, 5)}
-    grid_search = GridSearchCV(lasso, param_grid=param_grid, cv=5, scoring='r2')
-    grid_search.fit(X_train, y_train)
-    
-    best_model = grid_search.best_estimator_
+    # Model fitting with Lasso Regression, alpha picked along the warm-started regularization path
+    alpha = lasso_search.best_alphas(X_train, y_train.to_numpy())[0]
+    best_model = lasso_search.fit_lasso(X_train, y_train, alpha)
     y_pred = best_model.predict(X_scaled)
     
     # Evaluation
     mse = mean_squared_error(y, y_pred)
     r2 = r2_score(y, y_pred)
     
-    print(f"Best Parameterss: {grid_search.best_params_}")
+    print(f"Best Parameterss: {{'alpha': {alpha}}}")
     print(f"MSE: {mse}, R2: {r2}")
     
     return best_model, mse, r2
@@ -64,16 +55,10 @@ def preprocess_and_fit_electricity_cost(file_path):
     # Assuming 'weather_forecast' module is available for merging weather data
     # import weather_forecast as wf
 
-    df = pd.read_csv(file_path)
-    df['Date'] = pd.to_datetime(df['Date'])
     # df = pd.merge(df, wf.history_df, on='Date', how='inner')
     
-    # Assuming specific electricity usage and weather columns are defined here
-    # Calculate 'Total_Usage'
-    df['Total_Cost'] = df[['Cost TOU off-peak ($)', 'Cost TOU mid-peak ($)', 'Cost TOU on-peak ($)']].sum(axis=1)
-    
-    # Feature Engineering
-    df = df.assign(Year=df['Date'].dt.year, Month=df['Date'].dt.month, Day=df['Date'].dt.day, Weekday=df['Date'].dt.weekday)
+    # Cleaned frame with 'Total_Cost' and the calendar features, shared with the other models
+    df = dataset.load_electricity(file_path)
     features = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
     target = 'Total_Cost'
     
@@ -86,20 +71,16 @@ def preprocess_and_fit_electricity_cost(file_path):
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.3, random_state=42)
     
-    # Model fitting with Lasso Regression
-    lasso = Lasso(max_iter=10000)
-    param_grid = {'alpha': np.logspace(-4, 0, 5)}
-    grid_search = GridSearchCV(lasso, param_grid=param_grid, cv=5, scoring='r2')
-    grid_search.fit(X_train, y_train)
-    
-    best_model = grid_search.best_estimator_
+    # Model fitting with Lasso Regression, alpha picked along the warm-started regularization path
+    alpha = lasso_search.best_alphas(X_train, y_train.to_numpy())[0]
+    best_model = lasso_search.fit_lasso(X_train, y_train, alpha)
     y_pred = best_model.predict(X_scaled)
     
     # Evaluation
     mse = mean_squared_error(y, y_pred)
     r2 = r2_score(y, y_pred)
     
-    print(f"Best Parameters: {grid_search.best_params_}")
+    print(f"Best Parameters: {{'alpha': {alpha}}}")
     print(f"MSE: {mse}, R2: {r2}")
     
     return best_model, mse, r2
@@ -115,6 +96,48 @@ def process_files_and_get_best_model_electricity_cost(file_paths):
 
 
 
+def preprocess_and_fit_electricity_targets(file_path, targets=('Total_Usage', 'Total_Cost')):
+    # Same models as preprocess_and_fit_electricity and preprocess_and_fit_electricity_cost: one Lasso
+    # per target, each with its own alpha. The targets only share the data preparation and the
+    # folds, scaled matrix and Gram matrix of the path search
+    df = dataset.load_electricity(file_path)
+    features = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
+    targets = list(targets)
+    
+    # Data Preparation
+    X = df[features].fillna(df[features].mean())
+    y = df[targets]
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    
+    # Split the data
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.3, random_state=42)
+    
+    # One alpha per target, picked along the warm-started regularization path
+    alphas = lasso_search.best_alphas(X_train, y_train.to_numpy())
+    
+    # Model fitting and evaluation per target
+    models = {}
+    metrics = {}
+    for target, alpha in zip(targets, alphas):
+        models[target] = lasso_search.fit_lasso(X_train, y_train[target], alpha)
+        y_pred = models[target].predict(X_scaled)
+        metrics[target] = {'MSE': mean_squared_error(y[target], y_pred), 'R2': r2_score(y[target], y_pred)}
+        print(f"{target} MSE: {metrics[target]['MSE']}, R2: {metrics[target]['R2']}")
+        print(f"Best Parameters: {{'alpha': {alpha}}}")
+    
+    return models, metrics
+
+def fit_year(path, year, targets=('Total_Usage', 'Total_Cost')):
+    # Metrics of one year's fits, the unit of work the training scheduler runs in parallel
+    _, metrics = preprocess_and_fit_electricity_targets(path, targets)
+    return metrics
+
+def process_files_and_get_best_model_electricity_targets(file_paths, targets=('Total_Usage', 'Total_Cost')):
+    # Returns target -> (results, best_year), each pair shaped like process_files_and_get_best_model_electricity's
+    per_year = {year: fit_year(path, year, targets) for year, path in file_paths.items()}
+    return pipeline.summarize_joint_results(per_year)
+
 def return_all_year():
     global results
     for key in results.keys():
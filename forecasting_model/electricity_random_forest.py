@@ -1,96 +1,83 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.preprocessing import StandardScaler
 from datetime import datetime
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import os
+from forecasting_model import dataset
+from forecasting_model import model_cache
+from forecasting_model import incremental
+from forecasting_model import backends
+from forecasting_model import pipeline
+from forecasting_model import plots
 
-def preprocess_and_fit(file_path, year):
-    data = pd.read_csv(file_path)
-    data['Date'] = pd.to_datetime(data['Date'])
-    data['Day of Year'] = data['Date'].dt.dayofyear    
-    data['Month'] = data['Date'].dt.month
-    data['Total_Usage'] = data[['Usage TOU off-peak (kWh)', 'Usage TOU mid-peak (kWh)', 'Usage TOU on-peak (kWh)']].sum(axis=1)
-    data['Temperature'] = data['Average temperature (C)']  # Adjust based on your dataset
+# Features and hyperparameters of the forests, part of their model cache key
+FEATURES = ['Day of Year', 'Temperature']
+MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42, 'test_size': 0.2, 'features': FEATURES}
 
-    X = data[['Day of Year', 'Temperature']].fillna(0)
-    y = data['Total_Usage']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_model.fit(X_train, y_train)
+# Targets of the joint forest; the per-TOU-bucket targets are optional
+JOINT_TARGETS = ['Total_Usage', 'Total_Cost']
+TOU_TARGETS = dataset.ELECTRICITY_USAGE_COLUMNS + dataset.ELECTRICITY_COST_COLUMNS
+
+def joint_targets(include_tou=False):
+    return JOINT_TARGETS + (TOU_TARGETS if include_tou else [])
+
+def model_params(target, backend=None):
+    return backends.cache_params(dict(MODEL_PARAMS, target=target), backend)
+
+def joint_params(targets, backend=None):
+    return backends.cache_params(dict(MODEL_PARAMS, targets=targets), backend)
+
+def model_version(name, file_path, params):
+    # Model cache key of the fitted model, so charts are re-rendered only when the model changes
+    return model_cache.model_key(name, dataset.dataset_hash(file_path), params)
+
+def get_model(file_path, target, backend=None):
+    # Forest (or other backends.py model) for one year and target ('Total_Usage' or 'Total_Cost'),
+    # trained once per version of the data.
+    # A partition that only gained a new month grows a few trees on it instead of being refit
+    def prepare(data):
+        return data[FEATURES].fillna(0), data[target]
+
+    def make_model():
+        return backends.make_model(backend)
+
+    return incremental.get_or_fit(model_cache.default_folder('Electricity'), 'electricity_random_forest',
+                                  file_path, model_params(target, backend),
+                                  dataset.load_electricity, prepare, make_model)
 
-    y_pred = rf_model.predict(X)
+def preprocess_and_fit(file_path, year, backend=None):
+    # Cleaned frame with 'Day of Year', 'Month', 'Total_Usage' and 'Temperature', shared with the other models
+    data = dataset.load_electricity(file_path)
+
+    rf_model = get_model(file_path, 'Total_Usage', backend)
+
+    # Predict once for the whole year; evaluation and every plot reuse these predictions
+    data = pipeline.attach_predictions(data, rf_model, FEATURES)
+    y = data['Total_Usage']
+    y_pred = data[pipeline.PREDICTION_COLUMN].to_numpy()
 
     mse = mean_squared_error(y, y_pred)
     r2 = r2_score(y, y_pred)
 
-    # Generate and save plots within the same function
-    generate_and_save_plots(data, y_pred, year, rf_model)
+    # Charts are rendered from the stored predictions when their tab is opened
+    save_predictions('electricity_usage', file_path, data, 'Total_Usage', y_pred, year,
+                     model_version('electricity_random_forest', file_path, model_params('Total_Usage', backend)))
 
     return mse, r2
 
-def generate_and_save_plots(data, y_pred, year, model):
-    # Annual plot
-    plt.figure(figsize=(10, 6))
-    plt.plot(data['Day of Year'], data['Total_Usage'], label='Actual Usage', color='green', linewidth=2)
-    plt.plot(data['Day of Year'], y_pred, label='Predicted Usage', color='red', linestyle='--')
-    plt.title(f'Electricity Usage Predictions for {year}')
-    plt.xlabel('Day of Year')
-    plt.ylabel('Total Usage (kWh)')
-    plt.legend()
-    plt.tight_layout()
-    save_plot(year, 'annual_electricity_usage.png')
-
-    # Monthly plots
-    for month in sorted(data['Month'].unique()):
-        month_data = data[data['Month'] == month]
-        y_pred_month = model.predict(month_data[['Day of Year', 'Temperature']].fillna(0))
-        plt.figure(figsize=(10, 6))
-        plt.plot(month_data['Day of Year'], month_data['Total_Usage'], label='Actual Usage', color='green', linewidth=2)
-        plt.plot(month_data['Day of Year'], y_pred_month, label='Predicted Usage', color='red', linestyle='--')
-        plt.title(f'Electricity Usage Predictions for Month {month}')
-        plt.xlabel('Day of Year')
-        plt.ylabel('Total Usage (kWh)')
-        plt.legend()
-        plt.tight_layout()
-        save_plot(year, f'month_{month}_electricity_usage.png')
-
-def save_plot(year, filename):
-    # Determine the current script's directory
-    module_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(module_path)
-    
-    # Move up one directory level to check for an "Electricity" folder there
-    parent_dir = os.path.dirname(current_dir)
-    electricity_dir = os.path.join(parent_dir, 'Electricity')
-    
-    # Check if the "Electricity" folder exists in the parent directory
-    if os.path.exists(electricity_dir):
-        # If it does, use it to construct the path for the "Graphs" folder
-        fig_path = os.path.join(electricity_dir, 'Graphs', str(year))
-    else:
-        # If not, revert to using the current directory to place the "Electricity" folder
-        fig_path = os.path.join(current_dir, 'Electricity', 'Graphs', str(year))
-    
-    # Create the "Graphs" folder if it doesn't exist
-    if not os.path.exists(fig_path):
-        os.makedirs(fig_path)
-    
-    # Save the plot to the specified filename within the "Graphs" folder
-    plt.savefig(os.path.join(fig_path, filename))
-    plt.close()
-
-# Example usage
-# save_plot('2022', 'example_plot.png')
-
-def process_files_and_get_best_year(file_paths):
+def save_predictions(kind, file_path, data, target, y_pred, year, model_version):
+    # Store what the annual and monthly charts are drawn from; they are rendered when first viewed
+    plots.save_predictions(kind, year, dataset.dataset_hash(file_path), model_version,
+                           data['Day of Year'], data[target], y_pred, data['Month'])
+
+def process_files_and_get_best_year(file_paths, backend=None):
     results = {}
     for year, path in file_paths.items():
-        mse, r2 = preprocess_and_fit(path, year)
+        mse, r2 = preprocess_and_fit(path, year, backend)
         results[year] = {'MSE': mse, 'R2': r2}
     # Find the year with the highest R2 value
     best_year = max(results, key=lambda x: results[x]['R2'])
@@ -101,90 +88,30 @@ def process_files_and_get_best_year(file_paths):
     return results,best_year
 
 
-def preprocess_and_fit_cost(file_path, year):
-    data = pd.read_csv(file_path)
-    data['Date'] = pd.to_datetime(data['Date'])
-    data['Day of Year'] = data['Date'].dt.dayofyear    
-    data['Month'] = data['Date'].dt.month
-    data['Total_Cost'] = data[['Cost TOU off-peak ($)', 'Cost TOU mid-peak ($)', 'Cost TOU on-peak ($)']].sum(axis=1)
-    data['Temperature'] = data['Average temperature (C)']  # Adjust based on your dataset
+def preprocess_and_fit_cost(file_path, year, backend=None):
+    # Cleaned frame with 'Day of Year', 'Month', 'Total_Cost' and 'Temperature', shared with the other models
+    data = dataset.load_electricity(file_path)
 
-    X = data[['Day of Year', 'Temperature']].fillna(0)
-    y = data['Total_Cost']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_model.fit(X_train, y_train)
+    rf_model = get_model(file_path, 'Total_Cost', backend)
 
-    y_pred = rf_model.predict(X)
+    # Predict once for the whole year; evaluation and every plot reuse these predictions
+    data = pipeline.attach_predictions(data, rf_model, FEATURES)
+    y = data['Total_Cost']
+    y_pred = data[pipeline.PREDICTION_COLUMN].to_numpy()
 
     mse = mean_squared_error(y, y_pred)
     r2 = r2_score(y, y_pred)
 
-    # Generate and save plots within the same function
-    generate_and_save_plots_cost(data, y_pred, year, rf_model)
+    # Charts are rendered from the stored predictions when their tab is opened
+    save_predictions('electricity_cost', file_path, data, 'Total_Cost', y_pred, year,
+                     model_version('electricity_random_forest', file_path, model_params('Total_Cost', backend)))
 
     return mse, r2
 
-def generate_and_save_plots_cost(data, y_pred, year, model):
-    # Annual plot
-    plt.figure(figsize=(10, 6))
-    plt.plot(data['Day of Year'], data['Total_Cost'], label='Actual Cost', color='green', linewidth=2)
-    plt.plot(data['Day of Year'], y_pred, label='Predicted Cost', color='red', linestyle='--')
-    plt.title(f'Electricity Cost Predictions for {year}')
-    plt.xlabel('Day of Year')
-    plt.ylabel('Total Cost ($)')
-    plt.legend()
-    plt.tight_layout()
-    save_plot_cost(year, 'annual_electricity_cost.png')
-
-    # Monthly plots
-    for month in sorted(data['Month'].unique()):
-        month_data = data[data['Month'] == month]
-        y_pred_month = model.predict(month_data[['Day of Year', 'Temperature']].fillna(0))
-        plt.figure(figsize=(10, 6))
-        plt.plot(month_data['Day of Year'], month_data['Total_Cost'], label='Actual Cost', color='green', linewidth=2)
-        plt.plot(month_data['Day of Year'], y_pred_month, label='Predicted Cost', color='red', linestyle='--')
-        plt.title(f'Electricity Cost Predictions for Month {month}')
-        plt.xlabel('Day of Year')
-        plt.ylabel('Total Cost ($)')
-        plt.legend()
-        plt.tight_layout()
-        save_plot_cost(year, f'month_{month}_electricity_cost.png')
-
-def save_plot_cost(year, filename):
-    # Determine the current script's directory
-    module_path = os.path.abspath(__file__)
-    current_dir = os.path.dirname(module_path)
-    
-    # Move up one directory level to check for an "Electricity" folder there
-    parent_dir = os.path.dirname(current_dir)
-    electricity_dir = os.path.join(parent_dir, 'Electricity')
-    
-    # Check if the "Electricity" folder exists in the parent directory
-    if os.path.exists(electricity_dir):
-        # If it does, use it to construct the path for the "Graphs" folder
-        fig_path = os.path.join(electricity_dir, 'Graphs_cost', str(year))
-    else:
-        # If not, revert to using the current directory to place the "Electricity" folder
-        fig_path = os.path.join(current_dir, 'Electricity', 'Graphs_cost', str(year))
-    
-    # Create the "Graphs" folder if it doesn't exist
-    if not os.path.exists(fig_path):
-        os.makedirs(fig_path)
-    
-    # Save the plot to the specified filename within the "Graphs" folder
-    plt.savefig(os.path.join(fig_path, filename))
-    plt.close()
-
-# Example usage
-# save_plot('2022', 'example_plot.png')
-
-def process_files_and_get_best_year_cost(file_paths):
+def process_files_and_get_best_year_cost(file_paths, backend=None):
     results = {}
     for year, path in file_paths.items():
-        mse, r2 = preprocess_and_fit_cost(path, year)
+        mse, r2 = preprocess_and_fit_cost(path, year, backend)
         results[year] = {'MSE': mse, 'R2': r2}
     # Find the year with the highest R2 value
     best_year = max(results, key=lambda x: results[x]['R2'])
@@ -194,6 +121,53 @@ def process_files_and_get_best_year_cost(file_paths):
         
     return results,best_year
 
+def get_joint_model(file_path, targets, backend=None):
+    # One multi-output forest per year for all targets, trained once per version of the data
+    # and updated incrementally when only a new month arrived
+    def prepare(data):
+        return data[FEATURES].fillna(0), data[targets].fillna(0)
+
+    def make_model():
+        # Targets are standardised so usage (kWh) does not outweigh cost ($) when choosing the shared splits
+        return TransformedTargetRegressor(regressor=backends.make_model(backend, multi_output=True),
+                                          transformer=StandardScaler())
+
+    return incremental.get_or_fit(model_cache.default_folder('Electricity'), 'electricity_random_forest_joint',
+                                  file_path, joint_params(targets, backend),
+                                  dataset.load_electricity, prepare, make_model)
+
+def preprocess_and_fit_joint(file_path, year, include_tou=False, backend=None):
+    # Fit usage, cost (and optionally every TOU bucket) with one forest and score each target
+    data = dataset.load_electricity(file_path)
+    targets = joint_targets(include_tou)
+    rf_model = get_joint_model(file_path, targets, backend)
+
+    # One predict call gives every target's predictions for the whole year
+    y_pred = rf_model.predict(data[FEATURES].fillna(0)).reshape(len(data), len(targets))
+
+    metrics = {}
+    for i, target in enumerate(targets):
+        y = data[target].fillna(0)
+        metrics[target] = {'MSE': mean_squared_error(y, y_pred[:, i]), 'R2': r2_score(y, y_pred[:, i])}
+
+    # Same usage and cost charts as the single-target models, rendered when first viewed
+    version = model_version('electricity_random_forest_joint', file_path, joint_params(targets, backend))
+    save_predictions('electricity_usage', file_path, data, 'Total_Usage', y_pred[:, 0], year, version)
+    save_predictions('electricity_cost', file_path, data, 'Total_Cost', y_pred[:, 1], year, version)
+
+    return metrics
+
+def process_files_and_get_best_year_joint(file_paths, include_tou=False, backend=None):
+    """
+    Joint training mode: one multi-output forest per year instead of separate usage and cost forests.
+
+    Returns:
+    - A dictionary of target -> (results, best_year), each pair shaped like the one
+      process_files_and_get_best_year returns.
+    """
+    per_year = {year: preprocess_and_fit_joint(path, year, include_tou, backend) for year, path in file_paths.items()}
+    return pipeline.summarize_joint_results(per_year)
+
 def return_all_year():
     global results
     for key in results.keys():
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from forecasting_model import Water_Random_Forest
+from forecasting_model import water_linear_regression
+from forecasting_model import electricity_random_forest
+
+# Batched forecasts over dates x sites x weather scenarios.
+# Every input row that goes through the same trained model is stacked into one feature matrix,
+# so a forecast costs one predict call per distinct model instead of one per (site, day, scenario).
+
+WATER_MODELS = {
+    'random_forest': Water_Random_Forest.get_prediction_model,
+    'linear': water_linear_regression.get_prediction_model
+}
+
+ELECTRICITY_TARGETS = {'usage': 'Total_Usage', 'cost': 'Total_Cost'}
+
+
+def _as_grid(values, n_days):
+    # Accept scalars, (days,), (sites, days) or (sites, days, scenarios) arrays
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 0:
+        values = values.reshape(1, 1, 1)
+    elif values.ndim == 1:
+        values = values.reshape(1, -1, 1)
+    elif values.ndim == 2:
+        values = values[:, :, np.newaxis]
+    if values.shape[1] not in (1, n_days):
+        raise ValueError(f"Weather arrays must have one value per date ({n_days}), got shape {values.shape}")
+    return values
+
+
+def _is_per_site(value):
+    # A list of mappings/lists holds one entry per site; a dict or a list of years is shared
+    return isinstance(value, (list, tuple)) and len(value) > 0 and all(isinstance(v, (dict, list, tuple, set)) for v in value)
+
+
+def _per_site(value, n_sites):
+    if _is_per_site(value):
+        if len(value) != n_sites:
+            raise ValueError(f"Expected {n_sites} per-site entries, got {len(value)}")
+        return list(value)
+    return [value] * n_sites
+
+
+def _forecast(dates, weather, file_paths, years, get_model, feature_names):
+    dates = pd.to_datetime(np.atleast_1d(dates))
+    day_of_year = dates.dayofyear.to_numpy(dtype=float)
+    grids = np.broadcast_arrays(*[_as_grid(values, len(dates)) for values in weather])
+    n_sites = max(grids[0].shape[0], len(file_paths) if _is_per_site(file_paths) else 1,
+                  len(years) if _is_per_site(years) else 1)
+    shape = (n_sites, len(dates), grids[0].shape[2])
+    grids = [np.broadcast_to(grid, shape) for grid in grids]
+    day_grid = np.broadcast_to(day_of_year[np.newaxis, :, np.newaxis], shape)
+
+    site_paths = _per_site(file_paths, n_sites)
+    site_years = _per_site(years, n_sites)
+
+    # Group sites by the model files they use
+    sites_by_model = {}
+    for site, (paths, site_year_list) in enumerate(zip(site_paths, site_years)):
+        for year in site_year_list:
+            sites_by_model.setdefault(paths[year], []).append(site)
+
+    totals = np.zeros(shape)
+    counts = np.zeros(n_sites)
+    for model_path, sites in sites_by_model.items():
+        model = get_model(model_path)
+        # One matrix predict for every (site, day, scenario) row using this model
+        columns = [day_grid[sites].ravel()] + [grid[sites].ravel() for grid in grids]
+        X = pd.DataFrame(dict(zip(feature_names, columns)))
+        totals[sites] += model.predict(X).reshape((len(sites),) + shape[1:])
+        counts[sites] += 1
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return totals / counts[:, np.newaxis, np.newaxis]
+
+
+def forecast_water(dates, temperature, precipitation, file_paths, good_years, model='random_forest'):
+    """
+    Forecasts daily water use for many dates, sites and weather scenarios at once.
+
+    Parameters:
+    - dates: list of dates to forecast.
+    - temperature, precipitation: array-like, shaped (sites, days, scenarios); scalars,
+      (days,) and (sites, days) arrays are broadcast.
+    - file_paths: dict of year -> combined file path, or a list of such dicts (one per site).
+    - good_years: years whose models are averaged, or a list of them (one per site).
+    - model: 'random_forest' or 'linear'.
+
+    Returns:
+    - A (sites, days, scenarios) array with the average prediction of the good-year models
+      (NaN for sites without any good year).
+    """
+    return _forecast(dates, [temperature, precipitation], file_paths, good_years, WATER_MODELS[model],
+                     Water_Random_Forest.PREDICTION_FEATURES)
+
+
+def forecast_electricity(dates, temperature, file_paths, years, targets=('usage', 'cost')):
+    """
+    Forecasts daily electricity usage and cost for many dates, sites and temperature scenarios.
+
+    Parameters:
+    - dates: list of dates to forecast.
+    - temperature: array-like, shaped (sites, days, scenarios) or broadcastable to it.
+    - file_paths: dict of year -> combined file path, or a list of such dicts (one per site).
+    - years: years whose forests are averaged (e.g. [best_year]), or a list of them (one per site).
+    - targets: any of 'usage' and 'cost'.
+
+    Returns:
+    - A dictionary of target -> (sites, days, scenarios) array.
+    """
+    forecasts = {}
+    for target in targets:
+        column = ELECTRICITY_TARGETS[target]
+        forecasts[target] = _forecast(dates, [temperature], file_paths, years,
+                                      lambda path: electricity_random_forest.get_model(path, column),
+                                      electricity_random_forest.FEATURES)
+    return forecasts
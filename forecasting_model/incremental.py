@@ -0,0 +1,137 @@
+import os
+import math
+import hashlib
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestRegressor
+import combine_store
+from forecasting_model import dataset
+from forecasting_model import model_cache
+
+# Incremental retraining of the cached forests.
+# The model cache already refits only the year partitions whose data changed. When a partition only
+# gained rows at its end (a new month), its previous forest is kept and warm-started with a few extra
+# trees grown on the new rows alone, so a monthly update costs about as much as the new data.
+# A drift check guards this: if the previous forest predicts the new rows much worse than its own
+# holdout error, or too many trees have been added since the last full fit, the forest is refit.
+
+LINEAGE_FOLDER = 'lineage'
+
+# New-row error above this multiple of the holdout error counts as drift
+DRIFT_RATIO = 2.0
+# Incremental trees allowed, as a fraction of the trees of the last full fit
+MAX_GROWTH = 0.5
+MIN_NEW_TREES = 5
+
+
+def lineage_path(folder, name, file_path, params):
+    # One lineage record per (model, partition, hyperparameters), whatever the partition's content.
+    # Separate files keep parallel training jobs from overwriting each other's records
+    key = model_cache.model_key(name, os.path.abspath(file_path), params)
+    return os.path.join(folder, name, LINEAGE_FOLDER, f'{key}.json')
+
+
+def rows_hash(X, y, n_rows):
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(np.asarray(X, dtype=float)[:n_rows]).tobytes())
+    sha.update(np.ascontiguousarray(np.asarray(y, dtype=float)[:n_rows]).tobytes())
+    return sha.hexdigest()
+
+
+def _errors(model, X, y):
+    # Mean squared error of each target column
+    y = np.asarray(y, dtype=float).reshape(len(X), -1)
+    pred = np.asarray(model.predict(X), dtype=float).reshape(y.shape)
+    return ((y - pred) ** 2).mean(axis=0)
+
+
+def _forest(model):
+    # Forest inside a TransformedTargetRegressor, or the model itself
+    return getattr(model, 'regressor_', model)
+
+
+def can_grow(model):
+    # Only bagged forests can take extra trees fitted on new rows; other backends are refit
+    return isinstance(_forest(model), RandomForestRegressor)
+
+
+def drifted(model, X_new, y_new, holdout_mse):
+    errors = _errors(model, X_new, y_new)
+    return bool(np.any(errors > DRIFT_RATIO * np.asarray(holdout_mse) + 1e-12))
+
+
+def grow(model, X_new, y_new, n_trees):
+    """
+    Adds n_trees trees fitted on the new rows only to a fitted forest (in place) and returns it.
+    Models wrapped in a TransformedTargetRegressor keep their target scaling.
+    """
+    forest = _forest(model)
+    if forest is not model:
+        y_new = np.asarray(y_new, dtype=float)
+        y_new = model.transformer_.transform(y_new.reshape(len(y_new), -1))
+        if y_new.shape[1] == 1:
+            y_new = y_new.ravel()
+    forest.set_params(warm_start=True, n_estimators=forest.n_estimators + n_trees)
+    forest.fit(X_new, y_new)
+    forest.set_params(warm_start=False)
+    return model
+
+
+def get_or_fit(folder, name, file_path, params, load, prepare, make_model, test_size=0.2):
+    """
+    Returns the cached forest for a partition, updating the previous one incrementally when possible.
+
+    Parameters:
+    - folder, name, params: as for model_cache.get_or_fit.
+    - file_path: str. Combined year path the forest is trained on.
+    - load: callable(file_path) -> DataFrame, e.g. dataset.load_water.
+    - prepare: callable(DataFrame) -> (X, y).
+    - make_model: callable() -> unfitted forest (or TransformedTargetRegressor around one).
+    - test_size: holdout share of a full fit, whose error is the drift baseline.
+    """
+    record_path = lineage_path(folder, name, file_path, params)
+
+    def save_record(record):
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+        combine_store.save_json(record_path, record)
+
+    def full_fit(X, y):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+        model = make_model()
+        model.fit(X_train, y_train)
+        trees = getattr(_forest(model), 'n_estimators', 0)
+        save_record({'model': model_cache.model_key(name, data_hash, params), 'rows': len(X),
+                     'prefix': rows_hash(X, y, len(X)), 'holdout_mse': _errors(model, X_test, y_test).tolist(),
+                     'base_trees': trees, 'trees': trees})
+        return model
+
+    def incremental_fit(X, y, record):
+        previous = os.path.join(folder, name, f"{record['model']}.joblib")
+        n_old = record['rows']
+        if not os.path.exists(previous) or len(X) <= n_old or rows_hash(X, y, n_old) != record['prefix']:
+            return None
+        X_new, y_new = X.iloc[n_old:], y.iloc[n_old:]
+        n_trees = max(MIN_NEW_TREES, math.ceil(record['base_trees'] * len(X_new) / n_old))
+        if record['trees'] + n_trees - record['base_trees'] > MAX_GROWTH * record['base_trees']:
+            return None
+        # Loaded from disk so the in-memory copy of the previous version is never modified
+        model = joblib.load(previous)
+        if not can_grow(model) or drifted(model, X_new, y_new, record['holdout_mse']):
+            return None
+        grow(model, X_new, y_new, n_trees)
+        save_record(dict(record, model=model_cache.model_key(name, data_hash, params), rows=len(X),
+                         prefix=rows_hash(X, y, len(X)), trees=record['trees'] + n_trees))
+        return model
+
+    def fit():
+        X, y = prepare(load(file_path))
+        model = None
+        if os.path.exists(record_path):
+            model = incremental_fit(X, y, combine_store.load_json(record_path))
+        if model is None:
+            model = full_fit(X, y)
+        return model
+
+    data_hash = dataset.dataset_hash(file_path)
+    return model_cache.get_or_fit(folder, name, data_hash, params, fit)
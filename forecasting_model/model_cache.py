@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import joblib
+import sklearn
+
+# Persisted cache of trained models.
+# A model is stored as a joblib artifact named after a key built from the model name, the hash of
+# its training data, its hyperparameters, the cache format version and the scikit-learn version.
+# Any change to one of those gives a new key, so a stale model is never loaded.
+
+MODEL_CACHE_VERSION = 1
+
+# Upper bound on the models kept in memory, measured by the size of their artifacts on disk
+MAX_LOADED_BYTES = 256 * 1024 * 1024
+
+_loaded = OrderedDict()
+_loaded_bytes = 0
+_lock = threading.Lock()
+
+
+def default_folder(utility):
+    # Models live next to the utility's data, e.g. Water/Models or Electricity/Models
+    module_path = os.path.abspath(__file__)
+    current_dir = os.path.dirname(module_path)
+    parent_dir = os.path.dirname(current_dir)
+    return os.path.join(parent_dir, utility, 'Models')
+
+
+def model_key(name, data_hash, params):
+    payload = json.dumps({
+        'name': name,
+        'data': data_hash,
+        'params': params,
+        'version': MODEL_CACHE_VERSION,
+        'sklearn': sklearn.__version__
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def model_path(folder, name, data_hash, params):
+    return os.path.join(folder, name, f'{model_key(name, data_hash, params)}.joblib')
+
+
+def get_or_fit(folder, name, data_hash, params, fit):
+    """
+    Returns the cached model for (name, data_hash, params), fitting and storing it on a miss.
+
+    Parameters:
+    - folder: str. Cache folder, see default_folder.
+    - name: str. Model family, e.g. 'water_random_forest'.
+    - data_hash: str. Hash of the training data, see dataset.dataset_hash.
+    - params: dict. Hyperparameters and anything else that changes the fitted model.
+    - fit: callable() -> estimator. Trains the model when it is not cached yet.
+    """
+    path = model_path(folder, name, data_hash, params)
+    with _lock:
+        cached = _loaded.get(path)
+        if cached is not None:
+            _loaded.move_to_end(path)
+    if cached is not None:
+        return cached[0]
+
+    if os.path.exists(path):
+        model = joblib.load(path)
+    else:
+        model = fit()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+
+    _remember(path, model, os.path.getsize(path))
+    return model
+
+
+def _remember(path, model, size):
+    global _loaded_bytes
+    with _lock:
+        if path not in _loaded:
+            _loaded[path] = (model, size)
+            _loaded_bytes += size
+            # Evict the least recently used models until the cache fits its cap again
+            while _loaded_bytes > MAX_LOADED_BYTES and len(_loaded) > 1:
+                _, (_, evicted_size) = _loaded.popitem(last=False)
+                _loaded_bytes -= evicted_size
+
+
+def clear_loaded():
+    # Forget models kept in memory; artifacts on disk are kept
+    global _loaded_bytes
+    with _lock:
+        _loaded.clear()
+        _loaded_bytes = 0
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import combine_store
+import rollup_index
+from forecasting_model import dataset
+
+# Fit/evaluate/plot stage helpers.
+# Predictions are computed once per model and year and stored next to the frame; evaluation and
+# the annual and monthly plots all read slices of that one array instead of predicting again.
+
+PREDICTION_COLUMN = 'Predicted'
+
+
+def attach_predictions(data, model, features, column=PREDICTION_COLUMN):
+    """
+    Runs the single predict call of a model-year and returns the frame with a prediction column.
+    The input frame is not modified.
+    """
+    data = data.copy(deep=False)
+    data[column] = model.predict(data[features].fillna(0))
+    return data
+
+
+def month_groups(data):
+    """
+    Returns (month, rows) pairs for the monthly plots.
+
+    Frames loaded from a year partition take the month slices straight from its rollup index, as long
+    as the partition still has the content hash the frame was built from (the index itself is rebuilt
+    whenever it is older than the partition).
+    Other date-sorted single-year frames give contiguous slices (views, no copy). Frames spanning
+    several years, where a month occurs more than once, are grouped with one stable argsort.
+    """
+    source = data.attrs.get('source')
+    if (source is not None and not combine_store.is_all_view(source) and os.path.exists(source)
+            and data.attrs.get('source_hash') == dataset.dataset_hash(source)):
+        index = rollup_index.load_index(source)
+        if len(index['days']) == len(data):
+            return rollup_index.month_slices(source, index)
+
+    months = data['Month'].to_numpy()
+    if len(months) == 0:
+        return []
+    if np.all(months[1:] >= months[:-1]):
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        ends = np.r_[starts[1:], len(months)]
+        return [(int(months[start]), slice(start, end)) for start, end in zip(starts, ends)]
+
+    order = np.argsort(months, kind='stable')
+    sorted_months = months[order]
+    starts = np.flatnonzero(np.r_[True, sorted_months[1:] != sorted_months[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    return [(int(sorted_months[start]), order[start:end]) for start, end in zip(starts, ends)]
+
+
+def summarize_joint_results(per_year):
+    """
+    Summarizes the per-year metrics of a joint (multi-target) model.
+
+    Parameters:
+    - per_year: dict of year -> {target: {'MSE': ..., 'R2': ...}}.
+
+    Returns:
+    - A dictionary of target -> (results, best_year), each pair shaped like the one the
+      single-target process_files_and_get_* functions return.
+    """
+    targets = next(iter(per_year.values())).keys() if per_year else []
+    summaries = {}
+    for target in targets:
+        results = {year: metrics[target] for year, metrics in per_year.items()}
+        best_year = max(results, key=lambda x: results[x]['R2'])
+        print(f"{target}: Best Year based on R2: {best_year}")
+        for year, metrics in results.items():
+            print(f"Year: {year}, MSE: {metrics['MSE']}, R2: {metrics['R2']}")
+        summaries[target] = (results, best_year)
+    return summaries
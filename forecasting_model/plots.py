@@ -0,0 +1,360 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import combine_store
+
+# Lazy, cached plot rendering.
+# Training no longer draws anything: each model-year stores the arrays its charts are made of
+# (x, actual, predicted and the month of every row) with the data hash and model version they
+# came from. The GUI draws a chart in memory (render_image) when its tab is viewed. PNGs in the usual
+# Graphs folders are written on request (get_plot) and by render_all, and remembered under a key of data
+# hash, model version and plot spec; a cache hit returns the PNG path without importing matplotlib.
+
+PLOT_CACHE_VERSION = 1
+PREDICTIONS_FOLDER = 'Predictions'
+KEYS_NAME = 'plot_keys.json'
+
+# Model-years whose prediction arrays are kept in memory
+MAX_LOADED_PREDICTIONS = 8
+
+_loaded = OrderedDict()
+
+# kind -> how its charts look and where they are written
+PLOT_SPECS = {
+    'electricity_usage': {
+        'utility': 'Electricity',
+        'folder': 'Graphs',
+        'annual_file': 'annual_electricity_usage.png',
+        'month_file': 'month_{month}_electricity_usage.png',
+        'annual_title': 'Electricity Usage Predictions for {year}',
+        'month_title': 'Electricity Usage Predictions for Month {month}',
+        'xlabel': 'Day of Year',
+        'ylabel': 'Total Usage (kWh)',
+        'actual_label': 'Actual Usage',
+        'annual_predicted_label': 'Predicted Usage',
+        'month_predicted_label': 'Predicted Usage',
+        'predicted_linestyle': '--',
+        'figsize': (10, 6)
+    },
+    'electricity_cost': {
+        'utility': 'Electricity',
+        'folder': 'Graphs_cost',
+        'annual_file': 'annual_electricity_cost.png',
+        'month_file': 'month_{month}_electricity_cost.png',
+        'annual_title': 'Electricity Cost Predictions for {year}',
+        'month_title': 'Electricity Cost Predictions for Month {month}',
+        'xlabel': 'Day of Year',
+        'ylabel': 'Total Cost ($)',
+        'actual_label': 'Actual Cost',
+        'annual_predicted_label': 'Predicted Cost',
+        'month_predicted_label': 'Predicted Cost',
+        'predicted_linestyle': '--',
+        'figsize': (10, 6)
+    },
+    'water': {
+        'utility': 'Water',
+        'folder': 'Graph',
+        'annual_file': 'annual.png',
+        'month_file': '{month}.png',
+        'annual_title': 'Linear Regression Predictions',
+        'month_title': 'Linear Regression Predictions for Month {month}',
+        'xlabel': 'Day of Year',
+        'ylabel': 'Water Use (m³)',
+        'actual_label': 'Actual',
+        'annual_predicted_label': 'Linear Regression Prediction',
+        'month_predicted_label': 'Random Forest Prediction',
+        'predicted_linestyle': '-',
+        'figsize': (10, 6)
+    }
+}
+
+
+def utility_folder(utility):
+    # Data, models and charts of a utility live next to the package, e.g. Water or Electricity
+    module_path = os.path.abspath(__file__)
+    parent_dir = os.path.dirname(os.path.dirname(module_path))
+    return os.path.join(parent_dir, utility)
+
+
+def predictions_path(kind, year):
+    spec = PLOT_SPECS[kind]
+    return os.path.join(utility_folder(spec['utility']), PREDICTIONS_FOLDER, kind, f'{year}.npz')
+
+
+def plot_folder(kind, year):
+    spec = PLOT_SPECS[kind]
+    return os.path.join(utility_folder(spec['utility']), spec['folder'], str(year))
+
+
+def plot_path(kind, year, month=None):
+    spec = PLOT_SPECS[kind]
+    filename = spec['annual_file'] if month is None else spec['month_file'].format(month=month)
+    return os.path.join(plot_folder(kind, year), filename)
+
+
+def save_predictions(kind, year, data_hash, model_version, x, actual, predicted, months, annual_predicted=None):
+    """
+    Stores what the charts of one model-year are drawn from. Nothing is rendered here.
+
+    Parameters:
+    - kind: key of PLOT_SPECS.
+    - data_hash: str. Hash of the data the model was scored on, see dataset.dataset_hash.
+    - model_version: str. Identifies the fitted model, e.g. its model_cache.model_key.
+    - x, actual, predicted, months: per-row arrays ('Day of Year', target, predictions, month).
+    - annual_predicted: array, optional. Predictions drawn on the annual chart when they differ
+      from the monthly ones (the water charts show rounded predictions for the year).
+    """
+    path = predictions_path(kind, year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {
+        'x': np.asarray(x, dtype=float),
+        'actual': np.asarray(actual, dtype=float),
+        'predicted': np.asarray(predicted, dtype=float),
+        'months': np.asarray(months, dtype=np.int8),
+        'meta': np.array(json.dumps({'data_hash': data_hash, 'model_version': model_version}))
+    }
+    if annual_predicted is not None:
+        arrays['annual_predicted'] = np.asarray(annual_predicted, dtype=float)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def render_image(kind, year, month=None):
+    """
+    Draws a chart in memory, for showing it without writing and decoding a PNG.
+
+    Returns:
+    - A (height, width, 4) uint8 RGBA array, or None when there are no predictions
+      (or no rows in that month) to draw.
+    """
+    predictions = load_predictions(kind, year)
+    if predictions is None or (month is not None and not np.any(predictions['months'] == month)):
+        return None
+    fig = _draw_chart(kind, year, month, predictions)
+    fig.canvas.draw()
+    # The canvas is reused by the next chart, so the pixels are copied out
+    return np.array(fig.canvas.buffer_rgba())
+
+
+def load_predictions(kind, year):
+    path = predictions_path(kind, year)
+    if not os.path.exists(path):
+        return None
+    # Every chart of a year is drawn from the same arrays; keep the most recently used years until
+    # their file changes
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == stamp:
+        _loaded.move_to_end(path)
+        return cached[1]
+    with np.load(path) as stored:
+        predictions = {name: stored[name] for name in stored.files}
+    predictions['meta'] = json.loads(str(predictions['meta']))
+    _loaded[path] = (stamp, predictions)
+    _loaded.move_to_end(path)
+    while len(_loaded) > MAX_LOADED_PREDICTIONS:
+        _loaded.popitem(last=False)
+    return predictions
+
+
+def available_years(kind):
+    # Years whose predictions were stored, i.e. the year tabs there is something to show for
+    folder = os.path.dirname(predictions_path(kind, ''))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-len('.npz')] for name in os.listdir(folder)
+                  if name.endswith('.npz') and not name.endswith('.tmp.npz'))
+
+
+def plot_key(kind, meta, month=None):
+    payload = json.dumps({
+        'version': PLOT_CACHE_VERSION,
+        'data_hash': meta['data_hash'],
+        'model_version': meta['model_version'],
+        'spec': PLOT_SPECS[kind],
+        'month': month
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _read_meta(kind, year):
+    # Only the small metadata entry is read from the archive
+    path = predictions_path(kind, year)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as stored:
+        return json.loads(str(stored['meta']))
+
+
+# Fixed margins for the 10x6 charts, used instead of running tight_layout on every chart
+LAYOUT = {'left': 0.08, 'right': 0.98, 'bottom': 0.09, 'top': 0.94}
+# zlib level of the PNGs: encoding at the default level took about a third of the render time
+PNG_COMPRESS_LEVEL = 1
+
+# One reusable Agg canvas per plot kind and process: (figure, axes, actual line, predicted line, legend)
+_canvases = {}
+
+
+def _canvas(kind):
+    canvas = _canvases.get(kind)
+    if canvas is None:
+        # Imported here so cache hits never load matplotlib. The canvas is Agg whatever GUI backend
+        # the calling process uses, and pyplot's figure manager is never involved
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        spec = PLOT_SPECS[kind]
+        fig = Figure(figsize=spec['figsize'])
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(**LAYOUT)
+        ax = fig.add_subplot()
+        actual, = ax.plot([], [], label=spec['actual_label'], color='green', linewidth=2)
+        predicted, = ax.plot([], [], label=spec['annual_predicted_label'], color='red',
+                             linestyle=spec['predicted_linestyle'])
+        ax.set_xlabel(spec['xlabel'])
+        ax.set_ylabel(spec['ylabel'])
+        canvas = (fig, ax, actual, predicted, ax.legend())
+        _canvases[kind] = canvas
+    return canvas
+
+
+def _draw(kind, title, x, actual, predicted, predicted_label):
+    # Swap the data, title and legend label of the kind's canvas and return its figure
+    fig, ax, actual_line, predicted_line, legend = _canvas(kind)
+    actual_line.set_data(x, actual)
+    predicted_line.set_data(x, predicted)
+    predicted_line.set_label(predicted_label)
+    legend.get_texts()[1].set_text(predicted_label)
+    ax.set_title(title)
+    ax.relim()
+    ax.autoscale_view()
+    return fig
+
+
+def _draw_chart(kind, year, month, predictions):
+    # Draw one chart (the annual one when month is None) from stored predictions
+    spec = PLOT_SPECS[kind]
+    if month is None:
+        predicted = predictions.get('annual_predicted', predictions['predicted'])
+        return _draw(kind, spec['annual_title'].format(year=year), predictions['x'], predictions['actual'],
+                     predicted, spec['annual_predicted_label'])
+    rows = np.flatnonzero(predictions['months'] == month)
+    return _draw(kind, spec['month_title'].format(month=month), predictions['x'][rows], predictions['actual'][rows],
+                 predictions['predicted'][rows], spec['month_predicted_label'])
+
+
+def render(kind, year, month, predictions, path):
+    fig = _draw_chart(kind, year, month, predictions)
+    # Written next to the image and renamed, so the GUI never loads a half-written PNG
+    tmp_path = path + '.tmp.png'
+    fig.savefig(tmp_path, pil_kwargs={'compress_level': PNG_COMPRESS_LEVEL})
+    os.replace(tmp_path, path)
+
+
+def _keys_path(kind, year):
+    return os.path.join(plot_folder(kind, year), KEYS_NAME)
+
+
+def _load_keys(kind, year):
+    path = _keys_path(kind, year)
+    return combine_store.load_json(path) if os.path.exists(path) else {}
+
+
+def _save_keys(kind, year, rendered):
+    # Re-read so charts rendered meanwhile for other tabs keep their keys
+    keys = _load_keys(kind, year)
+    keys.update(rendered)
+    combine_store.save_json(_keys_path(kind, year), keys)
+
+
+def _is_cached(kind, year, month, meta, keys):
+    path = plot_path(kind, year, month)
+    return keys.get(os.path.basename(path)) == plot_key(kind, meta, month) and os.path.exists(path)
+
+
+def get_plot(kind, year, month=None):
+    """
+    Returns the PNG path of a chart, rendering it only when no up-to-date image is cached.
+
+    Parameters:
+    - kind: key of PLOT_SPECS.
+    - year: year label the predictions were stored under.
+    - month: int 1-12, or None for the annual chart.
+
+    Returns:
+    - The image path, or None when there are no predictions (or no rows in that month) to draw.
+    """
+    meta = _read_meta(kind, year)
+    if meta is None:
+        return None
+    if _is_cached(kind, year, month, meta, _load_keys(kind, year)):
+        return plot_path(kind, year, month)
+    rendered = render_year(kind, year, [month])
+    if not rendered:
+        return None
+    _save_keys(kind, year, rendered)
+    return plot_path(kind, year, month)
+
+
+def render_year(kind, year, months):
+    """
+    Renders charts of one model-year on this process's canvas. Keys are not recorded here.
+
+    Parameters:
+    - months: list of months (int 1-12, None for the annual chart).
+
+    Returns:
+    - A dictionary of image file name -> plot key for the charts written; months without rows are skipped.
+    """
+    predictions = load_predictions(kind, year)
+    rendered = {}
+    os.makedirs(plot_folder(kind, year), exist_ok=True)
+    for month in months:
+        if month is not None and not np.any(predictions['months'] == month):
+            continue
+        path = plot_path(kind, year, month)
+        render(kind, year, month, predictions, path)
+        rendered[os.path.basename(path)] = plot_key(kind, predictions['meta'], month)
+    return rendered
+
+
+def stale_charts(kind, year):
+    # Charts of a model-year (None for the annual one) whose cached image is missing or out of date
+    path = predictions_path(kind, year)
+    if not os.path.exists(path):
+        return []
+    with np.load(path) as stored:
+        meta = json.loads(str(stored['meta']))
+        months = sorted(int(month) for month in np.unique(stored['months']))
+    keys = _load_keys(kind, year)
+    return [month for month in [None] + months if not _is_cached(kind, year, month, meta, keys)]
+
+
+def render_all(kinds=None, max_workers=None, should_stop=None):
+    """
+    Renders every stale chart ahead of time, one job per model-year spread over a process pool.
+    Each worker draws all of its charts on one reused canvas.
+
+    Parameters:
+    - kinds: list of PLOT_SPECS keys, defaults to all of them.
+    - max_workers: int, optional. Pool size, 1 renders everything in this process.
+    - should_stop: callable() -> bool, optional. Checked between model-years, see scheduler.run_jobs.
+
+    Returns:
+    - The number of charts rendered.
+    """
+    # The scheduler imports the model modules, which import this one
+    from forecasting_model import scheduler
+    jobs = {}
+    for kind in kinds or PLOT_SPECS:
+        for year in available_years(kind):
+            months = stale_charts(kind, year)
+            if months:
+                jobs[(kind, year)] = (render_year, kind, year, months)
+    rendered = scheduler.run_jobs(jobs, max_workers, should_stop=should_stop)
+    for (kind, year), keys in rendered.items():
+        _save_keys(kind, year, keys)
+    return sum(len(keys) for keys in rendered.values())
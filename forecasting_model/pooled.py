@@ -0,0 +1,49 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import combine_store
+from forecasting_model import dataset
+
+# Pooled cross-year water models.
+# Instead of one model per qualifying year whose predictions are averaged, a single model is trained
+# on the rows of every qualifying year with the year and a yearly seasonality as extra features.
+# A forecast is then one predict call whatever the number of years.
+
+POOLED_FEATURES = ['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)', 'Year', 'Season sin', 'Season cos']
+TARGET = 'Water Use (m³)'
+
+
+def add_features(data):
+    # Yearly seasonality as a point on the unit circle, so 31 December sits next to 1 January
+    angle = 2 * np.pi * data['Day of Year'].to_numpy(dtype=float) / 365.25
+    data['Season sin'] = np.sin(angle)
+    data['Season cos'] = np.cos(angle)
+    return data
+
+
+def pooled_years(years):
+    return sorted(str(year) for year in years if str(year) != combine_store.ALL_KEY)
+
+
+def load_years(file_paths, years):
+    # Rows of the qualifying years (never the "All" view, which would count them twice)
+    frames = [dataset.load_water(file_paths[year]) for year in pooled_years(years)]
+    if not frames:
+        return pd.DataFrame(columns=POOLED_FEATURES + [TARGET])
+    return add_features(pd.concat(frames, ignore_index=True))
+
+
+def pooled_hash(file_paths, years):
+    # Identifies the training data of a pooled model: the qualifying years and their content
+    sha = hashlib.sha1()
+    for year in pooled_years(years):
+        sha.update(f'{year}:{dataset.dataset_hash(file_paths[year])};'.encode())
+    return sha.hexdigest()
+
+
+def prediction_frame(day_of_year, year, temperature, precipitation):
+    # One input row per forecast (scalars are broadcast), with the pooled features
+    columns = np.broadcast_arrays(*[np.atleast_1d(np.asarray(values, dtype=float))
+                                    for values in (day_of_year, temperature, precipitation, year)])
+    data = pd.DataFrame(dict(zip(['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)', 'Year'], columns)))
+    return add_features(data)[POOLED_FEATURES]
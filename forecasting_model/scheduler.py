@@ -0,0 +1,208 @@
+import os
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from threadpoolctl import threadpool_limits
+from forecasting_model import backends
+from forecasting_model import pipeline
+from forecasting_model import water_linear_regression
+from forecasting_model import Water_Random_Forest
+from forecasting_model import electricity_linear_regression
+from forecasting_model import electricity_random_forest
+
+# Parallel training scheduler.
+# Every (utility model, year) fit is independent, so they are fanned out over a process pool
+# instead of running one model family after another and one year after another.
+# Each worker's BLAS/OpenMP pools and forests are capped to its share of the cores, so N workers
+# never start N x cores threads between them. The pool is kept between runs: its workers hold on to
+# the dataset and model caches they filled, so the next "Process Data" click does not reload them.
+# Workers are spawned, not forked: the GUI starts runs from a QThread, and a forked child of a
+# multi-threaded process can inherit locks held by other threads.
+
+# utility -> model -> (fit one year, summarize per-year metrics into the existing return shape)
+MODEL_FAMILIES = {
+    'Electricity': {
+        'random_forest': (electricity_random_forest.preprocess_and_fit_joint, pipeline.summarize_joint_results),
+        'linear': (electricity_linear_regression.fit_year, pipeline.summarize_joint_results)
+    },
+    'Hydro': {
+        'random_forest': (Water_Random_Forest.fit_year, Water_Random_Forest.summarize_results),
+        'linear': (water_linear_regression.fit_year, water_linear_regression.summarize_results)
+    }
+}
+
+# Forests are the slowest fits; each year's forest is started before its other models
+SLOW_MODELS = ('random_forest',)
+
+# How often a running pool checks whether it was asked to stop, in seconds
+STOP_POLL_INTERVAL = 0.2
+
+_thread_limits = None
+
+_pool = None
+_pool_size = None
+_pool_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    # Raised by process_all when should_stop asked it to stop before every fit finished
+    pass
+
+
+def _init_worker(threads):
+    global _thread_limits
+    # Kept for the life of the worker so every fit it runs stays within its thread budget
+    _thread_limits = threadpool_limits(limits=threads)
+    backends.N_JOBS = threads
+
+
+def _get_pool(max_workers, threads):
+    # The pool of the last run, replaced when a run needs another number of workers
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None and _pool_size != max_workers:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(threads,))
+            _pool_size = max_workers
+        return _pool
+
+
+def shutdown_pool():
+    # Stop the kept workers; they are also stopped when the interpreter exits
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _run_job(fit, *args):
+    return fit(*args)
+
+
+def run_jobs(jobs, max_workers=None, on_result=None, should_stop=None):
+    """
+    Runs independent training jobs, concurrently in a process pool when more than one worker is allowed.
+
+    Parameters:
+    - jobs: dict of key -> (fit, *args), e.g. (fit, path, year). fit must be a module-level function
+      (or a partial of one) so it can be sent to workers.
+    - max_workers: int, optional. Pool size, defaults to the number of cores (capped at the number of jobs).
+    - on_result: callable(key, result), optional. Called in this process as each job finishes.
+    - should_stop: callable() -> bool, optional. Checked between jobs; once it returns True no new job
+      is started (jobs already running in the pool are waited for). The same happens when a job
+      raises, and the error is then raised here.
+      The pool is kept for the next run; see shutdown_pool.
+
+    Returns:
+    - A dictionary of key -> fit(*args) for every job that ran, in the order of jobs.
+    """
+    if not jobs:
+        return {}
+    cores = os.cpu_count() or 1
+    max_workers = min(max_workers or cores, len(jobs))
+    results = {}
+
+    def finish(key, result):
+        results[key] = result
+        if on_result is not None:
+            on_result(key, result)
+
+    def stopped():
+        return should_stop is not None and should_stop()
+
+    if max_workers == 1:
+        for key, job in jobs.items():
+            if stopped():
+                break
+            finish(key, job[0](*job[1:]))
+        return results
+
+    threads = max(1, cores // max_workers)
+    executor = _get_pool(max_workers, threads)
+    futures = {executor.submit(_run_job, *job): key for key, job in jobs.items()}
+    pending = set(futures)
+    try:
+        while pending and not stopped():
+            done, pending = wait(pending, timeout=STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(futures[future], future.result())
+    except BrokenProcessPool:
+        # A worker died; the next run starts a new pool
+        shutdown_pool()
+        raise
+    finally:
+        # Jobs that have not started yet are dropped when stopping early or when a job failed,
+        # running ones are waited for
+        for future in pending:
+            future.cancel()
+        wait(pending)
+    return {key: results[key] for key in jobs if key in results}
+
+
+def process_all(utility, file_paths, models=None, max_workers=None, backend=None,
+                on_year=None, on_progress=None, should_stop=None):
+    """
+    Trains every model family of a utility on every year in one pool.
+
+    Parameters:
+    - utility: 'Electricity' or 'Hydro'.
+    - file_paths: dict of year -> combined file path.
+    - models: list of model names from MODEL_FAMILIES, defaults to all of them.
+    - max_workers: int, optional. Pool size, 1 runs everything in this process.
+    - backend: str, optional. Tree backend of the 'random_forest' models, see backends.py.
+    - on_year: callable(year, {model: metrics}), optional. Called as soon as every model of a year is
+      trained (its predictions are stored by then), so results can be shown year by year.
+    - on_progress: callable(done, total), optional. Called after every finished fit.
+    - should_stop: callable() -> bool, optional. Asked between fits; see run_jobs.
+
+    Returns:
+    - A dictionary of model -> what its process_files_and_get_* function returns: the
+      (results, good_years) pair for water, and target -> (results, best_year) for the joint
+      electricity models.
+
+    Raises:
+    - Cancelled when should_stop stopped the run before every fit finished.
+    """
+    families = MODEL_FAMILIES[utility]
+    models = list(models or families)
+    order = sorted(models, key=lambda model: model not in SLOW_MODELS)
+
+    fits = {}
+    for model in order:
+        fits[model] = families[model][0]
+        if backend is not None and model in SLOW_MODELS:
+            fits[model] = partial(fits[model], backend=backend)
+
+    # Year by year, so years are completed (and reported to on_year) in order
+    jobs = {}
+    for year, path in file_paths.items():
+        for model in order:
+            jobs[(model, year)] = (fits[model], path, year)
+
+    remaining = {year: set(models) for year in file_paths}
+    finished = {}
+
+    def on_result(key, result):
+        model, year = key
+        finished[key] = result
+        remaining[year].discard(model)
+        if on_progress is not None:
+            on_progress(len(finished), len(jobs))
+        if on_year is not None and not remaining[year]:
+            on_year(year, {model: finished[(model, year)] for model in models})
+
+    metrics = run_jobs(jobs, max_workers, on_result, should_stop)
+    if len(metrics) < len(jobs):
+        raise Cancelled()
+
+    summaries = {}
+    for model in models:
+        per_year = {year: metrics[(model, year)] for year in file_paths}
+        summaries[model] = families[model][1](per_year)
+    return summaries
@@ -5,18 +5,21 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score
 from datetime import datetime
 import numpy as np
-import matplotlib.pyplot as plt
+import sufficient_stats
+from forecasting_model import dataset
+from forecasting_model import model_cache
+from forecasting_model import pooled
+
+# Features of the forecasting model, the columns of the ingest-time regression statistics
+PREDICTION_FEATURES = sufficient_stats.WATER_FEATURES
+POOLED_PARAMS = {'features': pooled.POOLED_FEATURES, 'dropna': True}
 
 
 
 # Function to preprocess and fit Linear Regression, returning MSE and R2
 def preprocess_and_fit(file_path,year):
-    data = pd.read_csv(file_path)
-    data['Date'] = pd.to_datetime(data['Date'])
-    data['Day of Year'] = data['Date'].dt.dayofyear
-    data['Month'] = data['Date'].dt.month
-    data['Outside Temperature (°C)'] = data['Outside Temperature (°C)'].str.extract(r'(\d+\.\d+|\d+)').astype(float)
-    data['Precipitation (mm)'] = data['Precipitation (mm)'].str.extract(r'(\d+\.\d+|\d+)').astype(float)
+    # Cleaned frame with numeric weather, 'Day of Year' and 'Month', shared with the other models
+    data = dataset.load_water(file_path)
     #data.dropna(inplace=True)
 
     X = data[['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']].fillna(0)
@@ -78,45 +81,97 @@ def preprocess_and_fit(file_path,year):
     
     return mse, r2
 
+# Fit and score one year, the unit of work the training scheduler runs in parallel
+def fit_year(path, year):
+    mse, r2 = preprocess_and_fit(path, year)
+    return {'MSE': mse, 'R2': r2}
+
+# Turn per-year metrics into the (results, good_years) pair
+def summarize_results(results):
+    # Filter years with R2 value greater than the threshold
+    good_years = {year: result for year, result in results.items() if result['R2'] >= 0.2}
+
+    return results, good_years
+
 def process_files_and_get_years_with_good_r2(file_paths):
     # Dictionary to store results
     results = {}
 
     # Process each file and store results
     for year, path in file_paths.items():
-        mse, r2 = preprocess_and_fit(path, year)
-        results[year] = {'MSE': mse, 'R2': r2}
+        results[year] = fit_year(path, year)
 
-    # Filter years with R2 value greater than 0.2
-    good_years = {year: result for year, result in results.items() if result['R2'] >= 0.2}
+    return summarize_results(results)
+
+
+# Build a fitted LinearRegression (or ridge) from summed X'X / X'y statistics
+def model_from_stats(stats, ridge=0.0):
+    intercept, coef = sufficient_stats.solve(stats, ridge)
+    model = LinearRegression()
+    model.coef_ = coef
+    model.intercept_ = intercept
+    model.n_features_in_ = len(coef)
+    model.feature_names_in_ = np.array(PREDICTION_FEATURES, dtype=object)
+    return model
+
+
+# Forecasting model for one year (or the "All" view): the same OLS fit as on the raw rows,
+# solved from the statistics kept up to date at ingest instead of scanning the year
+def get_prediction_model(file_path):
+    return model_from_stats(sufficient_stats.file_stats(file_path))
 
-    return results, good_years
+
+def fit_window(file_paths, years=None, months=None, start=None, end=None, ridge=0.0):
+    """
+    Fits the forecasting model on any window of the combined years without reading raw rows.
+
+    Parameters:
+    - file_paths: dict of year -> combined year path.
+    - years: list of years, months: list of months (1-12), start/end: 'YYYY-MM' bounds (inclusive).
+      For example start='2022-07' for the last 18 months of 2023, or months=[6, 7, 8] for all summers.
+    - ridge: float. Ridge penalty, 0 for ordinary least squares.
+
+    Returns:
+    - A fitted LinearRegression, or None when the window holds no data.
+    """
+    stats = sufficient_stats.window_stats(file_paths, years, months, start, end)
+    if stats is None or stats['n'] == 0:
+        return None
+    return model_from_stats(stats, ridge)
+
+
+# One linear model over every good year, with the year and seasonality as features, trained once per set of years
+def get_pooled_model(file_paths, good_years):
+    def fit():
+        data = pooled.load_years(file_paths, good_years)
+        data = data.dropna(subset=pooled.POOLED_FEATURES + [pooled.TARGET])
+
+        model = LinearRegression()
+        model.fit(data[pooled.POOLED_FEATURES], data[pooled.TARGET])
+        return model
+
+    return model_cache.get_or_fit(model_cache.default_folder('Water'), 'water_linear_regression_pooled',
+                                  pooled.pooled_hash(file_paths, good_years), POOLED_PARAMS, fit)
 
 
 # Function to predict water use based on temperature and precipitation
-def predict_water_use(prediction_temperature, prediction_precipitation, file_paths, good_years):
+# (pooled_model=True uses one cross-year model instead of averaging one model per good year)
+def predict_water_use(prediction_temperature, prediction_precipitation, file_paths, good_years, pooled_model=False):
     predictions = []
     
     current_date = datetime.now()
     day_of_year = current_date.timetuple().tm_yday
+
+    if pooled_model:
+        if not good_years:
+            return None
+        prediction_data = pooled.prediction_frame(day_of_year, current_date.year, prediction_temperature, prediction_precipitation)
+        return get_pooled_model(file_paths, good_years).predict(prediction_data)[0]
     
     # Iterate through each good year and predict water use
     for year in good_years:
-        # Load the dataset for the current good year
-        file_path = file_paths[year]
-        data = pd.read_csv(file_path)
-        data['Date'] = pd.to_datetime(data['Date'])
-        data['Day of Year'] = data['Date'].dt.dayofyear
-        data['Outside Temperature (°C)'] = data['Outside Temperature (°C)'].str.extract(r'(\d+\.\d+|\d+)').astype(float)
-        data['Precipitation (mm)'] = data['Precipitation (mm)'].str.extract(r'(\d+\.\d+|\d+)').astype(float)
-        data.dropna(inplace=True)
-    
-        X = data[['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']]
-        y = data['Water Use (m³)']
-        
-        # Train a model for the current good year
-        model = LinearRegression()
-        model.fit(X, y)
+        # Model for the current good year, solved from the year's statistics
+        model = get_prediction_model(file_paths[year])
         
         # Create a DataFrame for prediction input with correct column names
         prediction_data = pd.DataFrame({
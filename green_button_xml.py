@@ -0,0 +1,176 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+
+# Streaming reader for Green Button (ESPI) XML feeds.
+# The feed is walked with iterparse and every IntervalReading is detached from its IntervalBlock as
+# soon as it has been copied into a fixed-size columnar batch, so memory stays flat no matter how big
+# the file (or a single IntervalBlock in it) is.
+
+ESPI_NS = '{http://naesb.org/espi}'
+
+# Number of interval readings collected before a batch is emitted
+BATCH_SIZE = 65536
+
+# ESPI UnitSymbolKind codes -> factor converting the raw value to the unit used in the Combine store
+UOM_FACTORS = {
+    72: 1.0 / 1000.0,    # Wh -> kWh
+    42: 1.0,             # m³
+    128: 0.003785411784  # US gallons -> m³
+}
+
+# ESPI cost is expressed in hundred-thousandths of the currency unit
+COST_FACTOR = 1.0 / 100000.0
+
+# Map ESPI tou codes to the TOU columns of the utility CSV exports.
+# Readings without a tou code land in off-peak, which is how the CSV exports report non-TOU days.
+TOU_BUCKETS = {0: 'off-peak', 1: 'off-peak', 2: 'mid-peak', 3: 'on-peak'}
+TOU_ORDER = ['off-peak', 'mid-peak', 'on-peak']
+# Lookup table from every possible tou code to its column index in TOU_ORDER
+TOU_INDEX = np.array([TOU_ORDER.index(TOU_BUCKETS.get(code, 'off-peak')) for code in range(256)])
+
+
+def _new_batch(size):
+    return {
+        'start': np.empty(size, dtype=np.int64),    # epoch seconds, local time
+        'duration': np.empty(size, dtype=np.int32),  # seconds
+        'value': np.empty(size, dtype=np.float64),   # kWh or m³
+        'cost': np.empty(size, dtype=np.float64),    # currency units, NaN when absent
+        'tou': np.empty(size, dtype=np.int8)         # ESPI tou code, 0 when absent
+    }
+
+
+def _child_text(elem, tag):
+    child = elem.find(ESPI_NS + tag)
+    return None if child is None else child.text
+
+
+def iter_interval_batches(file_path, batch_size=BATCH_SIZE):
+    """
+    Incrementally parses an ESPI XML feed and yields columnar batches of interval readings.
+
+    Parameters:
+    - file_path: str. Path to the Green Button XML file.
+    - batch_size: int. Maximum number of readings per batch.
+
+    Returns:
+    - A generator of dictionaries mapping 'start', 'duration', 'value', 'cost' and 'tou'
+      to typed numpy arrays of equal length.
+    """
+    batch = _new_batch(batch_size)
+    count = 0
+    value_factor = 1.0
+    tz_offset = 0
+    root = None
+    # Open elements from the root down; the last one is the parent of the element that just ended
+    open_elements = []
+
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            open_elements.append(elem)
+            continue
+
+        open_elements.pop()
+        tag = elem.tag
+        if tag == ESPI_NS + 'IntervalReading':
+            start = _child_text(elem.find(ESPI_NS + 'timePeriod'), 'start')
+            if start is not None:
+                duration = _child_text(elem.find(ESPI_NS + 'timePeriod'), 'duration')
+                value = _child_text(elem, 'value')
+                cost = _child_text(elem, 'cost')
+                tou = _child_text(elem, 'tou')
+                batch['start'][count] = int(start) + tz_offset
+                batch['duration'][count] = int(duration) if duration is not None else 0
+                batch['value'][count] = float(value) * value_factor if value is not None else np.nan
+                batch['cost'][count] = float(cost) * COST_FACTOR if cost is not None else np.nan
+                batch['tou'][count] = int(tou) if tou is not None else 0
+                count += 1
+                if count == batch_size:
+                    yield batch
+                    batch = _new_batch(batch_size)
+                    count = 0
+            # Clearing is not enough: the emptied element would stay in its IntervalBlock,
+            # which for most feeds holds every reading of the file
+            if open_elements:
+                open_elements[-1].remove(elem)
+            elem.clear()
+        elif tag == ESPI_NS + 'ReadingType':
+            # Scale raw values by the power-of-ten multiplier and convert to the store's unit
+            multiplier = _child_text(elem, 'powerOfTenMultiplier')
+            uom = _child_text(elem, 'uom')
+            value_factor = 10.0 ** int(multiplier or 0)
+            value_factor *= UOM_FACTORS.get(int(uom), 1.0) if uom is not None else 1.0
+            elem.clear()
+        elif tag == ESPI_NS + 'LocalTimeParameters':
+            # Interval starts are UTC; shift them so that days split on the customer's local midnight
+            tz_offset = int(_child_text(elem, 'tzOffset') or 0)
+            elem.clear()
+        elif tag == '{http://www.w3.org/2005/Atom}entry' and root is not None:
+            # Drop finished entries from the tree so it never grows with the file
+            root.clear()
+
+    if count:
+        yield {name: column[:count] for name, column in batch.items()}
+
+
+def _accumulate_daily(file_path, batch_size):
+    # Reduce interval batches to per-day, per-TOU totals while streaming.
+    # Only one running row per day is kept, so memory is bounded by the number of days.
+    usage = {}
+    cost = {}
+    for batch in iter_interval_batches(file_path, batch_size):
+        days = batch['start'] // 86400
+        tou_index = TOU_INDEX[batch['tou'].astype(np.uint8)]
+        keys = days * len(TOU_ORDER) + tou_index
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        usage_sums = np.bincount(inverse, weights=np.nan_to_num(batch['value']))
+        cost_sums = np.bincount(inverse, weights=np.nan_to_num(batch['cost']))
+        has_cost = np.bincount(inverse, weights=~np.isnan(batch['cost'])) > 0
+        for key, u, c, hc in zip(unique_keys.tolist(), usage_sums, cost_sums, has_cost):
+            day, bucket = divmod(key, len(TOU_ORDER))
+            row = usage.setdefault(day, np.zeros(len(TOU_ORDER)))
+            row[bucket] += u
+            if hc:
+                cost_row = cost.setdefault(day, np.zeros(len(TOU_ORDER)))
+                cost_row[bucket] += c
+    return usage, cost
+
+
+def load_and_process_xml(file_path, batch_size=BATCH_SIZE):
+    """
+    Streams an electricity ESPI XML feed into a daily DataFrame with the same columns
+    as the utility CSV exports, ready to be merged into the year-partitioned Combine store.
+    """
+    usage, cost = _accumulate_daily(file_path, batch_size)
+    days = np.array(sorted(usage), dtype=np.int64)
+    df = pd.DataFrame({'Date': pd.to_datetime(days, unit='D')})
+    usage_matrix = np.array([usage[day] for day in days]).reshape(len(days), len(TOU_ORDER))
+    cost_matrix = np.array([cost.get(day, np.full(len(TOU_ORDER), np.nan)) for day in days]).reshape(len(days), len(TOU_ORDER))
+    for i, bucket in enumerate(TOU_ORDER):
+        df[f'Usage TOU {bucket} (kWh)'] = usage_matrix[:, i].round(3)
+    for i, bucket in enumerate(TOU_ORDER):
+        df[f'Cost TOU {bucket} ($)'] = cost_matrix[:, i].round(2)
+    # ESPI feeds carry no weather, the models fill missing temperatures themselves
+    df['Average temperature (C)'] = np.nan
+    return df
+
+
+def load_water_xml(file_path, batch_size=BATCH_SIZE):
+    """
+    Streams a water ESPI XML feed into a daily DataFrame with the columns of the
+    combined water store ('Water Use (m³)', weather columns, 'Date' and 'Year').
+    """
+    usage, _ = _accumulate_daily(file_path, batch_size)
+    days = np.array(sorted(usage), dtype=np.int64)
+    dates = pd.to_datetime(days, unit='D')
+    df = pd.DataFrame({
+        'Water Use (m³)': np.array([usage[day].sum() for day in days], dtype=np.float64).round(3),
+        # Weather is not part of the feed
+        'Outside Temperature (°C)': np.nan,
+        'Precipitation (mm)': np.nan,
+        'Date': dates,
+        'Year': dates.year.astype(str)
+    })
+    return df
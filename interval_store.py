@@ -0,0 +1,308 @@
+import os
+import shutil
+import hashlib
+from functools import partial
+import numpy as np
+import pandas as pd
+import green_button_xml
+import combine_store
+
+# Interval-resolution store for Green Button XML feeds (15-minute or hourly readings).
+# Raw intervals are kept per year in a compact, sorted, memory-mappable .npy file under
+# <store>/Intervals: start as int32 minutes since the epoch (local time), length in minutes,
+# value and cost as float32 and the ESPI tou code. At ingest only the days and months touched by
+# new intervals are rolled up again: the daily TOU rows go to the usual daily Combine store (which
+# the models and plots keep reading) and the monthly TOU totals to Intervals/monthly.csv.
+# Only interval-level analyses read the raw intervals.
+# Feeds are parsed in worker processes that append each batch to per-year spool files, so no
+# process holds a whole feed; a year file is only rewritten from the first record that changed.
+
+INTERVALS_FOLDER = 'Intervals'
+INTERVALS_PREFIX = 'Intervals'
+MONTHLY_NAME = 'monthly.csv'
+SPOOL_FOLDER = 'spool'
+
+INTERVAL_DTYPE = np.dtype([
+    ('start', np.int32),    # minutes since 1970-01-01, local time
+    ('minutes', np.int16),  # interval length
+    ('value', np.float32),  # kWh
+    ('cost', np.float32),   # currency units, NaN when absent
+    ('tou', np.int8)        # ESPI tou code
+])
+
+MINUTES_PER_DAY = 1440
+
+USAGE_COLUMNS = [f'Usage TOU {bucket} (kWh)' for bucket in green_button_xml.TOU_ORDER]
+COST_COLUMNS = [f'Cost TOU {bucket} ($)' for bucket in green_button_xml.TOU_ORDER]
+
+
+def intervals_folder(store_folder):
+    return os.path.join(store_folder, INTERVALS_FOLDER)
+
+
+def interval_path(store_folder, year):
+    return os.path.join(intervals_folder(store_folder), f'{INTERVALS_PREFIX}_{year}.npy')
+
+
+def to_records(batch):
+    # Columnar batch from green_button_xml.iter_interval_batches -> compact structured array
+    records = np.empty(len(batch['start']), dtype=INTERVAL_DTYPE)
+    records['start'] = batch['start'] // 60
+    records['minutes'] = batch['duration'] // 60
+    records['value'] = batch['value']
+    records['cost'] = batch['cost']
+    records['tou'] = batch['tou']
+    return records
+
+
+def record_years(starts):
+    return (starts.astype(np.int64).astype('datetime64[m]').astype('datetime64[Y]').astype(int) + 1970).astype(str)
+
+
+def spool_xml(file_path, spool_folder):
+    """
+    Streams an electricity ESPI XML feed into raw per-year spool files of INTERVAL_DTYPE records.
+    Module-level so combine_store.map_files can run it in a process pool; only the spool file
+    names travel back to the parent process.
+
+    Returns:
+    - A dictionary of year -> spool file path.
+    """
+    os.makedirs(spool_folder, exist_ok=True)
+    name = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    paths = {}
+    for batch in green_button_xml.iter_interval_batches(file_path):
+        records = to_records(batch)
+        years = record_years(records['start'])
+        for year in np.unique(years):
+            path = os.path.join(spool_folder, f'{name}_{year}.bin')
+            with open(path, 'ab') as f:
+                records[years == year].tofile(f)
+            paths[str(year)] = path
+    return paths
+
+
+def read_intervals(store_folder, year, start=None, end=None):
+    """
+    Returns the stored intervals of a year, memory-mapped, optionally limited to
+    start <= interval start < end (epoch minutes) with a binary search.
+    """
+    path = interval_path(store_folder, year)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=INTERVAL_DTYPE)
+    records = np.load(path, mmap_mode='r')
+    lo = 0 if start is None else np.searchsorted(records['start'], start, side='left')
+    hi = len(records) if end is None else np.searchsorted(records['start'], end, side='left')
+    return records[lo:hi]
+
+
+def load_intervals(store_folder, start, end):
+    """
+    Interval-level view between two dates (end excluded) as a DataFrame with a 'Start' timestamp.
+    """
+    start_minute = int(pd.Timestamp(start).value // 60_000_000_000)
+    end_minute = int(pd.Timestamp(end).value // 60_000_000_000)
+    years = range(pd.Timestamp(start).year, pd.Timestamp(end).year + 1)
+    parts = [read_intervals(store_folder, str(year), start_minute, end_minute) for year in years]
+    records = np.concatenate(parts) if parts else np.empty(0, dtype=INTERVAL_DTYPE)
+    df = pd.DataFrame(records)
+    df.insert(0, 'Start', pd.to_datetime(records['start'].astype(np.int64), unit='m'))
+    return df
+
+
+def _write_records(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, records)
+    os.replace(tmp_path, path)
+
+
+def _splice_records(path, position, records):
+    """
+    Replaces the records of a year file from position to its end, in place.
+    The records before position are not rewritten; the .npy header leaves room for the record count
+    to grow, so only the count in it changes. Returns False when the file cannot be spliced.
+    """
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version != (1, 0):
+            return False
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        header_size = f.tell()
+        if dtype != INTERVAL_DTYPE or fortran_order or len(shape) != 1:
+            return False
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                  'shape': (position + len(records),)}
+        # The header must keep its size, or the records would have to move
+        with open(os.devnull, 'wb') as sink:
+            np.lib.format.write_array_header_1_0(sink, header)
+            if sink.tell() != header_size:
+                return False
+        # Records first, then the count: a crash in between leaves the old count over valid records
+        f.seek(header_size + position * dtype.itemsize)
+        f.write(np.ascontiguousarray(records).tobytes())
+        f.truncate()
+        f.seek(0)
+        np.lib.format.write_array_header_1_0(f, header)
+    return True
+
+
+def _dedupe_last(records):
+    # Sort by start; of several readings for the same start, the last one ingested wins
+    order = np.argsort(records['start'], kind='stable')
+    records = records[order]
+    keep = np.r_[records['start'][1:] != records['start'][:-1], True]
+    return records[keep]
+
+
+def merge_intervals(store_folder, records):
+    """
+    Merges new interval records into the year files.
+
+    Returns:
+    - A dictionary of year -> (first, last) epoch minute of the new records in that year,
+      the ranges whose rollups must be recomputed.
+    """
+    changed = {}
+    if len(records) == 0:
+        return changed
+    records = _dedupe_last(records)
+    years = record_years(records['start'])
+    for year in np.unique(years):
+        new = records[years == year]
+        path = interval_path(store_folder, year)
+        if not os.path.exists(path):
+            _write_records(path, new)
+        else:
+            # Only the stored records from the first new reading on are merged and rewritten;
+            # readings after the end of the year file are simply appended
+            existing = np.load(path, mmap_mode='r')
+            position = int(np.searchsorted(existing['start'], new['start'][0], side='left'))
+            tail = _dedupe_last(np.concatenate([existing[position:], new]))
+            del existing
+            if not _splice_records(path, position, tail):
+                _write_records(path, _dedupe_last(np.concatenate([np.load(path), new])))
+        changed[str(year)] = (int(new['start'][0]), int(new['start'][-1]))
+    return changed
+
+
+def daily_rollup(records):
+    """
+    Sums intervals into daily rows with the columns of the daily Combine store
+    (per-TOU usage and cost, and an empty 'Average temperature (C)').
+    """
+    buckets = len(green_button_xml.TOU_ORDER)
+    days = records['start'].astype(np.int64) // MINUTES_PER_DAY
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    keys = day_index * buckets + green_button_xml.TOU_INDEX[records['tou'].astype(np.uint8)]
+    size = len(unique_days) * buckets
+    value = records['value'].astype(np.float64)
+    cost = records['cost'].astype(np.float64)
+    usage = np.bincount(keys, weights=np.nan_to_num(value), minlength=size).reshape(-1, buckets)
+    costs = np.bincount(keys, weights=np.nan_to_num(cost), minlength=size).reshape(-1, buckets)
+    # Days without any cost reading keep NaN costs, like the streaming XML loader
+    has_cost = np.bincount(day_index, weights=~np.isnan(cost), minlength=len(unique_days)) > 0
+    costs[~has_cost] = np.nan
+
+    df = pd.DataFrame({'Date': pd.to_datetime(unique_days, unit='D')})
+    for i, column in enumerate(USAGE_COLUMNS):
+        df[column] = usage[:, i].round(3)
+    for i, column in enumerate(COST_COLUMNS):
+        df[column] = costs[:, i].round(2)
+    df['Average temperature (C)'] = np.nan
+    return df
+
+
+def monthly_rollup(records):
+    # Per-month TOU totals plus what only intervals can tell: reading count and peak interval
+    months = records['start'].astype(np.int64).astype('datetime64[m]').astype('datetime64[M]')
+    daily = daily_rollup(records)
+    daily['Month'] = daily['Date'].dt.strftime('%Y-%m')
+    monthly = daily.groupby('Month', sort=True)[USAGE_COLUMNS + COST_COLUMNS].sum(min_count=1).reset_index()
+    labels = pd.Series(months.astype(str)).to_numpy()
+    stats = pd.DataFrame({'Month': labels, 'value': records['value'].astype(np.float64)})
+    stats = stats.groupby('Month', sort=True)['value'].agg(['size', 'max']).reset_index()
+    stats.columns = ['Month', 'Intervals', 'Peak interval (kWh)']
+    return monthly.merge(stats, on='Month', how='left')
+
+
+def _day_bounds(first, last):
+    # Whole days covering [first, last] epoch minutes
+    start = first // MINUTES_PER_DAY * MINUTES_PER_DAY
+    end = (last // MINUTES_PER_DAY + 1) * MINUTES_PER_DAY
+    return start, end
+
+
+def _month_bounds(first, last):
+    start = np.datetime64(int(first), 'm').astype('datetime64[M]')
+    end = np.datetime64(int(last), 'm').astype('datetime64[M]') + 1
+    return int(start.astype('datetime64[m]').astype(np.int64)), int(end.astype('datetime64[m]').astype(np.int64))
+
+
+def update_monthly(store_folder, changed):
+    # Recompute only the touched months and replace their rows in monthly.csv
+    path = os.path.join(intervals_folder(store_folder), MONTHLY_NAME)
+    parts = []
+    for year, (first, last) in changed.items():
+        start, end = _month_bounds(first, last)
+        parts.append(monthly_rollup(read_intervals(store_folder, year, start, end)))
+    if not parts:
+        return
+    fresh = pd.concat(parts, ignore_index=True)
+    if os.path.exists(path):
+        existing = pd.read_csv(path, dtype={'Month': str})
+        existing = existing[~existing['Month'].isin(fresh['Month'])]
+        fresh = pd.concat([existing, fresh], ignore_index=True)
+    fresh = fresh.sort_values(by='Month', kind='stable')
+    fresh.to_csv(path, index=False)
+
+
+def ingest(store_folder, records):
+    """
+    Stores new intervals and refreshes the rollups they touch.
+
+    Returns:
+    - The daily rows of every touched day, recomputed from all stored intervals of those days,
+      ready for combine_store.merge_into_store.
+    """
+    return _refresh_rollups(store_folder, merge_intervals(store_folder, records))
+
+
+def ingest_xml_files(store_folder, file_paths, max_workers=None):
+    """
+    Streams ESPI XML feeds into the store (in a process pool when there are many) and refreshes
+    the rollups they touch. Later files win duplicate readings.
+
+    Returns:
+    - The daily rows of every touched day, as ingest does.
+    """
+    spool_folder = os.path.join(intervals_folder(store_folder), SPOOL_FOLDER)
+    shutil.rmtree(spool_folder, ignore_errors=True)
+    try:
+        spooled = combine_store.map_files(partial(spool_xml, spool_folder=spool_folder), file_paths, max_workers)
+        # One year at a time, so memory is bounded by a year of new readings
+        changed = {}
+        for year in sorted({year for paths in spooled for year in paths}):
+            parts = [np.fromfile(paths[year], dtype=INTERVAL_DTYPE) for paths in spooled if year in paths]
+            changed.update(merge_intervals(store_folder, np.concatenate(parts)))
+    finally:
+        shutil.rmtree(spool_folder, ignore_errors=True)
+    return _refresh_rollups(store_folder, changed)
+
+
+def _refresh_rollups(store_folder, changed):
+    days = []
+    for year, (first, last) in changed.items():
+        start, end = _day_bounds(first, last)
+        days.append(daily_rollup(read_intervals(store_folder, year, start, end)))
+    update_monthly(store_folder, changed)
+    if not days:
+        return pd.DataFrame(columns=['Date'])
+    return pd.concat(days, ignore_index=True)
+
+
+def load_monthly(store_folder):
+    path = os.path.join(intervals_folder(store_folder), MONTHLY_NAME)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Month'] + USAGE_COLUMNS + COST_COLUMNS)
+    return pd.read_csv(path, dtype={'Month': str})
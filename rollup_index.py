@@ -0,0 +1,173 @@
+import os
+import numpy as np
+import pandas as pd
+import columnar_cache
+import combine_store
+
+# Rollup index written next to every combined year CSV.
+# It holds the partition's dates (epoch days, sorted), the row offset where each month starts, and
+# cumulative prefix sums (plus non-missing counts) of every numeric column. A total over any date
+# range is two binary searches and one subtraction, a month's rows are one slice, and the monthly
+# and annual totals are differences of prefix sums, all without scanning the rows.
+# Like the binary cache it is refreshed by every partition write and rebuilt when stale.
+# The virtual "All" view has no index of its own: range totals over it are summed from its year
+# partitions, and the per-month lookups, which assume one calendar year, reject it.
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+_loaded = {}
+
+
+def index_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.index.npz'
+
+
+def build_index(df):
+    """
+    Builds the rollup index of a date-sorted partition frame.
+
+    Returns:
+    - A dictionary with 'days' (epoch days), 'month_offsets' (13 row offsets, month m spanning
+      [offsets[m - 1], offsets[m])), 'columns', 'prefix' and 'counts' ((rows + 1, columns) cumulative
+      sums and non-missing counts).
+    """
+    dates = pd.to_datetime(df['Date']).values.astype('datetime64[D]')
+    days = (dates - EPOCH).astype(np.int32)
+    months = dates.astype('datetime64[M]').astype(int) % 12 + 1
+    columns = [name for name in df.columns if name != 'Date']
+    values = np.column_stack([columnar_cache.to_number(df[name]).to_numpy(dtype=float) for name in columns]) \
+        if columns else np.empty((len(df), 0))
+
+    missing = np.isnan(values)
+    prefix = np.zeros((len(df) + 1, len(columns)))
+    counts = np.zeros((len(df) + 1, len(columns)), dtype=np.int64)
+    np.cumsum(np.where(missing, 0.0, values), axis=0, out=prefix[1:])
+    np.cumsum(~missing, axis=0, out=counts[1:])
+    return {
+        'days': days,
+        'month_offsets': np.searchsorted(months, np.arange(1, 14), side='left').astype(np.int64),
+        'columns': np.array(columns),
+        'prefix': prefix,
+        'counts': counts
+    }
+
+
+def write_index(csv_path, df):
+    # Used with the other caches as a combine_store on_write hook
+    path = index_path(csv_path)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **build_index(df))
+    os.replace(tmp_path, path)
+
+
+def load_index(csv_path):
+    """
+    Returns the rollup index of a combined year CSV, rebuilding it from the partition
+    when it is missing or older than the CSV.
+    Raises ValueError for the virtual "All" path, which spans several years.
+    """
+    if combine_store.is_all_view(csv_path):
+        raise ValueError(f"{os.path.basename(csv_path)} is the virtual '{combine_store.ALL_KEY}' view, "
+                         "which has no rollup index; use its year partitions")
+    path = index_path(csv_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        # Indexes are small; keep each one in memory until its file changes
+        stamp = os.stat(path).st_mtime_ns
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with np.load(path) as stored:
+            index = {name: stored[name] for name in stored.files}
+        _loaded[path] = (stamp, index)
+        return index
+    df = columnar_cache.load_frame(csv_path)
+    write_index(csv_path, df)
+    return build_index(df)
+
+
+def _column_positions(index, columns):
+    names = list(index['columns'])
+    return [names.index(column) for column in columns]
+
+
+def _all_partitions(csv_path):
+    # Year partitions behind the virtual "All" path
+    folder = os.path.dirname(csv_path)
+    prefix = os.path.basename(csv_path)[:-len(f'_{combine_store.ALL_KEY}.csv')]
+    return combine_store.partition_paths(folder, prefix)
+
+
+def _to_day(date):
+    return int((np.datetime64(pd.Timestamp(date).date(), 'D') - EPOCH).astype(int))
+
+
+def range_total(csv_path, columns, start=None, end=None):
+    """
+    Sums columns over the rows with start <= Date <= end (both optional) in O(log n).
+    For the virtual "All" path the totals of its year partitions are summed.
+
+    Returns:
+    - A dictionary of column -> total.
+    """
+    if combine_store.is_all_view(csv_path):
+        return range_totals(_all_partitions(csv_path), columns, start, end)
+    index = load_index(csv_path)
+    days = index['days']
+    lo = 0 if start is None else int(np.searchsorted(days, _to_day(start), side='left'))
+    hi = len(days) if end is None else int(np.searchsorted(days, _to_day(end), side='right'))
+    positions = _column_positions(index, columns)
+    totals = index['prefix'][hi, positions] - index['prefix'][lo, positions]
+    return dict(zip(columns, totals.tolist()))
+
+
+def range_totals(file_paths, columns, start=None, end=None):
+    # Same over several year partitions (the "All" view, if present, is skipped)
+    totals = dict.fromkeys(columns, 0.0)
+    for label, path in file_paths.items():
+        year = combine_store.label_year(label)
+        if year == combine_store.ALL_KEY or combine_store.is_all_view(path):
+            continue
+        if start is not None and int(year) < pd.Timestamp(start).year:
+            continue
+        if end is not None and int(year) > pd.Timestamp(end).year:
+            continue
+        for column, total in range_total(path, columns, start, end).items():
+            totals[column] += total
+    return totals
+
+
+def month_slices(csv_path, index=None):
+    # (month, slice) for every month present in the partition, read from the stored offsets
+    offsets = (index or load_index(csv_path))['month_offsets']
+    return [(month, slice(int(offsets[month - 1]), int(offsets[month])))
+            for month in range(1, 13) if offsets[month] > offsets[month - 1]]
+
+
+def monthly_totals(csv_path, columns):
+    """
+    Per-month totals from prefix-sum differences.
+
+    Returns:
+    - A DataFrame with 'Month', one column per requested column and 'Days' (rows in the month).
+    """
+    index = load_index(csv_path)
+    offsets = index['month_offsets']
+    positions = _column_positions(index, columns)
+    prefix = index['prefix'][:, positions]
+    present = np.flatnonzero(offsets[1:] > offsets[:-1])
+    totals = prefix[offsets[present + 1]] - prefix[offsets[present]]
+    df = pd.DataFrame(totals, columns=columns)
+    df.insert(0, 'Month', present + 1)
+    df['Days'] = offsets[present + 1] - offsets[present]
+    return df
+
+
+def annual_totals(csv_path, columns):
+    # Whole-year totals and means (means skip missing values) of the partition
+    index = load_index(csv_path)
+    positions = _column_positions(index, columns)
+    totals = index['prefix'][-1, positions]
+    counts = index['counts'][-1, positions]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / counts
+    return {column: {'total': total, 'mean': mean} for column, total, mean in zip(columns, totals.tolist(), means.tolist())}
@@ -0,0 +1,157 @@
+import os
+import numpy as np
+import pandas as pd
+import columnar_cache
+import combine_store
+
+# Sufficient statistics for the linear water models, written next to every combined year CSV.
+# For each month of a partition the file keeps the row count, Z'Z, Z'y and y'y of the design matrix
+# Z = [1, Day of Year, temperature, precipitation]. Sums of these cells give the exact OLS or ridge
+# solution for any union of months and years ("last 18 months", "all summers") in O(p^2), without
+# reading a single raw row. Like the binary cache they are refreshed on every partition write and
+# rebuilt from the partition when stale.
+
+WATER_FEATURES = ['Day of Year', 'Outside Temperature (°C)', 'Precipitation (mm)']
+WATER_TARGET = 'Water Use (m³)'
+
+MONTHS = np.arange(1, 13)
+
+
+def stats_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.stats.npz'
+
+
+def design(df, features=WATER_FEATURES, target=WATER_TARGET):
+    """
+    Builds the design matrix of a combined frame, dropping rows with a missing feature or target.
+
+    Returns:
+    - Z: (rows, 1 + features) array with a leading column of ones for the intercept.
+    - y: (rows,) target array.
+    - months: (rows,) month of each row.
+    """
+    dates = pd.to_datetime(df['Date'])
+    columns = {'Day of Year': dates.dt.dayofyear.to_numpy(dtype=float)}
+    for name in features:
+        if name != 'Day of Year':
+            columns[name] = columnar_cache.to_number(df[name]).to_numpy(dtype=float)
+    y = columnar_cache.to_number(df[target]).to_numpy(dtype=float)
+
+    X = np.column_stack([columns[name] for name in features])
+    keep = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+    Z = np.column_stack([np.ones(int(keep.sum())), X[keep]])
+    return Z, y[keep], dates.dt.month.to_numpy()[keep]
+
+
+def compute_stats(df, features=WATER_FEATURES, target=WATER_TARGET):
+    # Per-month aggregates of one partition, indexed by month - 1
+    Z, y, months = design(df, features, target)
+    k = Z.shape[1]
+    stats = {
+        'n': np.zeros(12),
+        'xtx': np.zeros((12, k, k)),
+        'xty': np.zeros((12, k)),
+        'yty': np.zeros(12)
+    }
+    for month in np.unique(months):
+        rows = months == month
+        Z_month, y_month = Z[rows], y[rows]
+        stats['n'][month - 1] = len(y_month)
+        stats['xtx'][month - 1] = Z_month.T @ Z_month
+        stats['xty'][month - 1] = Z_month.T @ y_month
+        stats['yty'][month - 1] = y_month @ y_month
+    stats['features'] = np.array(features)
+    return stats
+
+
+def write_stats(csv_path, df):
+    # Used (with columnar_cache.write_cache) as the combine_store on_write hook
+    path = stats_path(csv_path)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **compute_stats(df))
+    os.replace(tmp_path, path)
+
+
+def load_stats(csv_path):
+    """
+    Returns the per-month statistics of a combined year CSV, rebuilding them when they are
+    missing, older than the CSV, or computed for other features.
+    """
+    path = stats_path(csv_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        with np.load(path) as stored:
+            stats = {name: stored[name] for name in stored.files}
+        if list(stats['features']) == WATER_FEATURES:
+            return stats
+
+    df = columnar_cache.load_frame(csv_path)
+    write_stats(csv_path, df)
+    return compute_stats(df)
+
+
+def file_stats(csv_path):
+    # Statistics of a whole combined year, or of every partition for the virtual "All" path
+    if combine_store.is_all_view(csv_path):
+        folder = os.path.dirname(csv_path)
+        prefix = os.path.basename(csv_path)[:-len(f'_{combine_store.ALL_KEY}.csv')]
+        return window_stats(combine_store.partition_paths(folder, prefix))
+    stats = load_stats(csv_path)
+    return {name: stats[name].sum(axis=0) for name in ('n', 'xtx', 'xty', 'yty')}
+
+
+def window_stats(file_paths, years=None, months=None, start=None, end=None):
+    """
+    Sums the monthly statistics of the selected cells.
+
+    Parameters:
+    - file_paths: dict of year label -> combined year path (the "All" view, if present, is ignored).
+    - years: list of year labels to include, defaults to all of them.
+    - months: list of months (1-12) to include, defaults to all of them, e.g. [6, 7, 8] for summers.
+    - start, end: 'YYYY-MM' strings bounding the window (inclusive), e.g. the last 18 months.
+
+    Returns:
+    - A dictionary with the summed 'n', 'xtx', 'xty' and 'yty'.
+    """
+    total = None
+    for label, path in file_paths.items():
+        year = combine_store.label_year(label)
+        if year == combine_store.ALL_KEY or combine_store.is_all_view(path):
+            continue
+        if years is not None and str(label) not in [str(y) for y in years]:
+            continue
+        selected = np.ones(12, dtype=bool)
+        if months is not None:
+            selected &= np.isin(MONTHS, months)
+        cells = np.array([f'{year}-{month:02d}' for month in MONTHS])
+        if start is not None:
+            selected &= cells >= start
+        if end is not None:
+            selected &= cells <= end
+        if not selected.any():
+            continue
+
+        stats = load_stats(path)
+        summed = {name: stats[name][selected].sum(axis=0) for name in ('n', 'xtx', 'xty', 'yty')}
+        if total is None:
+            total = summed
+        else:
+            total = {name: total[name] + summed[name] for name in total}
+    return total
+
+
+def solve(stats, ridge=0.0):
+    """
+    Solves the normal equations of summed statistics.
+
+    Parameters:
+    - stats: dict from window_stats.
+    - ridge: float. L2 penalty on the coefficients (not the intercept), same objective as
+      sklearn's Ridge(alpha=ridge); 0 gives ordinary least squares.
+
+    Returns:
+    - (intercept, coefficients)
+    """
+    xtx = stats['xtx'].copy()
+    xtx[1:, 1:] += ridge * np.eye(len(xtx) - 1)
+    beta = np.linalg.lstsq(xtx, stats['xty'], rcond=None)[0]
+    return beta[0], beta[1:]
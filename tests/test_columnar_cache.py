@@ -0,0 +1,40 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar_cache
+
+
+def write_year(path):
+    df = pd.DataFrame({'Date': ['2023-01-01', '2023-01-02'], 'Usage (kWh)': [1.5, 2.5],
+                       'Average temperature (C)': ['21.3 C', '-4.1 C']})
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_weather_values_round_trip_exactly(tmp_path):
+    path = write_year(tmp_path / 'Combined_2023.csv')
+
+    columnar_cache.load_frame(path)
+    frame = columnar_cache.load_frame(path)
+
+    assert columnar_cache.load_records(path) is not None
+    assert frame['Average temperature (C)'].tolist() == [21.3, -4.1]
+    # The frame owns its columns, the mapped file can be replaced under it
+    records = columnar_cache.load_records(path)
+    assert not np.shares_memory(frame['Usage (kWh)'].to_numpy(), records)
+
+
+def test_float32_caches_are_rebuilt(tmp_path):
+    path = write_year(tmp_path / 'Combined_2023.csv')
+    records = columnar_cache.to_records(pd.read_csv(path))
+    old = records.astype([(name, np.float32 if name == 'Average temperature (C)' else records.dtype[name])
+                          for name in records.dtype.names])
+    np.save(columnar_cache.cache_path(path), old)
+
+    assert columnar_cache.load_records(path) is None
+    assert columnar_cache.load_frame(path)['Average temperature (C)'].tolist() == [21.3, -4.1]
+    assert columnar_cache.load_records(path)['Average temperature (C)'].dtype == np.float64
@@ -0,0 +1,83 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+
+PREFIX = 'Combined_Test_Usage'
+
+
+def frame(dates, values):
+    return pd.DataFrame({'Date': pd.to_datetime(dates), 'Usage': values})
+
+
+def test_merge_sorted_keeps_the_last_ingested_row():
+    existing = frame(['2023-01-01', '2023-01-02', '2023-01-03'], [1.0, 2.0, 3.0])
+    new = frame(['2023-01-03', '2023-01-02', '2023-01-04'], [30.0, 20.0, 40.0])
+
+    merged = combine_store.merge_sorted(existing, new)
+
+    assert list(merged['Date'].dt.strftime('%Y-%m-%d')) == ['2023-01-01', '2023-01-02', '2023-01-03', '2023-01-04']
+    assert list(merged['Usage']) == [1.0, 20.0, 30.0, 40.0]
+
+
+def test_merge_sorted_last_wins_within_one_batch():
+    merged = combine_store.merge_sorted(frame([], []), frame(['2023-01-01', '2023-01-01'], [1.0, 2.0]))
+
+    assert list(merged['Usage']) == [2.0]
+
+
+def test_partitions_round_trip(tmp_path):
+    folder = str(tmp_path)
+    df = frame(['2022-12-30', '2022-12-31', '2023-01-01', '2023-01-02'], [1.0, 2.0, 3.0, 4.0])
+
+    changed = combine_store.merge_into_store(folder, PREFIX, df)
+
+    assert changed == ['2022', '2023']
+    paths = combine_store.partition_paths(folder, PREFIX, include_all=True)
+    assert list(paths) == ['2022', '2023', combine_store.ALL_KEY]
+    assert combine_store.is_all_view(paths[combine_store.ALL_KEY])
+    pd.testing.assert_frame_equal(combine_store.load_all(folder, PREFIX), df)
+
+
+def test_append_and_overlap_rewrite(tmp_path):
+    folder = str(tmp_path)
+    combine_store.merge_into_store(folder, PREFIX, frame(['2023-01-01', '2023-01-02'], [1.0, 2.0]))
+    # Rows after the end of the partition are appended
+    combine_store.merge_into_store(folder, PREFIX, frame(['2023-01-03'], [3.0]))
+    # Overlapping rows rewrite the year and replace the stored values
+    combine_store.merge_into_store(folder, PREFIX, frame(['2023-01-02'], [20.0]))
+
+    manifest = combine_store.load_manifest(folder, PREFIX)
+    entry = manifest['partitions']['2023']
+    assert (entry['start'], entry['end'], entry['rows']) == ('2023-01-01', '2023-01-03', 3)
+    assert list(combine_store.read_partition(folder, entry)['Usage']) == [1.0, 20.0, 3.0]
+
+
+def test_manifest_is_rebuilt_from_partition_files(tmp_path):
+    folder = str(tmp_path)
+    df = frame(['2021-06-01', '2022-06-01'], [1.0, 2.0])
+    combine_store.merge_into_store(folder, PREFIX, df)
+    os.remove(combine_store.manifest_path(folder))
+
+    manifest = combine_store.load_manifest(folder, PREFIX)
+
+    assert sorted(manifest['partitions']) == ['2021', '2022']
+    pd.testing.assert_frame_equal(combine_store.load_all(folder, PREFIX), df)
+
+
+def test_merge_sorted_fill_missing_merges_columns():
+    existing = pd.DataFrame({'Date': pd.to_datetime(['2023-01-01', '2023-01-02']),
+                             'Usage': [1.0, 2.0], 'Temperature': [5.0, 6.0]})
+    new = pd.DataFrame({'Date': pd.to_datetime(['2023-01-02', '2023-01-03']),
+                        'Usage': [20.0, 30.0], 'Temperature': [np.nan, np.nan]})
+
+    merged = combine_store.merge_sorted(existing, new, fill_missing=True)
+
+    assert list(merged.columns) == ['Date', 'Usage', 'Temperature']
+    assert list(merged['Usage']) == [1.0, 20.0, 30.0]
+    assert merged['Temperature'].tolist()[:2] == [5.0, 6.0]
+    assert np.isnan(merged['Temperature'].iloc[2])
@@ -0,0 +1,82 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+import electricity_file_combine
+import rollup_index
+from forecasting_model import backtest
+
+
+def write_export(path, dates, usage):
+    # DailyChart-style export: a comment line, then the header
+    df = pd.DataFrame({'Date': dates, 'Usage TOU off-peak (kWh)': usage, 'Average temperature (C)': 5})
+    with open(path, 'w') as f:
+        f.write('Daily usage export\n')
+        df.to_csv(f, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def combined_folder(tmp_path, monkeypatch):
+    folder = str(tmp_path / 'Combine')
+    monkeypatch.setattr(electricity_file_combine, 'get_combined_folder', lambda: folder)
+    return folder
+
+
+def test_single_store_uses_plain_year_labels(tmp_path, combined_folder):
+    export = write_export(tmp_path / 'usage.csv', ['2022-12-31', '2023-01-01'], [1.0, 2.0])
+    electricity_file_combine.combine_files([export])
+
+    assert list(electricity_file_combine.combined_file_paths()) == ['2022', '2023', combine_store.ALL_KEY]
+
+
+def test_meter_and_shared_stores_are_combined(tmp_path, combined_folder):
+    shared = write_export(tmp_path / 'usage.csv', ['2023-01-01', '2023-01-02'], [1.0, 2.0])
+    meter = write_export(tmp_path / 'DailyChart-11-22-2024-01-05.csv', ['2023-01-01', '2024-01-01'], [10.0, 20.0])
+    electricity_file_combine.combine_files([shared])
+    electricity_file_combine.combine_files([meter])
+
+    file_paths = electricity_file_combine.combined_file_paths()
+
+    shared_store = electricity_file_combine.SHARED_STORE
+    assert sorted(file_paths) == sorted([
+        combine_store.StoreYear(shared_store, '2023'), combine_store.StoreYear(shared_store, combine_store.ALL_KEY),
+        combine_store.StoreYear('11-22', '2023'), combine_store.StoreYear('11-22', '2024'),
+        combine_store.StoreYear('11-22', combine_store.ALL_KEY)])
+    assert str(combine_store.StoreYear('11-22', '2023')) == '11-22 2023'
+
+    # Only the selected meter, with plain labels
+    assert list(electricity_file_combine.combined_file_paths(meters=['11-22'])) == ['2023', '2024', combine_store.ALL_KEY]
+
+    totals = rollup_index.range_totals(file_paths, ['Usage TOU off-peak (kWh)'], '2023-01-01', '2023-12-31')
+    assert totals['Usage TOU off-peak (kWh)'] == pytest.approx(13.0)
+
+    stores = combine_store.split_stores(file_paths)
+    assert backtest.history_path(stores['11-22']).endswith(os.path.join('11-22', 'Combined_Electricity_Usage_All.csv'))
+    with pytest.raises(ValueError):
+        backtest.history_path(file_paths)
+
+
+def test_shared_years_covered_by_a_meter_are_left_out(tmp_path, combined_folder):
+    # Exports merged into the shared store before they were routed to their meter
+    legacy = write_export(tmp_path / 'legacy.csv', ['2022-06-01', '2023-01-01', '2023-01-02'], [1.0, 2.0, 3.0])
+    meter = write_export(tmp_path / 'DailyChart-11-22-2023-01-05.csv', ['2022-06-01', '2023-01-01', '2023-01-02'],
+                         [1.0, 2.0, 3.0])
+    electricity_file_combine.combine_files([legacy])
+    electricity_file_combine.combine_files([meter])
+
+    file_paths = electricity_file_combine.combined_file_paths()
+
+    assert list(file_paths) == ['2022', '2023', combine_store.ALL_KEY]
+    assert all(os.path.join('meters', '11-22') in path for path in file_paths.values())
+
+    # A shared year the meter does not cover is still processed, without the shared "All" view
+    extra = write_export(tmp_path / 'extra.csv', ['2021-03-01'], [5.0])
+    electricity_file_combine.combine_files([extra])
+    shared_labels = [label for label in electricity_file_combine.combined_file_paths()
+                     if label.store == electricity_file_combine.SHARED_STORE]
+    assert shared_labels == [combine_store.StoreYear(electricity_file_combine.SHARED_STORE, '2021')]
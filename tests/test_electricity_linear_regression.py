@@ -0,0 +1,25 @@
+import os
+import sys
+import shutil
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecasting_model import electricity_linear_regression
+
+REPO_YEAR = os.path.join(ROOT, 'Electricity', 'Combine', 'Combined_Electricity_Usage_2023.csv')
+
+
+def test_targets_fit_the_same_models_as_the_per_target_functions(tmp_path):
+    path = str(tmp_path / os.path.basename(REPO_YEAR))
+    shutil.copy(REPO_YEAR, path)
+
+    models, metrics = electricity_linear_regression.preprocess_and_fit_electricity_targets(path)
+    usage_model, usage_mse, usage_r2 = electricity_linear_regression.preprocess_and_fit_electricity(path)
+    cost_model, cost_mse, cost_r2 = electricity_linear_regression.preprocess_and_fit_electricity_cost(path)
+
+    assert models['Total_Usage'].alpha == usage_model.alpha
+    assert models['Total_Cost'].alpha == cost_model.alpha
+    assert metrics['Total_Usage'] == {'MSE': pytest.approx(usage_mse), 'R2': pytest.approx(usage_r2)}
+    assert metrics['Total_Cost'] == {'MSE': pytest.approx(cost_mse), 'R2': pytest.approx(cost_r2)}
@@ -0,0 +1,96 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+import electricity_file_combine
+import green_button_xml
+
+# 2023-01-01 00:00 UTC
+JAN_1_2023 = 1672531200
+# Eastern standard time
+TZ_OFFSET = -18000
+
+
+def write_feed(path, readings, multiplier=0, uom=72):
+    # ESPI feed with the usual entries: local time parameters, a reading type and one IntervalBlock.
+    # readings: (start, value, cost or None, tou or None) tuples
+    intervals = []
+    for start, value, cost, tou in readings:
+        cost_tag = '' if cost is None else f'<cost>{cost}</cost>'
+        tou_tag = '' if tou is None else f'<tou>{tou}</tou>'
+        intervals.append(f'<IntervalReading>{cost_tag}<timePeriod><duration>900</duration><start>{start}</start>'
+                         f'</timePeriod><value>{value}</value>{tou_tag}</IntervalReading>')
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+                '<entry><content><LocalTimeParameters xmlns="http://naesb.org/espi">'
+                f'<tzOffset>{TZ_OFFSET}</tzOffset></LocalTimeParameters></content></entry>'
+                '<entry><content><ReadingType xmlns="http://naesb.org/espi">'
+                f'<powerOfTenMultiplier>{multiplier}</powerOfTenMultiplier><uom>{uom}</uom></ReadingType></content></entry>'
+                '<entry><content><IntervalBlock xmlns="http://naesb.org/espi">' + ''.join(intervals) +
+                '</IntervalBlock></content></entry></feed>')
+    return str(path)
+
+
+def test_batches_split_readings_and_convert_units(tmp_path):
+    readings = [(JAN_1_2023 + 900 * i, 1000 + i, 50000 if i % 2 else None, i % 4 if i < 6 else None)
+                for i in range(7)]
+    path = write_feed(tmp_path / 'feed.xml', readings, multiplier=1)
+
+    batches = list(green_button_xml.iter_interval_batches(path, batch_size=3))
+
+    assert [len(batch['start']) for batch in batches] == [3, 3, 1]
+    columns = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+    # UTC starts shifted to local time
+    assert columns['start'].tolist() == [JAN_1_2023 + TZ_OFFSET + 900 * i for i in range(7)]
+    assert columns['duration'].tolist() == [900] * 7
+    # Wh x 10^1 -> kWh
+    assert columns['value'] == pytest.approx([(1000 + i) * 10 / 1000 for i in range(7)])
+    # Hundred-thousandths of the currency unit, NaN when absent
+    assert columns['cost'][1::2] == pytest.approx([0.5] * 3)
+    assert np.isnan(columns['cost'][::2]).all()
+    assert columns['tou'].tolist() == [0, 1, 2, 3, 0, 1, 0]
+
+
+def test_daily_rows_split_on_local_midnight(tmp_path):
+    # 04:45 and 05:00 UTC on January 1 are 23:45 on December 31 and 00:00 on January 1 locally
+    readings = [(JAN_1_2023 + 4 * 3600 + 2700, 2000, 100000, 3), (JAN_1_2023 + 5 * 3600, 500, None, 2),
+                (JAN_1_2023 + 5 * 3600 + 900, 1500, None, 1)]
+    path = write_feed(tmp_path / 'feed.xml', readings)
+
+    df = green_button_xml.load_and_process_xml(path, batch_size=2)
+
+    assert df['Date'].dt.strftime('%Y-%m-%d').tolist() == ['2022-12-31', '2023-01-01']
+    assert df['Usage TOU on-peak (kWh)'].tolist() == [2.0, 0.0]
+    assert df['Usage TOU mid-peak (kWh)'].tolist() == [0.0, 0.5]
+    assert df['Usage TOU off-peak (kWh)'].tolist() == [0.0, 1.5]
+    assert df['Cost TOU on-peak ($)'].iloc[0] == 1.0
+    assert np.isnan(df['Cost TOU on-peak ($)'].iloc[1])
+
+
+def test_xml_and_csv_rows_of_a_day_are_merged_by_column(tmp_path, monkeypatch):
+    folder = str(tmp_path / 'Combine')
+    monkeypatch.setattr(electricity_file_combine, 'get_combined_folder', lambda: folder)
+    csv_path = str(tmp_path / 'usage.csv')
+    with open(csv_path, 'w') as f:
+        f.write('Daily usage export\n')
+        pd.DataFrame({'Date': ['2023-01-01', '2023-01-02'], 'Usage TOU off-peak (kWh)': [9.0, 8.0],
+                      'Average temperature (C)': [-3.5, -4.0]}).to_csv(f, index=False)
+    # Local 2023-01-01 01:00 and 01:15
+    xml_path = write_feed(tmp_path / 'feed.xml', [(JAN_1_2023 + 6 * 3600, 1250, 20000, 1),
+                                                  (JAN_1_2023 + 6 * 3600 + 900, 750, 10000, 1)])
+
+    electricity_file_combine.combine_files([csv_path])
+    electricity_file_combine.combine_files([xml_path])
+
+    merged = combine_store.load_all(folder, electricity_file_combine.COMBINED_PREFIX).set_index('Date')
+    january_1 = merged.loc[pd.Timestamp('2023-01-01')]
+    # The feed's usage and cost replace the export's, the export's temperature is kept
+    assert january_1['Usage TOU off-peak (kWh)'] == pytest.approx(2.0)
+    assert january_1['Cost TOU off-peak ($)'] == pytest.approx(0.3)
+    assert january_1['Average temperature (C)'] == -3.5
+    assert merged.loc[pd.Timestamp('2023-01-02'), 'Usage TOU off-peak (kWh)'] == 8.0
@@ -0,0 +1,88 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+from forecasting_model import incremental
+from forecasting_model import model_cache
+
+TREES = 20
+
+
+def rows(count, seed, shift=0.0):
+    x = np.random.default_rng(seed).uniform(0, 10, count)
+    return pd.DataFrame({'x': x, 'y': 3 * x + shift})
+
+
+def prepare(df):
+    return df[['x']], df['y']
+
+
+def make_model():
+    return RandomForestRegressor(n_estimators=TREES, random_state=0)
+
+
+@pytest.fixture
+def year(tmp_path):
+    model_cache.clear_loaded()
+    path = str(tmp_path / 'Combined_2023.csv')
+    rows(200, 0).to_csv(path, index=False)
+    yield path
+    model_cache.clear_loaded()
+
+
+def append(path, df):
+    df.to_csv(path, mode='a', header=False, index=False)
+
+
+def forest(folder, path):
+    return incremental.get_or_fit(folder, 'forest', path, {}, pd.read_csv, prepare, make_model)
+
+
+def record(folder, path):
+    return combine_store.load_json(incremental.lineage_path(folder, 'forest', path, {}))
+
+
+def test_appended_rows_grow_the_previous_forest(tmp_path, year):
+    folder = str(tmp_path / 'Models')
+    first = forest(folder, year)
+    assert first.n_estimators == TREES
+    old_tree = first.estimators_[0]
+
+    append(year, rows(20, 1))
+    grown = forest(folder, year)
+
+    # The old trees are kept and a few trees fitted on the new rows are added
+    assert grown.n_estimators == TREES + incremental.MIN_NEW_TREES
+    np.testing.assert_array_equal(grown.estimators_[0].tree_.value, old_tree.tree_.value)
+    assert (record(folder, year)['base_trees'], record(folder, year)['trees'], record(folder, year)['rows']) == \
+        (TREES, TREES + incremental.MIN_NEW_TREES, 220)
+
+
+def test_drifted_rows_force_a_full_refit(tmp_path, year):
+    folder = str(tmp_path / 'Models')
+    forest(folder, year)
+
+    # New rows far off the relation the forest learned
+    append(year, rows(20, 1, shift=100.0))
+    refit = forest(folder, year)
+
+    assert refit.n_estimators == TREES
+    assert (record(folder, year)['trees'], record(folder, year)['rows']) == (TREES, 220)
+
+
+def test_changed_history_forces_a_full_refit(tmp_path, year):
+    folder = str(tmp_path / 'Models')
+    forest(folder, year)
+
+    # Rows were appended, but an earlier row was also rewritten
+    df = pd.concat([rows(200, 0), rows(20, 1)], ignore_index=True)
+    df.loc[0, 'y'] += 1.0
+    df.to_csv(year, index=False)
+
+    assert forest(folder, year).n_estimators == TREES
@@ -0,0 +1,59 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import interval_store
+
+# 2023-01-01 00:00 in epoch minutes
+JAN_1_2023 = 27_875_520
+
+
+def intervals(first, count, value):
+    records = np.zeros(count, dtype=interval_store.INTERVAL_DTYPE)
+    records['start'] = first + 15 * np.arange(count)
+    records['minutes'] = 15
+    records['value'] = value
+    records['cost'] = np.nan
+    records['tou'] = 1
+    return records
+
+
+def test_merge_intervals_appends_and_splices_in_place(tmp_path):
+    store = str(tmp_path)
+    interval_store.merge_intervals(store, intervals(JAN_1_2023, 96, 1.0))
+    path = interval_store.interval_path(store, '2023')
+
+    # Readings after the end of the file are appended
+    interval_store.merge_intervals(store, intervals(JAN_1_2023 + 96 * 15, 96, 2.0))
+    # A re-export of the last 48 readings and 48 new ones replaces the tail only
+    changed = interval_store.merge_intervals(store, intervals(JAN_1_2023 + 144 * 15, 96, 3.0))
+
+    records = np.load(path)
+    assert len(records) == 240
+    assert np.all(np.diff(records['start']) == 15)
+    assert list(np.unique(records['value'][:96])) == [1.0]
+    assert list(np.unique(records['value'][96:144])) == [2.0]
+    assert list(np.unique(records['value'][144:])) == [3.0]
+    assert changed == {'2023': (JAN_1_2023 + 144 * 15, JAN_1_2023 + 239 * 15)}
+
+
+def test_splice_keeps_the_header_size(tmp_path):
+    path = str(tmp_path / 'Intervals_2023.npy')
+    np.save(path, intervals(JAN_1_2023, 10, 1.0))
+
+    assert interval_store._splice_records(path, 5, intervals(JAN_1_2023 + 5 * 15, 100_000, 2.0))
+
+    records = np.load(path)
+    assert len(records) == 100_005
+    assert list(records['value'][:5]) == [1.0] * 5
+    assert records['start'][-1] == JAN_1_2023 + 100_004 * 15
+
+
+def test_records_split_across_years(tmp_path):
+    store = str(tmp_path)
+    interval_store.merge_intervals(store, intervals(JAN_1_2023 - 4 * 15, 8, 1.0))
+
+    assert len(interval_store.read_intervals(store, '2022')) == 4
+    assert len(interval_store.read_intervals(store, '2023')) == 4
@@ -0,0 +1,41 @@
+import os
+import sys
+import shutil
+import numpy as np
+import pytest
+from sklearn.linear_model import Lasso
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forecasting_model import dataset
+from forecasting_model import lasso_search
+
+FEATURES = ['Year', 'Month', 'Day', 'Weekday', 'Average temperature (C)']
+
+
+def electricity_training_set(tmp_path, target):
+    # The training split the electricity Lasso models search on
+    path = str(tmp_path / 'Combined_Electricity_Usage_2023.csv')
+    shutil.copy(os.path.join(ROOT, 'Electricity', 'Combine', 'Combined_Electricity_Usage_2023.csv'), path)
+    df = dataset.load_electricity(path)
+    X = StandardScaler().fit_transform(df[FEATURES].fillna(df[FEATURES].mean()))
+    X_train, _, y_train, _ = train_test_split(X, df[target], test_size=0.3, random_state=42)
+    return X_train, y_train.to_numpy()
+
+
+@pytest.mark.parametrize('alphas', [np.logspace(-4, 0, 5), lasso_search.ALPHAS])
+@pytest.mark.parametrize('target', ['Total_Usage', 'Total_Cost'])
+def test_path_search_matches_grid_search(tmp_path, target, alphas):
+    X, y = electricity_training_set(tmp_path, target)
+    grid_search = GridSearchCV(Lasso(max_iter=lasso_search.MAX_ITER), param_grid={'alpha': alphas}, cv=5, scoring='r2')
+    grid_search.fit(X, y)
+
+    scores = lasso_search.path_scores(X, y[:, np.newaxis], alphas)[:, 0]
+
+    assert lasso_search.best_alphas(X, y, alphas)[0] == grid_search.best_params_['alpha']
+    # Warm-started and cold-started coordinate descent stop at the same tolerance, not the same iterate
+    assert scores.max() == pytest.approx(grid_search.best_score_, abs=1e-5)
+    assert np.allclose(scores, grid_search.cv_results_['mean_test_score'], atol=1e-5)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecasting_model import model_cache
+
+
+def test_get_or_fit_fits_once_and_loads_from_disk(tmp_path):
+    model_cache.clear_loaded()
+    fits = []
+
+    def fit():
+        fits.append(1)
+        return {'coef': [1.0, 2.0]}
+
+    first = model_cache.get_or_fit(str(tmp_path), 'model', 'hash', {'alpha': 1}, fit)
+    assert model_cache.get_or_fit(str(tmp_path), 'model', 'hash', {'alpha': 1}, fit) is first
+    model_cache.clear_loaded()
+    assert model_cache.get_or_fit(str(tmp_path), 'model', 'hash', {'alpha': 1}, fit) == first
+    assert len(fits) == 1
+
+
+def test_loaded_models_are_bounded(tmp_path, monkeypatch):
+    model_cache.clear_loaded()
+    paths = [model_cache.model_path(str(tmp_path), 'model', f'hash{i}', {}) for i in range(5)]
+    for i in range(5):
+        model_cache.get_or_fit(str(tmp_path), 'model', f'hash{i}', {}, lambda: list(range(1000)))
+    monkeypatch.setattr(model_cache, 'MAX_LOADED_BYTES', 2 * os.path.getsize(paths[0]))
+    model_cache.clear_loaded()
+
+    for i in range(5):
+        model_cache.get_or_fit(str(tmp_path), 'model', f'hash{i}', {}, lambda: None)
+
+    # Only the two most recently used models stay in memory
+    assert list(model_cache._loaded) == paths[3:]
+    model_cache.clear_loaded()
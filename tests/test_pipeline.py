@@ -0,0 +1,43 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+import water_file_combine
+from forecasting_model import dataset
+from forecasting_model import pipeline
+
+
+def water_rows(dates):
+    return pd.DataFrame({'Date': pd.to_datetime(dates), 'Water Use (m³)': np.arange(len(dates), dtype=float),
+                         'Outside Temperature (°C)': 5.0, 'Precipitation (mm)': 0.0, 'Year': 2023})
+
+
+def month_sizes(data):
+    return [(month, len(data.index[rows])) for month, rows in pipeline.month_groups(data)]
+
+
+def test_month_groups_ignores_the_index_of_a_rewritten_partition(tmp_path):
+    folder = str(tmp_path)
+    january = list(pd.date_range('2023-01-01', periods=10))
+    february = list(pd.date_range('2023-02-01', periods=5))
+    combine_store.merge_into_store(folder, water_file_combine.COMBINED_PREFIX, water_rows(january + february),
+                                   on_write=water_file_combine.write_caches)
+    path = combine_store.partition_paths(folder, water_file_combine.COMBINED_PREFIX)['2023']
+    old = dataset.load_water(path)
+    assert month_sizes(old) == [(1, 10), (2, 5)]
+
+    # Same number of rows, different months
+    rewritten = water_rows(january[:5] + list(pd.date_range('2023-02-01', periods=10)))
+    manifest = combine_store.load_manifest(folder, water_file_combine.COMBINED_PREFIX)
+    combine_store.write_partition(folder, water_file_combine.COMBINED_PREFIX, '2023', rewritten, manifest,
+                                  water_file_combine.write_caches)
+    # Coarse file system clocks could give the rewrite the old mtime
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1))
+
+    # The frame still holds the old rows, so its groups come from the rows, not from the new index
+    assert month_sizes(old) == [(1, 10), (2, 5)]
+    assert month_sizes(dataset.load_water(path)) == [(1, 5), (2, 10)]
@@ -0,0 +1,85 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecasting_model import plots
+
+
+@pytest.fixture
+def utility_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(plots, 'utility_folder', lambda utility: str(tmp_path / utility))
+    plots._loaded.clear()
+    yield str(tmp_path)
+    plots._loaded.clear()
+
+
+def store(year, model_version='v1'):
+    x = np.arange(1, 61)
+    months = np.where(x <= 31, 1, 2)
+    plots.save_predictions('water', year, 'hash', model_version, x, x * 1.0, x * 1.1, months)
+
+
+def test_get_plot_reuses_the_cached_png(utility_folder):
+    store('2023')
+
+    path = plots.get_plot('water', '2023', 1)
+    stamp = os.stat(path).st_mtime_ns
+
+    assert plots.get_plot('water', '2023', 1) == path
+    assert os.stat(path).st_mtime_ns == stamp
+    assert plots.get_plot('water', '2023', 5) is None
+    # A new model version makes the image stale
+    store('2023', 'v2')
+    assert plots.stale_charts('water', '2023') == [None, 1, 2]
+
+
+def test_render_all_writes_every_chart_once(utility_folder):
+    store('2022')
+    store('2023')
+
+    assert plots.render_all(['water'], max_workers=1) == 6
+    assert plots.render_all(['water'], max_workers=1) == 0
+
+
+def test_loaded_predictions_are_bounded(utility_folder):
+    years = [str(year) for year in range(2000, 2000 + plots.MAX_LOADED_PREDICTIONS + 3)]
+    for year in years:
+        store(year)
+        plots.load_predictions('water', year)
+
+    assert len(plots._loaded) == plots.MAX_LOADED_PREDICTIONS
+    assert [os.path.basename(path) for path in plots._loaded] == [f'{year}.npz' for year in years[3:]]
+
+
+def test_render_image_draws_in_memory(utility_folder):
+    store('2023')
+
+    image = plots.render_image('water', '2023', 1)
+
+    assert image.dtype == np.uint8 and image.shape[2] == 4
+    assert plots.render_image('water', '2023', 5) is None
+    assert not os.path.exists(plots.plot_folder('water', '2023'))
+
+
+def test_opening_one_tab_draws_only_its_chart(utility_folder, monkeypatch):
+    store('2022')
+    store('2023')
+    drawn = []
+    draw_chart = plots._draw_chart
+
+    def counted(kind, year, month, predictions):
+        drawn.append((kind, year, month))
+        return draw_chart(kind, year, month, predictions)
+    monkeypatch.setattr(plots, '_draw_chart', counted)
+
+    plots.render_image('water', '2023', 2)
+    assert drawn == [('water', '2023', 2)]
+
+    # Exporting that chart writes its PNG and nothing else
+    path = plots.get_plot('water', '2023', 2)
+    assert drawn == [('water', '2023', 2)] * 2
+    assert sorted(os.listdir(os.path.dirname(path))) == [os.path.basename(path), plots.KEYS_NAME]
+    assert not os.path.exists(plots.plot_folder('water', '2022'))
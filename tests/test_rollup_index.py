@@ -0,0 +1,40 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+import electricity_file_combine
+import rollup_index
+
+COLUMN = 'Usage TOU off-peak (kWh)'
+
+
+@pytest.fixture
+def file_paths(tmp_path):
+    folder = str(tmp_path)
+    dates = pd.date_range('2022-11-01', '2023-02-28')
+    df = pd.DataFrame({'Date': dates, COLUMN: 1.0})
+    combine_store.merge_into_store(folder, electricity_file_combine.COMBINED_PREFIX, df,
+                                   on_write=electricity_file_combine.write_caches)
+    return combine_store.partition_paths(folder, electricity_file_combine.COMBINED_PREFIX, include_all=True)
+
+
+def test_all_view_range_total_sums_the_year_partitions(file_paths):
+    all_path = file_paths[combine_store.ALL_KEY]
+
+    assert rollup_index.range_total(all_path, [COLUMN]) == {COLUMN: 120.0}
+    assert rollup_index.range_total(all_path, [COLUMN], '2022-12-15', '2023-01-10') == {COLUMN: 27.0}
+    assert rollup_index.range_totals(file_paths, [COLUMN], '2022-12-15', '2023-01-10') == {COLUMN: 27.0}
+
+
+def test_all_view_has_no_month_lookups(file_paths):
+    all_path = file_paths[combine_store.ALL_KEY]
+
+    with pytest.raises(ValueError):
+        rollup_index.load_index(all_path)
+    with pytest.raises(ValueError):
+        rollup_index.monthly_totals(all_path, [COLUMN])
+    assert rollup_index.monthly_totals(file_paths['2022'], [COLUMN])[COLUMN].tolist() == [30.0, 31.0]
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecasting_model import scheduler
+
+
+def square(x):
+    return x * x
+
+
+def record(x, folder):
+    # Leaves a marker for every job that ran
+    if x == 0:
+        raise ValueError('fit failed')
+    open(os.path.join(folder, str(x)), 'w').close()
+    time.sleep(0.2)
+    return x
+
+
+def test_run_jobs_keeps_the_job_order():
+    jobs = {f'job {x}': (square, x) for x in range(6)}
+
+    assert scheduler.run_jobs(jobs, max_workers=1) == {f'job {x}': x * x for x in range(6)}
+    assert scheduler.run_jobs(jobs, max_workers=2) == {f'job {x}': x * x for x in range(6)}
+
+
+def test_run_jobs_stops_when_asked():
+    done = []
+    results = scheduler.run_jobs({x: (square, x) for x in range(6)}, max_workers=1,
+                                 on_result=lambda key, result: done.append(key), should_stop=lambda: len(done) >= 2)
+
+    assert results == {0: 0, 1: 1}
+
+
+def test_failed_job_cancels_the_queued_ones(tmp_path):
+    jobs = {x: (record, x, str(tmp_path)) for x in range(40)}
+
+    with pytest.raises(ValueError):
+        scheduler.run_jobs(jobs, max_workers=2)
+
+    # Only the jobs already handed to the two workers ran
+    assert len(os.listdir(tmp_path)) < 10
+    scheduler.shutdown_pool()
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import check_startup
+
+needs_pyqt = pytest.mark.skipif(not check_startup.has_pyqt(), reason='PyQt5 is not installed')
+
+
+def test_gui_has_no_heavy_module_level_imports():
+    heavy = [name for name in check_startup.module_level_imports(check_startup.GUI_PATH)
+             if check_startup.is_heavy(name)]
+
+    assert heavy == []
+
+
+@needs_pyqt
+def test_import_gui_is_light_and_fast():
+    report, _ = check_startup.run(check_startup.IMPORT_SCRIPT)
+
+    assert sorted({name.split('.')[0] for name in report['modules'] if check_startup.is_heavy(name)}) == []
+    assert report['seconds'] <= check_startup.IMPORT_BUDGET
+
+
+@needs_pyqt
+def test_start_dialog_paints_within_budget():
+    _, elapsed = check_startup.run(check_startup.PAINT_SCRIPT)
+
+    assert elapsed <= check_startup.FIRST_PAINT_BUDGET
@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_store
+import sufficient_stats
+import water_file_combine
+
+
+def water_rows(start, count, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=count)
+    temperature = rng.uniform(-10, 30, count)
+    precipitation = rng.uniform(0, 20, count)
+    usage = 0.5 + 0.01 * dates.dayofyear + 0.05 * temperature - 0.02 * precipitation + rng.normal(0, 0.1, count)
+    return pd.DataFrame({'Date': dates, 'Water Use (m³)': usage, 'Outside Temperature (°C)': temperature,
+                         'Precipitation (mm)': precipitation, 'Year': dates.year})
+
+
+def sklearn_fit(model, df):
+    X = np.column_stack([pd.to_datetime(df['Date']).dt.dayofyear, df['Outside Temperature (°C)'],
+                         df['Precipitation (mm)']])
+    model.fit(X, df['Water Use (m³)'])
+    return model.intercept_, model.coef_
+
+
+@pytest.mark.parametrize('ridge', [0.0, 10.0])
+def test_solution_matches_sklearn_after_an_append(tmp_path, ridge):
+    folder = str(tmp_path)
+    first = water_rows('2023-01-01', 120, 0)
+    combine_store.merge_into_store(folder, water_file_combine.COMBINED_PREFIX, first,
+                                   on_write=water_file_combine.write_caches)
+    appended = water_rows('2023-05-01', 60, 1)
+    combine_store.merge_into_store(folder, water_file_combine.COMBINED_PREFIX, appended,
+                                   on_write=water_file_combine.write_caches)
+    file_paths = combine_store.partition_paths(folder, water_file_combine.COMBINED_PREFIX)
+    # The append rewrote the statistics, they are not rebuilt on read
+    with np.load(sufficient_stats.stats_path(file_paths['2023'])) as stored:
+        assert stored['n'].sum() == 180
+    model = LinearRegression() if ridge == 0.0 else Ridge(alpha=ridge)
+
+    for rows, stats in [(pd.concat([first, appended], ignore_index=True), sufficient_stats.window_stats(file_paths)),
+                        (appended, sufficient_stats.window_stats(file_paths, start='2023-05', end='2023-06'))]:
+        intercept, coef = sufficient_stats.solve(stats, ridge)
+        expected_intercept, expected_coef = sklearn_fit(model, rows)
+
+        assert stats['n'] == len(rows)
+        assert np.allclose(intercept, expected_intercept)
+        assert np.allclose(coef, expected_coef)
@@ -0,0 +1,26 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import water_file_combine
+
+
+def test_parse_day_of_month_formats():
+    dates = water_file_combine.parse_day_of_month(pd.Series(['September 1', 'Sep 2-3', '30']), 9, '2023')
+
+    assert list(dates.strftime('%Y-%m-%d')) == ['2023-09-01', '2023-09-02', '2023-09-30']
+
+
+def test_parse_day_of_month_accepts_leap_day():
+    dates = water_file_combine.parse_day_of_month(pd.Series(['Feb 29']), 2, '2024')
+
+    assert list(dates.strftime('%Y-%m-%d')) == ['2024-02-29']
+
+
+@pytest.mark.parametrize('day, month, year', [('Sep 31', 9, '2023'), ('Feb 29', 2, '2023'), ('Sep 0', 9, '2023')])
+def test_parse_day_of_month_rejects_days_outside_the_month(day, month, year):
+    with pytest.raises(ValueError):
+        water_file_combine.parse_day_of_month(pd.Series(['Sep 1', day]), month, year)
@@ -1,93 +1,102 @@
 import pandas as pd
 import numpy as np
 import os
+import green_button_xml
+import combine_store
+import columnar_cache
+import sufficient_stats
+import rollup_index
 
-# Adjusted convert_date_fixed function to return both the date and the year
-def convert_date_fixed(day_of_month, file_path):
-    # Extract just the file name from the full path
-    file_name = file_path.split('\\')[-1]  # Correct for Windows file paths
+COMBINED_PREFIX = 'Combined_Water_Use'
 
-    # Split the file name based on spaces to extract the month and year
-    # Assuming file name format is "Water Use For {Month} {Year}.csv"
-    parts = file_name.split(' ')
+# Map month abbreviations to month numbers
+MONTH_MAP = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
+}
+
+# Weather columns exported with unit suffixes such as "4.50 C" and "1.00 mm"
+UNIT_COLUMNS = ['Outside Temperature (°C)', 'Precipitation (mm)']
 
-    # Extract month and year, ensuring year does not include ".csv"
-    month_str = parts[-2]  # Month is the second-to-last element
-    year_str = parts[-1].split('.')[0]  # Year might include ".csv", so let's fix that
 
-    # Map month abbreviations to month numbers
-    month_map = {
-        "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
-        "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
-    }
+# Resolve the month and year of an export once, from its file name
+def parse_file_month_year(file_path):
+    # Extract just the file name from the full path (Windows or POSIX separators)
+    file_name = os.path.basename(file_path.replace('\\', '/'))
+
+    # Assuming file name format is "Water Use For {Month} {Year}.csv"
+    parts = os.path.splitext(file_name)[0].split(' ')
+    month_str = parts[-2]
+    year_str = parts[-1]
 
     try:
-        month = month_map[month_str[:3]]
+        month = MONTH_MAP[month_str[:3]]
     except KeyError:
         raise ValueError(f"Invalid month string '{month_str}' extracted from file name: {file_name}")
+    return month, year_str
+
 
-    # Extract day part from 'Day of Month' even if it includes the month abbreviation or is in the format 'April 1'
-    day_str = day_of_month.split(' ')[-1].split('-')[0]
-    day = int(day_str)
+# Parse a whole 'Day of Month' column ("September 1", "Sep 1-2", ...) in one vectorized pass
+def parse_day_of_month(day_of_month, month, year_str):
+    # The day is the first number of the last token; "Sep 1-2" is a reading that starts on the 1st
+    days = pd.to_numeric(day_of_month.astype(str).str.extract(r'(\d+)(?:-\d+)?\s*$')[0], errors='coerce')
+    if days.isna().any():
+        bad = day_of_month[days.isna()].iloc[0]
+        raise ValueError(f"Invalid 'Day of Month' value '{bad}' for {month}/{year_str}")
 
-    date = pd.to_datetime(f"{year_str}-{month:02d}-{day:02d}").strftime('%Y-%m-%d')
-    return date, year_str
+    # Reject days past the end of the month instead of rolling them into the next one
+    month_start = np.datetime64(f"{year_str}-{month:02d}-01", 'D')
+    days_in_month = ((np.datetime64(month_start, 'M') + 1).astype('datetime64[D]') - month_start).astype(int)
+    out_of_range = (days < 1) | (days > days_in_month)
+    if out_of_range.any():
+        bad = day_of_month[out_of_range].iloc[0]
+        raise ValueError(f"Invalid 'Day of Month' value '{bad}' for {month}/{year_str}")
+    return pd.to_datetime(month_start + (days.to_numpy(dtype=np.int64) - 1).astype('timedelta64[D]'))
 
 
+# Load one water export, either a monthly CSV or a Green Button XML feed
+def load_water_file(file_path):
+    if file_path.lower().endswith('.xml'):
+        return green_button_xml.load_water_xml(file_path)
+
+    df = pd.read_csv(file_path)
+    month, year_str = parse_file_month_year(file_path)
+    df['Date'] = parse_day_of_month(df['Day of Month'], month, year_str)
+    df['Year'] = year_str
+    df.drop(['Day of Month'], axis=1, inplace=True)  # Remove 'Day of Month' column, as we now have 'Date' and 'Year'
+
+    # Store the weather columns as numbers so the models never strip units again
+    for column in UNIT_COLUMNS:
+        if column in df.columns:
+            df[column] = columnar_cache.to_number(df[column])
+    return df
+
 
+# Every partition write refreshes its binary cache, rollup index and linear-regression statistics
+def write_caches(csv_path, df):
+    columnar_cache.write_cache(csv_path, df)
+    rollup_index.write_index(csv_path, df)
+    sufficient_stats.write_stats(csv_path, df)
 
 
 # Combine files for multiple years with data sorted by date
-def combine_files(file_paths):
+def combine_files(file_paths, max_workers=None):
     # print("in water combine")
     # Get the current working directory
     #current_dir = os.getcwd()
     module_path = os.path.abspath(__file__)
     current_dir = os.path.dirname(module_path)
     # print(current_dir)
-    # Create a 'Combine' folder if it doesn't exist
-    combined_folder = os.path.join(current_dir, rf'Water\Combine')
-    if not os.path.exists(combined_folder):
-        os.makedirs(combined_folder)
-
-    for file_path in file_paths:
-        df = pd.read_csv(file_path)
-        df['Date'], df['Year'] = zip(*df['Day of Month'].apply(lambda x: convert_date_fixed(x, file_path)))
-        df.drop(['Day of Month'], axis=1, inplace=True)  # Remove 'Day of Month' column, as we now have 'Year' from 'convert_date_fixed'
-
-        year = df['Year'].iloc[0]  # Get the year from the DataFrame (assuming all data in the same file has the same year)
-
-        # Define the combined file path within the 'Combine' folder
-        combined_file_path = os.path.join(combined_folder, f'Combined_Water_Use_{year}.csv')
-
-        # Convert the 'Date' column to datetime
-        df['Date'] = pd.to_datetime(df['Date'])
-
-        if os.path.exists(combined_file_path):
-            # Read the existing combined data for the year
-            existing_data = pd.read_csv(combined_file_path)
-
-            # Convert the 'Date' column to datetime for existing data
-            existing_data['Date'] = pd.to_datetime(existing_data['Date'])
-
-            # Combine the new data with existing data and drop duplicates based on 'Date'
-            combined_data = pd.concat([existing_data, df]).drop_duplicates(subset=['Date'], keep='last')
-
-            # Sort the combined data by 'Date'
-            combined_data = combined_data.sort_values(by='Date')
+    # Year partitions and their manifest live in the 'Combine' folder
+    combined_folder = os.path.join(current_dir, 'Water', 'Combine')
 
-            # Save the updated combined data to the existing file
-            combined_data.to_csv(combined_file_path, index=False)
-            npy_path = combined_file_path.replace('.csv', '.npy')
-            np.save(npy_path, combined_data.values)
-        else:
-            # If the file doesn't exist, simply save the new data
-            df = df.sort_values(by='Date')  # Sort the data by 'Date'
+    # Parse every export first (in parallel when there are many), then merge once per year
+    df = combine_store.load_files(load_water_file, file_paths, max_workers)
+    if df.empty:
+        return
 
-            # Save the new data to the combined folder
-            df.to_csv(combined_file_path, index=False)
-            npy_path = combined_file_path.replace('.csv', '.npy')
-            np.save(npy_path, df.values)
+    # Merge into the year partitions (CSV exports hold a single month, XML feeds can span several years)
+    combine_store.merge_into_store(combined_folder, COMBINED_PREFIX, df, on_write=write_caches)
 
 
 
@@ -108,10 +117,10 @@ def update_combined_data(file_path, new_data_df, year):
         combined_df = pd.DataFrame(columns=new_data_df.columns)
     
     combined_df['Date'] = pd.to_datetime(combined_df['Date'])
-    updated_combined_df = pd.concat([combined_df, new_data_df]).drop_duplicates(['Date'], keep='last')
+    updated_combined_df = combine_store.merge_sorted(combined_df, new_data_df)
     
     updated_combined_df.to_csv(existing_file_path, index=False)
-    np.save(existing_file_path.replace('.csv', '.npy'), updated_combined_df.values)
+    write_caches(existing_file_path, updated_combined_df)
 
 
 